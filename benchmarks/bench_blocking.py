@@ -0,0 +1,152 @@
+"""
+Compare page-ready time and bytes transferred with and without resource blocking.
+
+Usage:
+    python benchmarks/bench_blocking.py --runs 5
+
+Serves the pages in benchmarks/fixtures from a local HTTP server, with
+synthetic images, fonts, video and tracker scripts, and loads each one in a
+fresh BrowserContext. Every host name, tracker domains included, resolves to
+the local server, so the benchmark never touches the network. Requires a
+working Playwright Chromium install but no OPENAI_API_KEY.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from resource_blocking import BlockingProfile, blocked_resources  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SITE_HOST = "fixture.test"
+
+# Typical sizes of the assets a content page pulls in
+ASSET_SIZES = {
+    ".png": ("image/png", 120 * 1024),
+    ".jpg": ("image/jpeg", 200 * 1024),
+    ".woff2": ("font/woff2", 60 * 1024),
+    ".mp4": ("video/mp4", 2 * 1024 * 1024),
+    ".css": ("text/css", 8 * 1024),
+    ".js": ("application/javascript", 90 * 1024),
+}
+TRACKER_RESPONSE = ("application/javascript", 90 * 1024)
+
+
+class _FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FixtureHandler)
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def count(self, size: int) -> None:
+        with self._lock:
+            self.bytes_sent += size
+
+    def reset(self) -> int:
+        with self._lock:
+            sent, self.bytes_sent = self.bytes_sent, 0
+            return sent
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        host = self.headers.get("Host", "").split(":")[0]
+        path = self.path.split("?")[0]
+        if host != SITE_HOST:
+            content_type, size = TRACKER_RESPONSE
+            body = b"/*" + b" " * (size - 4) + b"*/"
+        elif path.endswith(".html"):
+            try:
+                with open(os.path.join(FIXTURES_DIR, os.path.basename(path)), "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                self.send_error(404)
+                return
+            content_type = "text/html; charset=utf-8"
+        else:
+            content_type, size = ASSET_SIZES.get(os.path.splitext(path)[1], ("application/octet-stream", 1024))
+            body = b"/*" + b" " * (size - 4) + b"*/" if content_type.startswith("text/") else os.urandom(size)
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def _load(browser, url: str, profile) -> float:
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        started = time.perf_counter()
+        if profile is None:
+            await page.goto(url, wait_until="load")
+        else:
+            async with blocked_resources(page, url, profile):
+                await page.goto(url, wait_until="load")
+        return time.perf_counter() - started
+    finally:
+        await context.close()
+
+
+async def _bench(runs: int, pages):
+    server = _FixtureServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    results = {}
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(
+            headless=True, args=[f"--host-resolver-rules=MAP * 127.0.0.1:{port}"]
+        )
+        try:
+            for name in pages:
+                url = f"http://{SITE_HOST}/{name}"
+                for label, profile in (("unblocked", None), ("blocked", BlockingProfile())):
+                    latencies, transferred = [], []
+                    for _ in range(runs):
+                        server.reset()
+                        latencies.append(await _load(browser, url, profile))
+                        transferred.append(server.reset())
+                    results[(name, label)] = (latencies, transferred)
+        finally:
+            await browser.close()
+            server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--pages", nargs="+", default=sorted(p for p in os.listdir(FIXTURES_DIR) if p.endswith(".html")))
+    args = parser.parse_args()
+
+    results = asyncio.run(_bench(args.runs, args.pages))
+    for name in args.pages:
+        print(f"{name}:")
+        for label in ("unblocked", "blocked"):
+            latencies, transferred = results[(name, label)]
+            print(
+                f"  {label:>9}: ready median {statistics.median(latencies) * 1000:.0f}ms  "
+                f"mean {statistics.mean(latencies) * 1000:.0f}ms  "
+                f"transferred {statistics.mean(transferred) / 1024:.0f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare cold-spawn and pooled latency of browser_automation.
+
+Usage:
+    python benchmarks/bench_pool.py --runs 5 --url https://pandas.pydata.org/ --task "give the definition of pandas"
+
+Requires OPENAI_API_KEY and a working Playwright Chromium install.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import stage_hand_tool  # noqa: E402
+from browser_pool import StagehandPool  # noqa: E402
+
+
+def _timed(label, runs, call):
+    latencies = []
+    for i in range(runs):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+        print(f"  {label} run {i + 1}: {latencies[-1]:.2f}s")
+    return latencies
+
+
+def _report(label, latencies):
+    print(
+        f"{label:>6}: mean {statistics.mean(latencies):.2f}s  "
+        f"median {statistics.median(latencies):.2f}s  "
+        f"min {min(latencies):.2f}s  max {max(latencies):.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--url", default="https://pandas.pydata.org/")
+    parser.add_argument("--task", default="give the definition of pandas")
+    args = parser.parse_args()
+
+    print("Cold spawn (new interpreter and browser per call):")
+    cold = _timed("cold", args.runs, lambda: stage_hand_tool._run_in_subprocess(args.task, args.url))
+
+    print("Pooled (one long-lived worker):")
+    pool = StagehandPool(size=1, max_tasks_per_worker=args.runs + 1)
+    try:
+        pooled = _timed("pooled", args.runs, lambda: pool.run(args.task, args.url))
+    finally:
+        pool.close()
+
+    _report("cold", cold)
+    _report("pooled", pooled)
+    # The first pooled call still pays for interpreter and browser start-up
+    if len(pooled) > 1:
+        _report("warm", pooled[1:])
+
+
+if __name__ == "__main__":
+    main()
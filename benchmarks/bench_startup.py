@@ -0,0 +1,114 @@
+"""
+Compare worker start-up time of the legacy generated temp script and `python -m stagehand_worker`.
+
+Both variants run with OPENAI_API_KEY unset, so each process imports its
+dependencies, reads its task and exits before launching a browser; the
+measured time is pure interpreter, compile and import overhead.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Shape of the program browser_automation used to render for every call
+LEGACY_TEMPLATE = '''
+import os
+import asyncio
+import sys
+import json
+import nest_asyncio
+from stagehand import Stagehand, StagehandConfig
+
+os.environ["OTEL_SDK_DISABLED"] = "true"
+nest_asyncio.apply()
+
+async def main():
+    stagehand = None
+    try:
+        api_key = "{api_key}"
+        if not api_key:
+            print(json.dumps({{"success": False, "data": "", "error": "OPENAI_API_KEY not set"}}))
+            return
+        config = StagehandConfig(env="LOCAL", model_name="gpt-4o", self_heal=True, verbose=1)
+        stagehand = Stagehand(config)
+        await stagehand.init()
+        await stagehand.page.goto("{website_url}")
+        enhanced_instruction = """
+{task_description}
+"""
+        result = await stagehand.page.act(enhanced_instruction)
+        print(json.dumps({{"success": bool(result), "data": str(result), "error": ""}}))
+    except Exception as e:
+        print(json.dumps({{"success": False, "data": "", "error": str(e)}}))
+    finally:
+        if stagehand:
+            await stagehand.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
+'''
+
+
+def _env():
+    env = os.environ.copy()
+    env["OPENAI_API_KEY"] = ""
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    return env
+
+
+def run_legacy(task, url):
+    script = LEGACY_TEMPLATE.format(api_key="", website_url=url, task_description=task)
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False, encoding="utf-8") as f:
+        f.write(script)
+        script_path = f.name
+    try:
+        subprocess.run([sys.executable, script_path], capture_output=True, text=True, env=_env(), check=True)
+    finally:
+        os.unlink(script_path)
+
+
+def run_module(task, url):
+    payload = json.dumps({"task_description": task, "website_url": url})
+    subprocess.run(
+        [sys.executable, "-m", "stagehand_worker"], input=payload, capture_output=True, text=True, env=_env(), check=True
+    )
+
+
+def _measure(call, runs, task, url):
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call(task, url)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--url", default="https://pandas.pydata.org/")
+    parser.add_argument("--task", default="give the definition of pandas")
+    args = parser.parse_args()
+
+    # Warm the OS file cache and __pycache__ once before timing
+    run_module(args.task, args.url)
+
+    results = {
+        "legacy temp script": _measure(run_legacy, args.runs, args.task, args.url),
+        "python -m worker": _measure(run_module, args.runs, args.task, args.url),
+    }
+    for label, latencies in results.items():
+        print(f"{label:>20}: mean {statistics.mean(latencies) * 1000:.0f}ms  median {statistics.median(latencies) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Cache of resolved Stagehand actions.
+
+`page.act(instruction)` asks the LLM which element to act on every time. The
+action it settles on, a selector plus a method and its arguments, is stored
+here keyed by domain, URL pattern and normalized instruction, and replayed
+directly on later runs. If a stored selector no longer matches the page, or
+replaying it fails, the entry is dropped and the LLM resolves the action anew.
+
+The cache is a SQLite file shared by every worker process.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from result_cache import canonicalize_url, normalize_task
+
+ACTION_CACHE_ENABLED = os.getenv("STAGEHAND_ACTION_CACHE_ENABLED", "1") == "1"
+ACTION_CACHE_PATH = os.getenv(
+    "STAGEHAND_ACTION_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "web-browsing-agent", "actions.sqlite3"),
+)
+ACTION_CACHE_TTL_SECONDS = int(os.getenv("STAGEHAND_ACTION_CACHE_TTL", str(7 * 86400)))
+ACTION_CACHE_MAX_ENTRIES = int(os.getenv("STAGEHAND_ACTION_CACHE_MAX_ENTRIES", "5000"))
+
+# What is kept of an ObserveResult; backend node ids do not survive a page load
+_ACTION_FIELDS = ("selector", "description", "method", "arguments")
+
+# Path segments that identify one item of many, e.g. /issues/1234 or /orders/3f2a9c...
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{8,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$", re.IGNORECASE)
+
+# Outcomes reported in a response's "action_cache" field
+HIT = "hit"
+MISS = "miss"
+INVALIDATED = "invalidated"
+
+
+def url_pattern(website_url: str) -> Tuple[str, str]:
+    """Return the domain of `website_url` and a pattern matching pages laid out the same way."""
+    parts = urlsplit(canonicalize_url(website_url))
+    path = "/".join("*" if _ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/"))
+    # Parameter values usually select content, not layout; their names are kept
+    names = sorted({name for name, _ in parse_qsl(parts.query)})
+    return parts.hostname or "", path + ("?" + "&".join(names) if names else "")
+
+
+class ActionCache:
+    """Thread-safe SQLite store of resolved actions, safe to share between processes."""
+
+    def __init__(
+        self,
+        path: str = ACTION_CACHE_PATH,
+        ttl: int = ACTION_CACHE_TTL_SECONDS,
+        max_entries: int = ACTION_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS actions (
+                key TEXT PRIMARY KEY,
+                domain TEXT NOT NULL,
+                url_pattern TEXT NOT NULL,
+                instruction TEXT NOT NULL,
+                action TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS actions_last_used ON actions (last_used)")
+
+    @staticmethod
+    def key(website_url: str, instruction: str) -> str:
+        domain, pattern = url_pattern(website_url)
+        raw = "\n".join((domain, pattern, normalize_task(instruction)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, website_url: str, instruction: str) -> Optional[Dict[str, Any]]:
+        """Return the stored action (selector, method, arguments, description), or None."""
+        key = self.key(website_url, instruction)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT action, expires_at FROM actions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM actions WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE actions SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, website_url: str, instruction: str, action: Dict[str, Any]) -> None:
+        """Store the action the LLM resolved, evicting the least recently used entries beyond the limit."""
+        domain, pattern = url_pattern(website_url)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO actions "
+                "(key, domain, url_pattern, instruction, action, expires_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.key(website_url, instruction),
+                    domain,
+                    pattern,
+                    normalize_task(instruction),
+                    json.dumps(action),
+                    now + self.ttl,
+                    now,
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM actions WHERE key NOT IN (SELECT key FROM actions ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, website_url: str, instruction: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM actions WHERE key = ?", (self.key(website_url, instruction),))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM actions")
+
+
+async def cached_act(page, website_url: str, instruction: str, cache: Optional["ActionCache"]) -> Tuple[Any, str]:
+    """
+    Perform `instruction` on a Stagehand page, replaying a cached action when there is one.
+
+    Returns the ActResult and the cache outcome (hit, miss or invalidated).
+    Actions are passed to `page.act` as dicts, which it runs without the LLM.
+    """
+    if cache is None:
+        return await page.act(instruction), MISS
+
+    outcome = MISS
+    action = cache.get(website_url, instruction)
+    if action is not None:
+        # Check the selector first, so a stale entry never reaches Stagehand's LLM self-heal
+        if await page.locator(action["selector"]).count() > 0:
+            result = await page.act(action)
+            if result.success:
+                return result, HIT
+        cache.invalidate(website_url, instruction)
+        outcome = INVALIDATED
+
+    # Let the LLM resolve and perform the action as usual, and store what it settled on
+    with _resolved_actions(page) as resolved:
+        result = await page.act(instruction)
+    if result.success and resolved:
+        action = {name: getattr(resolved[0], name) for name in _ACTION_FIELDS if getattr(resolved[0], name, None) is not None}
+        if "selector" in action and "method" in action:
+            cache.put(website_url, instruction, action)
+    return result, outcome
+
+
+@contextmanager
+def _resolved_actions(page):
+    """
+    Collect the ObserveResults `page.act` resolves its instruction to, with the act prompt.
+
+    ActResult only describes the action, so the observe step inside `act` is listened in on.
+    Nothing is collected when Stagehand runs remotely and `act` has no local observe step.
+    """
+    resolved: List[Any] = []
+    handler = getattr(page, "_observe_handler", None)
+    if handler is None and hasattr(page, "_stagehand"):
+        try:
+            from stagehand.handlers.observe_handler import ObserveHandler
+
+            # Created the same way `act` creates it on first use
+            handler = page._observe_handler = ObserveHandler(page, page._stagehand, "")
+        except Exception:
+            handler = None
+    if handler is None:
+        yield resolved
+        return
+
+    observe = handler.observe
+
+    async def observe_and_record(*args, **kwargs):
+        results = await observe(*args, **kwargs)
+        resolved.extend(results or [])
+        return results
+
+    handler.observe = observe_and_record
+    try:
+        yield resolved
+    finally:
+        del handler.observe
+
+
+_cache: Optional[ActionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_action_cache() -> Optional[ActionCache]:
+    """Return this process's action cache, or None when action caching is disabled."""
+    global _cache
+    if not ACTION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ActionCache()
+        return _cache
@@ -1,33 +1,77 @@
 from typing import Dict, Any, Optional
 from pydantic import BaseModel, Field
 from crewai import Agent, Task, Crew, LLM
-from crewai.tools import tool
 from crewai.flow.flow import Flow, start, listen
-from stage_hand_tool import browser_automation
+from browser_result import BrowserResult
+from extract_schema import SchemaLike, schema_from_fields
+from stage_hand_tool import discard_speculation, run_browser_task_async, speculate
+from speculation import url_in_query
+from llm_config import get_http_client
+from warmup import Warmup, start_warmup
+from cancellation import CancellationToken
+from worker_events import ACT_STARTED, EXTRACT_STARTED, INIT_DONE, NAVIGATED, PARTIAL_DATA, RESULT, EventCallback
 
 # Streamlit for the frontend
 import streamlit as st
 import asyncio
+import litellm
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 # Define our LLMs for providing to agents
 planner_llm = LLM(model="openai/gpt-4o")
 automation_llm = LLM(model="openai/gpt-4o")
 response_llm = LLM(model="openai/gpt-4o")
+# The LLMs call the endpoint through litellm; let them reuse the connections kept open by llm_config
+litellm.client_session = get_http_client()
+
+
+def _planner_agent() -> Agent:
+    return Agent(
+        role="Automation Planner Specialist",
+        goal="Analyze user queries and create detailed automation plans",
+        backstory="""You are an expert browser automation strategist with deep knowledge 
+        of web technologies and automation best practices. You excel at breaking down 
+        complex user requests into actionable automation tasks.""",
+        llm=planner_llm,
+    )
+
+
+def _automation_agent() -> Agent:
+    return Agent(
+        role="Browser Automation Specialist",
+        goal="Execute precise browser automation tasks using advanced AI-powered tools",
+        backstory="""You are a highly skilled browser automation engineer with expertise 
+        in Stagehand and modern web automation techniques. You can navigate complex websites, 
+        extract data accurately, and handle dynamic web elements with precision.""",
+        llm=automation_llm,
+    )
+
+
+def _synthesis_agent() -> Agent:
+    return Agent(
+        role="Response Synthesis Specialist",
+        goal="Transform technical automation results into clear, actionable user responses",
+        backstory="""You are an expert communicator who specializes in translating 
+        complex technical results into user-friendly responses. You excel at providing 
+        clear summaries, actionable insights, and helpful recommendations.""",
+        llm=response_llm,
+    )
 
 
-@tool("Stagehand Browser Tool")
-def stagehand_browser_tool(task_description: str, website_url: str) -> str:
+def load_agent_definitions() -> int:
     """
-    A tool that allows interaction with a web browser using Stagehand capabilities.
-    
-    Args:
-        task_description (str): The task description for the agent to perform.
-        website_url (str): The URL of the website to interact and navigate to.
-    
-    Returns:
-        str: The result of the browser automation task.
+    Build every agent of the flow once, so the first query finds CrewAI's executors set up
+    and the OpenAI SDK, which litellm imports piecemeal on its first call, already loaded.
     """
-    return browser_automation(task_description, website_url)
+    import openai.resources.chat  # noqa: F401
+    import openai.types.chat  # noqa: F401
+
+    agents = [_planner_agent(), _automation_agent(), _synthesis_agent()]
+    for agent in agents:
+        agent.create_agent_executor()
+    return len(agents)
 
 
 class BrowserAutomationFlowState(BaseModel):
@@ -50,6 +94,11 @@ class AutomationPlan(BaseModel):
         default="medium",
         description="Estimated complexity level: low, medium, or high"
     )
+    extract_fields: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="For pure data extraction tasks, the fields to extract mapped to their type: "
+        "string, number, integer, boolean or list. Leave empty for tasks that need interaction"
+    )
 
 
 class AutomationResult(BaseModel):
@@ -82,25 +131,64 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
     through specialized agents using Stagehand tools.
     """
 
+    def __init__(
+        self,
+        cancel_token: Optional[CancellationToken] = None,
+        on_event: Optional[EventCallback] = None,
+        extract_schema: Optional[SchemaLike] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        # Cancelled by the caller once the result is no longer wanted; kills the browser run in flight
+        self.cancel_token = cancel_token or CancellationToken()
+        # Receives the browser worker's progress events, see worker_events
+        self.on_event = on_event
+        # Shape of the data to extract; without it the planner may propose one
+        self.extract_schema = extract_schema
+        # Browser opened on the query's URL while the task is planned, see speculation
+        self._speculation = None
+        self._unregister_speculation = None
+
     @start()
     def start_flow(self) -> Dict[str, Any]:
         """Initialize the automation flow with the user's query."""
         print(f"🚀 Flow started with query: {self.state.query}")
+        url = url_in_query(self.state.query)
+        if url:
+            # Launch and navigate now, the planner will most likely pick the same URL
+            self._speculation = speculate(url)
+            if self._speculation is not None:
+                self._unregister_speculation = self.cancel_token.on_cancel(self._drop_speculation)
         return {"query": self.state.query}
 
+    def _take_speculation(self):
+        """Hand the speculation over to the browser run, which releases it from then on."""
+        speculation, self._speculation = self._speculation, None
+        unregister, self._unregister_speculation = self._unregister_speculation, None
+        if unregister is not None:
+            unregister()
+        return speculation
+
+    def _drop_speculation(self) -> None:
+        speculation = self._take_speculation()
+        if speculation is not None:
+            discard_speculation(speculation)
+
     @listen(start_flow)
-    def plan_task(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    async def plan_task(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Plan the automation task based on the user's query."""
+        try:
+            return await self._plan(inputs)
+        except BaseException:
+            # No browser run will claim the speculation, free its worker now rather than when its budget runs out
+            self._drop_speculation()
+            raise
+
+    async def _plan(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        self.cancel_token.raise_if_cancelled()
         print("📋 Using Automation Planner to analyze the task...")
 
-        planner_agent = Agent(
-            role="Automation Planner Specialist",
-            goal="Analyze user queries and create detailed automation plans",
-            backstory="""You are an expert browser automation strategist with deep knowledge 
-            of web technologies and automation best practices. You excel at breaking down 
-            complex user requests into actionable automation tasks.""",
-            llm=planner_llm,
-        )
+        planner_agent = _planner_agent()
 
         plan_task = Task(
             description=f"""
@@ -113,6 +201,7 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
             2. Define the specific automation task to be performed
             3. Assess the complexity level of the task
             4. Ensure the plan is actionable and specific
+            5. If the task only reads data off the page, list the fields to extract and their types
             
             If no specific URL is provided, use https://www.google.com as the default.
             """,
@@ -123,7 +212,7 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
         )
 
         crew = Crew(agents=[planner_agent], tasks=[plan_task], verbose=True)
-        result = crew.kickoff()
+        result = await crew.kickoff_async()
 
         # FIX: Access the Pydantic model through .pydantic attribute
         plan = result.pydantic  # This gets the AutomationPlan object
@@ -137,39 +226,63 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
             "task_description": plan.task_description,
             "website_url": website_url,
             "estimated_complexity": plan.estimated_complexity,
+            "extract_fields": plan.extract_fields,
         }
 
     @listen(plan_task)
-    def handle_browser_automation(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_browser_automation(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the browser automation task using Stagehand."""
+        speculation = self._take_speculation()
+        if speculation is not None and self.cancel_token.cancelled:
+            discard_speculation(speculation)
+        self.cancel_token.raise_if_cancelled()
         print("🤖 Executing browser automation task...")
 
-        automation_agent = Agent(
-            role="Browser Automation Specialist",
-            goal="Execute precise browser automation tasks using advanced AI-powered tools",
-            backstory="""You are a highly skilled browser automation engineer with expertise 
-            in Stagehand and modern web automation techniques. You can navigate complex websites, 
-            extract data accurately, and handle dynamic web elements with precision.""",
-            tools=[stagehand_browser_tool],
-            llm=automation_llm,
+        schema = self.extract_schema
+        if schema is None and inputs.get('extract_fields'):
+            schema = schema_from_fields(inputs['extract_fields'])
+
+        # Await the browser session directly so other flows can share the event loop meanwhile
+        browser_result = await run_browser_task_async(
+            inputs['task_description'],
+            inputs['website_url'],
+            cancel_token=self.cancel_token,
+            on_event=self.on_event,
+            schema=schema,
+            speculation=speculation,
         )
+        # Nobody is waiting for the answer any more, skip the remaining LLM calls
+        self.cancel_token.raise_if_cancelled()
+
+        if browser_result.unambiguous:
+            # Nothing for an LLM to interpret, report the result as it is
+            print("⚡ Browser result is unambiguous, skipping the automation report step")
+            return {
+                "success": browser_result.success,
+                "data": browser_result.data,
+                "error_message": browser_result.error or None,
+                "actions_performed": _describe_actions(browser_result),
+            }
+
+        automation_agent = _automation_agent()
 
         automation_task = Task(
             description=f"""
-            Execute the following browser automation task with precision:
+            Report on the following browser automation task, which has already been executed 
+            in a Stagehand browser:
             
             Target Website: {inputs['website_url']}
             Task Description: {inputs['task_description']}
             Estimated Complexity: {inputs.get('estimated_complexity', 'medium')}
             
-            Instructions:
-            1. Navigate to the specified website
-            2. Perform the requested automation task
-            3. Extract or process the required information
-            4. Document any actions taken
-            5. Handle errors gracefully and provide meaningful feedback
+            Browser Output:
+            {browser_result.to_text()}
             
-            Use the Stagehand browser tool to complete this task accurately and efficiently.
+            Instructions:
+            1. Determine whether the automation task succeeded
+            2. Extract the requested information from the browser output
+            3. Document the actions that were taken
+            4. If the browser reported an error, explain it and provide meaningful feedback
             """,
             agent=automation_agent,
             output_pydantic=AutomationResult,
@@ -178,7 +291,7 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
         )
 
         crew = Crew(agents=[automation_agent], tasks=[automation_task], verbose=True)
-        result = crew.kickoff()
+        result = await crew.kickoff_async()
         
         # FIX: Access the Pydantic model through .pydantic attribute
         automation_result = result.pydantic  # This gets the AutomationResult object
@@ -191,18 +304,12 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
         }
 
     @listen(handle_browser_automation)
-    def synthesize_result(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    async def synthesize_result(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Create a user-friendly response from the automation results."""
+        self.cancel_token.raise_if_cancelled()
         print("📝 Synthesizing final response...")
 
-        synthesis_agent = Agent(
-            role="Response Synthesis Specialist",
-            goal="Transform technical automation results into clear, actionable user responses",
-            backstory="""You are an expert communicator who specializes in translating 
-            complex technical results into user-friendly responses. You excel at providing 
-            clear summaries, actionable insights, and helpful recommendations.""",
-            llm=response_llm,
-        )
+        synthesis_agent = _synthesis_agent()
 
         synthesis_task = Task(
             description=f"""
@@ -228,7 +335,7 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
         )
 
         crew = Crew(agents=[synthesis_agent], tasks=[synthesis_task], verbose=True)
-        final_result = crew.kickoff()
+        final_result = await crew.kickoff_async()
         
         # FIX: Access the Pydantic model through .pydantic attribute
         response = final_result.pydantic  # This gets the FinalResponse object
@@ -245,10 +352,46 @@ class BrowserAutomationFlow(Flow[BrowserAutomationFlowState]):
         return {"result": self.state.result}
 
 
+def _describe_actions(result: BrowserResult) -> str:
+    """Summarize what a browser task did, from its result alone."""
+    if result.cached:
+        source = "Served from the result cache"
+    elif result.route == "http":
+        source = "Fetched the page over plain HTTP"
+    elif result.extracted is not None:
+        source = "Extracted structured data in a browser"
+    else:
+        source = "Ran the task in a browser"
+    if result.url:
+        source += f" on {result.url}"
+    phases = ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in result.timings.items())
+    if phases:
+        source += f" ({phases})"
+    if result.error_code:
+        source += f"; failed with {result.error_code.value}"
+    return source
+
+
 # Streamlit Frontend
+PROGRESS_LABELS = {
+    INIT_DONE: "🌐 Browser ready, loading the page...",
+    NAVIGATED: "🧭 Page loaded",
+    ACT_STARTED: "🤖 Working on the page...",
+    EXTRACT_STARTED: "🤖 Extracting data from the page...",
+    RESULT: "📝 Writing up the result...",
+}
+
+
+@st.cache_resource(show_spinner=False)
+def get_warmup() -> Warmup:
+    """Start the warm-up once per server process; reruns and other sessions share it."""
+    return start_warmup(load_agent_definitions)
+
+
 def run_streamlit_app():
     st.set_page_config(page_title="Browser Automation Agent", page_icon="🤖")
     st.title("🤖 Browser Automation Agent")
+    warmup = get_warmup()
     st.write(
         "Enter your browser automation query below. "
         "For example: `give the definition of pandas:https://pandas.pydata.org/`"
@@ -258,25 +401,49 @@ def run_streamlit_app():
     user_query = st.text_input("Automation Query", value="", help="Describe your automation task and (optionally) include a URL.")
 
     if st.button("Run Automation") and user_query.strip():
-        with st.spinner("Running browser automation..."):
-            flow = BrowserAutomationFlow()
-            flow.state.query = user_query.strip()
-
-            # Run the flow asynchronously and display result
-            try:
-                result = asyncio.run(flow.kickoff_async())
-            except RuntimeError as e:
-                # For Streamlit, handle nested event loop (e.g., in Jupyter/Colab)
-                if "asyncio.run() cannot be called from a running event loop" in str(e):
-                    loop = asyncio.get_event_loop()
-                    result = loop.run_until_complete(flow.kickoff_async())
-                else:
-                    raise
-
-            st.success("Automation completed!")
-            st.markdown(result["result"])
+        cancel_token = CancellationToken()
+        progress: queue.Queue = queue.Queue()
+        flow = BrowserAutomationFlow(cancel_token=cancel_token, on_event=progress.put)
+        flow.state.query = user_query.strip()
+
+        # Run the flow on its own thread and event loop, so this script keeps control while it runs
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="automation-flow")
+        future = executor.submit(asyncio.run, flow.kickoff_async())
+        executor.shutdown(wait=False)
+
+        st.button("Cancel")
+        status = st.empty()
+        partial = st.empty()
+        stage = "📋 Planning the task..."
+        started = time.monotonic()
+        try:
+            with st.spinner("Running browser automation..."):
+                while True:
+                    try:
+                        result = future.result(timeout=0.5)
+                        break
+                    except FutureTimeoutError:
+                        pass
+                    while not progress.empty():
+                        event = progress.get_nowait()
+                        if event["event"] == PARTIAL_DATA:
+                            partial.info(f"Found so far: {event['data']}")
+                        stage = PROGRESS_LABELS.get(event["event"], stage)
+                    # Any Streamlit call lets a rerun, a stop or a closed session interrupt this script here
+                    status.caption(f"{stage} ({time.monotonic() - started:.0f}s)")
+        finally:
+            if not future.done():
+                # The user re-ran the query, pressed Cancel or left: free the browser right away
+                cancel_token.cancel("Streamlit run was stopped")
+        status.empty()
+        partial.empty()
+
+        st.success("Automation completed!")
+        st.markdown(result["result"])
     else:
         st.info("Enter a query and click 'Run Automation' to get started.")
+        if not warmup.ready:
+            st.caption("🔥 Starting the browser and connecting to the LLM, the first query may take longer...")
 
 # Only run Streamlit frontend if this file is executed directly
 if __name__ == "__main__":
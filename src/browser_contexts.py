@@ -0,0 +1,107 @@
+"""
+One Chromium process hosting an isolated BrowserContext per task.
+
+Every task gets a fresh context, so cookies and storage never leak between
+tasks, while the cost of launching Chromium and its baseline memory are paid
+once per worker instead of once per task.
+"""
+import asyncio
+from typing import Any, Dict, Optional
+
+from playwright.async_api import async_playwright
+from stagehand import Stagehand
+from stagehand.browser import apply_stealth_scripts
+from stagehand.page import StagehandPage
+
+from deadlines import PhaseBudget
+from process_stats import tree_rss
+from stagehand_worker import build_config, run_task
+from worker_events import EventSink
+
+
+class SharedBrowser:
+    """A single Chromium shared by up to `max_contexts` concurrent tasks."""
+
+    def __init__(self, max_contexts: int):
+        self.max_contexts = max_contexts
+        self._slots = asyncio.Semaphore(max_contexts)
+        self._active = 0
+        self._stagehand: Optional[Stagehand] = None
+        self._playwright = None
+        self._browser = None
+        self._baseline_rss: Optional[int] = None
+
+    async def start(self) -> None:
+        # The Stagehand instance is only used for its LLM client and logger,
+        # pages are created in our own contexts instead of Stagehand's persistent one.
+        # Those contexts keep no disk cache, so no shared cache slot is taken
+        self._stagehand = Stagehand(build_config(disk_cache=False))
+        launch_options = self._stagehand.local_browser_launch_options
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=launch_options.get("headless", False),
+            args=launch_options.get("args", ["--disable-blink-features=AutomationControlled"]),
+        )
+        self._baseline_rss = tree_rss()
+
+    async def run(
+        self,
+        task_description: str,
+        website_url: str,
+        budget: PhaseBudget,
+        events: EventSink,
+        extract_schema: Optional[Dict[str, Any]] = None,
+        opened=None,
+    ) -> Dict[str, Any]:
+        """Run one task in a fresh context and tear the context down afterwards; `opened` is always None here."""
+        async with self._slots:
+            self._active += 1
+            context = None
+            try:
+                async with budget.phase("init"):
+                    context = await self._browser.new_context(
+                        viewport={"width": 1024, "height": 768},
+                        locale="en-US",
+                        timezone_id="America/New_York",
+                        bypass_csp=True,
+                        ignore_https_errors=True,
+                    )
+                    await apply_stealth_scripts(context, self._stagehand.logger)
+                    page = StagehandPage(await context.new_page(), self._stagehand)
+                response = await run_task(page, task_description, website_url, budget, events, extract_schema)
+                response["memory"] = self._memory_report()
+                return response
+            finally:
+                self._active -= 1
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+
+    async def open_page(self, website_url: str, budget: PhaseBudget) -> None:
+        """Contexts are created per task, so ahead of a task only the browser itself is started."""
+        return None
+
+    def _memory_report(self) -> Dict[str, Any]:
+        """Memory of the worker and its Chromium, and the share attributable to each open context."""
+        total = tree_rss()
+        if total is None or self._baseline_rss is None:
+            return {}
+        return {
+            "browser_rss_mb": round(total / 2**20, 1),
+            "active_contexts": self._active,
+            "rss_per_context_mb": round(max(total - self._baseline_rss, 0) / max(self._active, 1) / 2**20, 1),
+        }
+
+    async def close(self) -> None:
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
@@ -0,0 +1,755 @@
+import asyncio
+import atexit
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+from browser_result import ErrorCode, error_response, exception_code
+from deadlines import KILL_GRACE_SECONDS, PhaseBudget, PhaseTimeout
+from har_recording import har_enabled
+from process_stats import kill_process_tree, tree_rss
+from result_cache import canonicalize_url
+from worker_events import INIT_DONE, EventCallback, EventSink, dispatch
+
+CANCELLED_RESPONSE = error_response("Task was cancelled", ErrorCode.CANCELLED, cancelled=True)
+# Returned for a speculative navigation no task claimed
+DISCARDED_RESPONSE = error_response("Speculative navigation was discarded", ErrorCode.CANCELLED, discarded=True)
+
+# Pool sizing can be tuned per deployment without touching the code
+POOL_SIZE = int(os.getenv("STAGEHAND_POOL_SIZE", "2"))
+MAX_TASKS_PER_WORKER = int(os.getenv("STAGEHAND_MAX_TASKS_PER_WORKER", "25"))
+# Workers are also recycled once they and their Chromium use this much memory, or have been up this long; 0 disables
+MAX_WORKER_RSS_MB = int(os.getenv("STAGEHAND_MAX_WORKER_RSS_MB", "2048"))
+MAX_WORKER_AGE_SECONDS = float(os.getenv("STAGEHAND_MAX_WORKER_AGE", "3600"))
+# Number of recent recycle events kept for `StagehandPool.stats`
+RECYCLE_HISTORY = 50
+# 0 keeps one persistent Stagehand page per worker; N > 0 makes each worker a single
+# Chromium running up to N tasks at once, each in its own fresh BrowserContext
+CONTEXTS_PER_BROWSER = int(os.getenv("STAGEHAND_CONTEXTS_PER_BROWSER", "0"))
+# What a site can keep in the browser besides cookies, cleared between the tasks of a persistent
+# session; the HTTP disk cache holds nothing per user and is meant to be shared
+SITE_STORAGE_TYPES = "local_storage,indexeddb,websql,service_workers,cache_storage,file_systems"
+
+
+def _worker_main(conn, contexts_per_browser: int) -> None:
+    """Entry point of a pool worker process."""
+    if hasattr(os, "setsid"):
+        # Lead a process group of our own, so a cancelled task takes the driver and browser down with us
+        os.setsid()
+    # Disable CrewAI telemetry
+    os.environ["OTEL_SDK_DISABLED"] = "true"
+    asyncio.run(_serve(conn, contexts_per_browser))
+
+
+class _SessionRunner:
+    """
+    Runs every task on the page of one long-lived Stagehand session.
+
+    Each task starts from a blank page without the cookies and storage of the
+    tasks before it, as it would in a fresh browser.
+    """
+
+    def __init__(self):
+        self._stagehand = None
+        # Origins visited since the last reset
+        self._origins: Set[str] = set()
+
+    async def start(self) -> None:
+        from stagehand import Stagehand
+        from stagehand_worker import build_config
+
+        self._stagehand = Stagehand(build_config())
+        await self._stagehand.init()
+        self._stagehand.page.on("framenavigated", self._record_origin)
+
+    def _record_origin(self, frame) -> None:
+        parts = urlsplit(frame.url)
+        if parts.scheme in ("http", "https"):
+            self._origins.add(f"{parts.scheme}://{parts.netloc}")
+
+    async def reset(self) -> None:
+        """Leave the page blank and clear what the previous tasks stored in the browser."""
+        page = self._stagehand.page
+        try:
+            # sessionStorage belongs to the tab, only the page itself can clear it
+            await page.evaluate("() => { try { sessionStorage.clear(); } catch (e) {} }")
+        except Exception:
+            pass
+        await page.goto("about:blank")
+        await page.context.clear_cookies()
+        origins, self._origins = self._origins, set()
+        if origins:
+            session = await page.context.new_cdp_session(getattr(page, "_page", page))
+            try:
+                for origin in origins:
+                    await session.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": SITE_STORAGE_TYPES})
+            finally:
+                await session.detach()
+
+    async def run(
+        self,
+        task_description: str,
+        website_url: str,
+        budget: PhaseBudget,
+        events: EventSink,
+        extract_schema: Optional[Dict[str, Any]] = None,
+        opened=None,
+    ) -> Dict[str, Any]:
+        from stagehand_worker import run_task
+
+        if opened is None:
+            # A page opened ahead of the task was reset before it navigated
+            async with budget.phase("init"):
+                await self.reset()
+        return await run_task(
+            self._stagehand.page, task_description, website_url, budget, events, extract_schema, opened
+        )
+
+    async def open_page(self, website_url: str, budget: PhaseBudget):
+        """Navigate the session's page to `website_url` ahead of the task that will run on it."""
+        from stagehand_worker import OpenedPage
+
+        async with budget.phase("init"):
+            await self.reset()
+        opened = OpenedPage(self._stagehand.page, website_url)
+        try:
+            await opened.navigate(budget)
+        except BaseException:
+            await opened.close()
+            raise
+        return opened
+
+    async def close(self) -> None:
+        if self._stagehand:
+            await self._stagehand.close()
+
+
+async def _serve(conn, contexts_per_browser: int) -> None:
+    """Keep a browser alive and run every task sent over the pipe against it."""
+    import nest_asyncio
+    from llm_config import get_api_key
+
+    nest_asyncio.apply()
+    loop = asyncio.get_running_loop()
+    if contexts_per_browser > 0:
+        from browser_contexts import SharedBrowser
+
+        runner = SharedBrowser(contexts_per_browser)
+    else:
+        runner = _SessionRunner()
+    started = False
+    start_lock = asyncio.Lock()
+    running: Dict[int, asyncio.Task] = {}
+    # Speculative navigations waiting for their task, resolved with its payload and arrival time
+    claims: Dict[int, asyncio.Future] = {}
+    inbox: asyncio.Queue = asyncio.Queue()
+
+    def read_messages() -> None:
+        # A daemon thread, so a blocking recv never keeps the worker alive on exit
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = ("stop",)
+            loop.call_soon_threadsafe(inbox.put_nowait, message)
+            if message[0] == "stop":
+                return
+
+    async def start(budget: PhaseBudget) -> None:
+        nonlocal started
+        if not started:
+            async with budget.phase("init"), start_lock:
+                if not started:
+                    await runner.start()
+                    started = True
+
+    async def handle(
+        task_id: int,
+        payload: Dict[str, Any],
+        opened=None,
+        speculation: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        budget = PhaseBudget.from_payload(payload)
+        events = EventSink(lambda message: conn.send(("event", task_id, message)))
+        try:
+            if not get_api_key():
+                response = error_response("OPENAI_API_KEY not set", ErrorCode.MISSING_API_KEY)
+            else:
+                warm = started
+                await start(budget)
+                events.emit(INIT_DONE, warm=warm)
+                if opened is not None and canonicalize_url(opened.website_url) != canonicalize_url(payload["website_url"]):
+                    # Not the page this task wants after all
+                    await opened.close()
+                    opened = None
+                response = await runner.run(
+                    payload["task_description"],
+                    payload["website_url"],
+                    budget,
+                    events,
+                    payload.get("extract_schema"),
+                    opened,
+                )
+                if speculation is not None:
+                    response["speculation"] = dict(speculation, warm_page=opened is not None)
+        except asyncio.CancelledError:
+            response = dict(CANCELLED_RESPONSE)
+        except PhaseTimeout as e:
+            response = e.response()
+            if not started:
+                inbox.put_nowait(("stop",))
+        except Exception as e:
+            response = error_response(str(e), exception_code(e) if started else ErrorCode.LAUNCH_FAILED)
+            if not started:
+                # A worker without a browser is useless, let the pool replace it
+                inbox.put_nowait(("stop",))
+        finally:
+            running.pop(task_id, None)
+            if opened is not None:
+                # Normally closed by the task already
+                await opened.close()
+        conn.send(("result", task_id, response))
+
+    async def speculate(task_id: int, payload: Dict[str, Any]) -> None:
+        """Start the browser and open `website_url` ahead of a task, then run the task once it is claimed."""
+        started_at = time.perf_counter()
+        budget = PhaseBudget.from_payload(payload)
+        opened = None
+        try:
+            if get_api_key():
+                # A discard stops the navigation, but not the browser launch other tasks may be waiting on
+                await asyncio.shield(start(budget))
+                # HAR files are keyed by the task, which is not known yet
+                if not har_enabled():
+                    opened = await runner.open_page(payload["website_url"], budget)
+        except asyncio.CancelledError:
+            claim = claims.pop(task_id, None)
+            running.pop(task_id, None)
+            discarded = claim is not None and claim.done() and claim.result()[0] is None
+            conn.send(("result", task_id, dict(DISCARDED_RESPONSE if discarded else CANCELLED_RESPONSE)))
+            return
+        except Exception:
+            # The claimed task starts over and reports the error itself
+            opened = None
+        ready_at = time.perf_counter()
+
+        try:
+            task_payload, claimed_at = await asyncio.wait_for(claims[task_id], budget.remaining())
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            task_payload, claimed_at = None, ready_at
+        finally:
+            claims.pop(task_id, None)
+        if task_payload is None:
+            if opened is not None:
+                await opened.close()
+            running.pop(task_id, None)
+            conn.send(("result", task_id, dict(DISCARDED_RESPONSE)))
+            return
+        # What was already done when the task arrived
+        saved = max(min(ready_at, claimed_at) - started_at, 0.0)
+        await handle(task_id, task_payload, opened, {"seconds_saved": round(saved, 3)})
+
+    async def warm(task_id: int, payload: Dict[str, Any]) -> None:
+        """Start the browser ahead of the first task."""
+        budget = PhaseBudget.from_payload(payload)
+        try:
+            if not get_api_key():
+                response = error_response("OPENAI_API_KEY not set", ErrorCode.MISSING_API_KEY)
+            else:
+                await start(budget)
+                response = {"success": True, "data": "", "error": "", "timings": dict(budget.timings)}
+        except asyncio.CancelledError:
+            response = dict(CANCELLED_RESPONSE)
+        except Exception as e:
+            response = e.response() if isinstance(e, PhaseTimeout) else error_response(str(e), ErrorCode.LAUNCH_FAILED)
+            if not started:
+                inbox.put_nowait(("stop",))
+        finally:
+            running.pop(task_id, None)
+        conn.send(("result", task_id, response))
+
+    threading.Thread(target=read_messages, daemon=True).start()
+    try:
+        while True:
+            message = await inbox.get()
+            if message[0] == "stop":
+                break
+            if message[0] == "cancel":
+                task = running.get(message[1])
+                if task is not None:
+                    task.cancel()
+                continue
+            if message[0] == "speculate":
+                _, task_id, payload = message
+                claims[task_id] = loop.create_future()
+                running[task_id] = asyncio.create_task(speculate(task_id, payload))
+                continue
+            if message[0] == "warm":
+                _, task_id, payload = message
+                running[task_id] = asyncio.create_task(warm(task_id, payload))
+                continue
+            if message[0] == "discard":
+                claim = claims.get(message[1])
+                if claim is not None and not claim.done():
+                    claim.set_result((None, 0.0))
+                    # Free the slot now rather than after a navigation nobody is waiting for
+                    running[message[1]].cancel()
+                continue
+
+            _, task_id, payload = message
+            claim = claims.get(task_id)
+            if claim is not None:
+                # The task a speculative navigation was waiting for
+                if not claim.done():
+                    claim.set_result((payload, time.perf_counter()))
+                continue
+            running[task_id] = asyncio.create_task(handle(task_id, payload))
+    finally:
+        for task in list(running.values()):
+            task.cancel()
+        if running:
+            await asyncio.gather(*running.values(), return_exceptions=True)
+        if started:
+            try:
+                await runner.close()
+            except Exception:
+                pass
+
+
+class _Worker:
+    """Parent-side handle of one worker process."""
+
+    def __init__(self, context, contexts_per_browser: int, on_change):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, contexts_per_browser), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        self.capacity = max(1, contexts_per_browser)
+        self.shared_browser = contexts_per_browser > 0
+        self.started_at = time.monotonic()
+        self.tasks_started = 0
+        self.pending: Dict[int, Future] = {}
+        self.listeners: Dict[int, EventCallback] = {}
+        self.retiring = False
+        self.retire_reason: Optional[str] = None
+        # Resident memory of the worker and its browser, measured after each task
+        self.rss: Optional[int] = None
+        self._on_change = on_change
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.pending)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def reserve(self, task_id: int, on_event: Optional[EventCallback] = None, counted: bool = True) -> Future:
+        """Claim a slot on this worker; must be called with the pool lock held."""
+        future: Future = Future()
+        self.pending[task_id] = future
+        if on_event is not None:
+            self.listeners[task_id] = on_event
+        if counted:
+            self.tasks_started += 1
+        return future
+
+    def release(self, task_id: int, response: Dict[str, Any]) -> None:
+        """Resolve a task with `response` without waiting for the worker, freeing its slot."""
+        future = self.pending.pop(task_id, None)
+        self.listeners.pop(task_id, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+        self._on_change(self, finished=False)
+
+    def retire(self, reason: str) -> None:
+        """Stop giving this worker new tasks; it exits once its in-flight tasks are done."""
+        if not self.retiring:
+            self.retiring = True
+            self.retire_reason = reason
+
+    def send(self, *message) -> None:
+        with self._send_lock:
+            self.conn.send(message)
+
+    def _read_results(self) -> None:
+        while True:
+            try:
+                kind, task_id, response = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == "event":
+                dispatch(self.listeners.get(task_id), response)
+                continue
+            self.listeners.pop(task_id, None)
+            future = self.pending.pop(task_id, None)
+            if future is not None and kind == "result":
+                future.set_result(response)
+            self._on_change(self, finished=False)
+
+        # The worker is gone, fail whatever it was still working on
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"Browser worker exited with code {self.process.exitcode}"))
+        self.pending.clear()
+        self.listeners.clear()
+        self._on_change(self, finished=True)
+
+    def stop(self) -> None:
+        """Ask the worker to shut its browser down cleanly."""
+        try:
+            self.send("stop")
+        except (OSError, ValueError):
+            pass
+
+    def kill(self) -> None:
+        """Terminate the worker and its browser immediately."""
+        if self.process.is_alive():
+            kill_process_tree(self.process.pid)
+        self.process.join(timeout=5)
+
+
+class PoolTask:
+    """A task running on a pool worker."""
+
+    def __init__(self, worker: _Worker, task_id: int, future: Future):
+        self.worker = worker
+        self.task_id = task_id
+        self.future = future
+
+    def result(self, timeout: float) -> Dict[str, Any]:
+        """Wait for the worker's response, abandoning the task if it takes longer than `timeout` seconds."""
+        try:
+            return self.future.result(timeout=timeout)
+        except FutureTimeoutError as e:
+            self.cancel()
+            raise TimeoutError(f"Browser automation timed out after {timeout} seconds") from e
+
+    def cancel(self) -> None:
+        """Abandon the task and free its slot right away."""
+        if self.worker.shared_browser:
+            # The other contexts on this browser are fine, only close this task's context
+            try:
+                self.worker.send("cancel", self.task_id)
+            except (OSError, ValueError):
+                pass
+            self.worker.release(self.task_id, dict(CANCELLED_RESPONSE))
+        else:
+            # A browser in an unknown state cannot be trusted with another task
+            self.worker.retire("cancelled")
+            self.worker.release(self.task_id, dict(CANCELLED_RESPONSE))
+            self.worker.kill()
+
+
+class Speculation:
+    """A worker opening a URL ahead of the task that is expected to run on it."""
+
+    def __init__(self, worker: _Worker, task_id: int, future: Future, website_url: str):
+        self.worker = worker
+        self.task_id = task_id
+        self.future = future
+        self.website_url = website_url
+        self._settled = False
+        self._lock = threading.Lock()
+
+    def matches(self, website_url: str) -> bool:
+        return canonicalize_url(website_url) == canonicalize_url(self.website_url)
+
+    def claim(
+        self,
+        task_description: str,
+        website_url: str,
+        timeout: float = 180,
+        on_event: Optional[EventCallback] = None,
+        extract_schema: Optional[Dict[str, Any]] = None,
+    ) -> PoolTask:
+        """
+        Run the task on the warm page. If the worker gave up on the speculation in the
+        meantime, the task's response has "discarded" set and the task has to be resubmitted.
+        """
+        with self._lock:
+            discarded, self._settled = self._settled, True
+        if discarded or self.future.done():
+            # The worker gave up on it and freed the slot, or is about to; running the task there would run it twice
+            return PoolTask(self.worker, self.task_id, self.future)
+        payload = {"task_description": task_description, "website_url": website_url, "deadline": time.time() + timeout}
+        if extract_schema is not None:
+            payload["extract_schema"] = extract_schema
+        if on_event is not None:
+            self.worker.listeners[self.task_id] = on_event
+        try:
+            self.worker.send("run", self.task_id, payload)
+        except (OSError, ValueError):
+            pass
+        return PoolTask(self.worker, self.task_id, self.future)
+
+    def discard(self) -> bool:
+        """Close the warm page and free the worker's slot; False if it was already claimed or discarded."""
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+        try:
+            self.worker.send("discard", self.task_id)
+        except (OSError, ValueError):
+            pass
+        return True
+
+
+class StagehandPool:
+    """
+    A pool of long-lived worker processes, each holding an initialized browser.
+
+    Workers are started lazily and recycled once they have run
+    `max_tasks_per_worker` tasks, their process tree uses more than
+    `max_worker_rss_mb` of memory or they are older than `max_worker_age`
+    seconds, so leaked browser state cannot grow without bound. A recycled
+    worker takes no new tasks and exits once its in-flight tasks are done,
+    while a replacement is started next to it. With
+    `contexts_per_browser` > 0 each worker runs that many tasks concurrently,
+    each in its own BrowserContext of a single shared Chromium.
+    """
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        max_tasks_per_worker: int = MAX_TASKS_PER_WORKER,
+        contexts_per_browser: int = CONTEXTS_PER_BROWSER,
+        max_worker_rss_mb: int = MAX_WORKER_RSS_MB,
+        max_worker_age: float = MAX_WORKER_AGE_SECONDS,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.contexts_per_browser = contexts_per_browser
+        self.max_worker_rss_mb = max_worker_rss_mb
+        self.max_worker_age = max_worker_age
+        self._recycles: Dict[str, int] = {}
+        self._recycle_events: deque = deque(maxlen=RECYCLE_HISTORY)
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._condition = threading.Condition()
+        self._task_ids = itertools.count()
+        self._closed = False
+
+    @property
+    def capacity(self) -> int:
+        """Number of tasks the pool can run at the same time."""
+        return self.size * max(1, self.contexts_per_browser)
+
+    def submit(
+        self,
+        task_description: str,
+        website_url: str,
+        timeout: float = 180,
+        on_event: Optional[EventCallback] = None,
+        extract_schema: Optional[Dict[str, Any]] = None,
+    ) -> PoolTask:
+        """
+        Hand one browser task to a pooled worker.
+
+        The task, including the wait for a free slot, must finish within `timeout`
+        seconds; the worker gets whatever is left of it as its deadline. Progress
+        events are passed to `on_event` on the worker's reader thread. With a JSON
+        `extract_schema` the worker runs the task in extract mode.
+        """
+        deadline = time.time() + timeout
+        payload = {"task_description": task_description, "website_url": website_url, "deadline": deadline}
+        if extract_schema is not None:
+            payload["extract_schema"] = extract_schema
+        task_id = next(self._task_ids)
+        worker, future = self._acquire(task_id, timeout, on_event)
+        worker.send("run", task_id, payload)
+        return PoolTask(worker, task_id, future)
+
+    def speculate(self, website_url: str, timeout: float = 180) -> Optional[Speculation]:
+        """
+        Start a browser and open `website_url` on a free slot while the task is still being planned.
+
+        The slot stays taken until the speculation is claimed by `Speculation.claim`
+        or discarded, or `timeout` seconds have passed. Returns None if no slot is free right away.
+        """
+        task_id = next(self._task_ids)
+        try:
+            worker, future = self._acquire(task_id, 0, None)
+        except (TimeoutError, RuntimeError):
+            return None
+        worker.send("speculate", task_id, {"website_url": website_url, "deadline": time.time() + timeout})
+        return Speculation(worker, task_id, future, website_url)
+
+    def warm(self, count: int, timeout: float = 180) -> int:
+        """
+        Start workers until `count` of them, at most the pool size, have their browser up.
+
+        Blocks until the browsers are ready or `timeout` seconds have passed, and
+        returns the number of workers that are ready. Warming does not count
+        towards a worker's `max_tasks_per_worker`.
+        """
+        deadline = time.time() + timeout
+        warming = []
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            workers = [worker for worker in self._workers if not worker.retiring]
+            while len(workers) < min(count, self.size):
+                worker = _Worker(self._context, self.contexts_per_browser, self._worker_changed)
+                self._workers.append(worker)
+                workers.append(worker)
+            workers = workers[:count]
+            for worker in workers:
+                # A worker without a free slot is already running tasks, so its browser is up
+                if worker.in_flight < worker.capacity:
+                    task_id = next(self._task_ids)
+                    warming.append((worker, task_id, worker.reserve(task_id, counted=False)))
+
+        for worker, task_id, _ in warming:
+            try:
+                worker.send("warm", task_id, {"deadline": deadline})
+            except (OSError, ValueError):
+                pass
+        ready = len(workers) - len(warming)
+        for worker, _, future in warming:
+            try:
+                response = future.result(max(deadline - time.time(), 0) + KILL_GRACE_SECONDS)
+            except Exception:
+                continue
+            if response.get("success"):
+                ready += 1
+            else:
+                print(f"🔥 Browser worker {worker.process.pid} failed to warm up: {response.get('error')}")
+        return ready
+
+    def run(self, task_description: str, website_url: str, timeout: float = 180) -> Dict[str, Any]:
+        """Run one browser task on a pooled worker and return the worker's response."""
+        deadline = time.time() + timeout
+        task = self.submit(task_description, website_url, timeout)
+        # The worker reports phase timeouts itself, only give up on it if it overruns the deadline anyway
+        return task.result(max(deadline - time.time(), 0) + KILL_GRACE_SECONDS)
+
+    def _acquire(self, task_id: int, timeout: float, on_event: Optional[EventCallback]):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+
+                for worker in self._workers:
+                    self._retire_if_old(worker)
+                # Fill the browsers that are already running before launching another one
+                for worker in self._workers:
+                    if not worker.retiring and worker.in_flight < worker.capacity and worker.process.is_alive():
+                        return worker, self._claim(worker, task_id, on_event)
+                # Draining workers do not count, their replacement starts right away
+                if sum(not worker.retiring for worker in self._workers) < self.size:
+                    worker = _Worker(self._context, self.contexts_per_browser, self._worker_changed)
+                    self._workers.append(worker)
+                    return worker, self._claim(worker, task_id, on_event)
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a free browser worker")
+                self._condition.wait(remaining)
+
+    def _claim(self, worker: _Worker, task_id: int, on_event: Optional[EventCallback]) -> Future:
+        # Called with the condition held
+        future = worker.reserve(task_id, on_event)
+        if worker.tasks_started >= self.max_tasks_per_worker:
+            worker.retire("max_tasks")
+        return future
+
+    def _retire_if_old(self, worker: _Worker) -> None:
+        # Called with the condition held; idle workers are only noticed here
+        if self.max_worker_age > 0 and not worker.retiring and worker.age >= self.max_worker_age:
+            worker.retire("max_age")
+            if worker.in_flight == 0:
+                worker.stop()
+
+    def _worker_changed(self, worker: _Worker, finished: bool) -> None:
+        if not finished and not worker.retiring and self.max_worker_rss_mb > 0:
+            # Walking the process tree is slow, keep it outside the lock
+            worker.rss = tree_rss(worker.process.pid)
+            if worker.rss is not None and worker.rss > self.max_worker_rss_mb * 2**20:
+                worker.retire("max_rss")
+        with self._condition:
+            if finished:
+                if worker in self._workers:
+                    self._workers.remove(worker)
+                    self._record_recycle(worker)
+            elif worker.retiring and worker.in_flight == 0:
+                worker.stop()
+            self._condition.notify_all()
+
+    def _record_recycle(self, worker: _Worker) -> None:
+        # Called with the condition held, once per worker that exited
+        reason = worker.retire_reason or ("closed" if self._closed else "crashed")
+        self._recycles[reason] = self._recycles.get(reason, 0) + 1
+        event = {
+            "pid": worker.process.pid,
+            "reason": reason,
+            "tasks": worker.tasks_started,
+            "age_seconds": round(worker.age, 1),
+            "rss_mb": round(worker.rss / 2**20, 1) if worker.rss is not None else None,
+            "at": time.time(),
+        }
+        self._recycle_events.append(event)
+        if reason != "closed":
+            print(
+                f"♻️ Recycled browser worker {event['pid']} ({reason}) after {event['tasks']} tasks, "
+                f"{event['age_seconds']:.0f}s" + (f", {event['rss_mb']} MB" if event["rss_mb"] is not None else "")
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Recycle counters per reason, the most recent recycle events and the state of the live workers."""
+        with self._condition:
+            return {
+                "recycles": dict(self._recycles),
+                "recent_recycles": list(self._recycle_events),
+                "workers": [
+                    {
+                        "pid": worker.process.pid,
+                        "tasks": worker.tasks_started,
+                        "in_flight": worker.in_flight,
+                        "age_seconds": round(worker.age, 1),
+                        "rss_mb": round(worker.rss / 2**20, 1) if worker.rss is not None else None,
+                        "retiring": worker.retiring,
+                    }
+                    for worker in self._workers
+                ],
+            }
+
+    def close(self) -> None:
+        """Stop every worker and refuse new tasks."""
+        with self._condition:
+            self._closed = True
+            workers = list(self._workers)
+            self._condition.notify_all()
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.process.join(timeout=10)
+            worker.kill()
+
+
+_pool: Optional[StagehandPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> StagehandPool:
+    """Return the process-wide browser pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = StagehandPool()
+            atexit.register(_pool.close)
+        return _pool
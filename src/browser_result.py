@@ -0,0 +1,99 @@
+"""
+Typed result of a browser automation task.
+
+Workers exchange plain dicts, which have to survive JSON and pipes; callers
+get them as a BrowserResult.
+"""
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ErrorCode(str, Enum):
+    """Why a browser task failed."""
+    TIMEOUT = "timeout"
+    CANCELLED = "cancelled"
+    MISSING_API_KEY = "missing_api_key"
+    INVALID_TASK = "invalid_task"
+    BROWSER_ERROR = "browser_error"
+    # The browser could not be started, or the LLM endpoint failed; neither says anything about the site
+    LAUNCH_FAILED = "launch_failed"
+    LLM_ERROR = "llm_error"
+    ACT_FAILED = "act_failed"
+    NO_DATA = "no_data"
+    NO_RECORDING = "no_recording"
+    LOGIN_FAILED = "login_failed"
+    CIRCUIT_OPEN = "circuit_open"
+    WORKER_ERROR = "worker_error"
+
+
+# Packages of the LLM clients Stagehand calls through
+_LLM_PACKAGES = ("litellm", "openai")
+
+
+def error_response(error: str, code: ErrorCode, **fields: Any) -> Dict[str, Any]:
+    """The response dict of a failed task."""
+    return {"success": False, "data": "", "error": error, "error_code": code.value, **fields}
+
+
+def exception_code(error: BaseException) -> ErrorCode:
+    """The error code of an unexpected exception in a browser run: LLM_ERROR if the LLM client raised it."""
+    while error is not None:
+        if any(cls.__module__.split(".", 1)[0] in _LLM_PACKAGES for cls in type(error).__mro__):
+            return ErrorCode.LLM_ERROR
+        error = error.__cause__
+    return ErrorCode.BROWSER_ERROR
+
+
+class TokenUsage(BaseModel):
+    """LLM tokens spent on a task."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class BrowserResult(BaseModel):
+    """Outcome of one browser automation task."""
+    success: bool = Field(..., description="Whether the task succeeded")
+    data: str = Field(default="", description="Data extracted from the page")
+    error: str = Field(default="", description="What went wrong, if the task failed")
+    error_code: Optional[ErrorCode] = Field(default=None, description="Machine-readable failure reason")
+    timed_out_phase: Optional[str] = Field(default=None, description="Phase that ran out of time")
+    timings: Dict[str, float] = Field(default_factory=dict, description="Seconds spent per phase")
+    url: Optional[str] = Field(default=None, description="URL the task ended up on")
+    token_usage: Optional[TokenUsage] = Field(default=None, description="LLM tokens spent on the task")
+    route: str = Field(default="browser", description="'browser', or 'http' for the static fast path")
+    cached: bool = Field(default=False, description="Whether the result came from the result cache")
+    memory: Dict[str, Any] = Field(default_factory=dict, description="Browser memory report")
+    blocking: Dict[str, int] = Field(default_factory=dict, description="Requests blocked and allowed")
+    extracted: Optional[Dict[str, Any]] = Field(default=None, description="Typed JSON returned by extract mode")
+
+    @classmethod
+    def from_response(cls, response: Dict[str, Any], cached: bool = False) -> "BrowserResult":
+        """Build a result from a worker response dict."""
+        fields = {
+            name: response[name] for name in cls.model_fields if name != "cached" and response.get(name) is not None
+        }
+        result = cls(**fields, cached=cached)
+        if not result.success and result.error_code is None:
+            # Failures reported by older code paths without a code
+            result.error_code = ErrorCode.WORKER_ERROR
+        return result
+
+    @property
+    def unambiguous(self) -> bool:
+        """Whether the outcome can be reported as is, without an LLM reading it first."""
+        if not self.success:
+            return True
+        # Act reports what Stagehand did, while extract mode and the fast path return the answer itself
+        return self.extracted is not None or self.route == "http"
+
+    def to_text(self) -> str:
+        """Render the result as the text handed to agents."""
+        if self.success:
+            return f"Browser Automation Success:\n{self.data}"
+        return f"Browser Automation Failed: {self.error}"
@@ -0,0 +1,74 @@
+"""
+Cancellation of in-flight browser runs.
+
+A CancellationToken is created by the caller (the Streamlit app), handed down
+through BrowserAutomationFlow into the browser layer, and cancelled when the
+result is no longer wanted. Whatever is running the task registers a callback
+on the token that kills its process tree, so the worker slot is freed at once
+instead of when the task would have finished.
+"""
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+class TaskCancelled(Exception):
+    """The caller cancelled the run."""
+
+
+class CancellationToken:
+    """A thread-safe, one-shot cancellation flag with callbacks."""
+
+    def __init__(self):
+        self.reason = ""
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled by caller") -> None:
+        """Cancel the run and fire every registered callback, once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call `callback` on cancellation (right away if already cancelled); returns a function unregistering it."""
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = next(self._ids)
+                self._callbacks[callback_id] = callback
+                return lambda: self._callbacks.pop(callback_id, None)
+        callback()
+        return lambda: None
+
+    @contextmanager
+    def registered(self, callback: Callable[[], None]):
+        """Keep `callback` registered while the block runs."""
+        unregister = self.on_cancel(callback)
+        try:
+            yield
+        finally:
+            unregister()
+
+    def wait(self, timeout: float) -> bool:
+        """Block for up to `timeout` seconds; returns whether the run was cancelled meanwhile."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise TaskCancelled(self.reason)
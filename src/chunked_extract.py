@@ -0,0 +1,267 @@
+"""
+Map-reduce extraction for long pages.
+
+A single act or extract call over the whole DOM of a long documentation or
+listing page runs into the model's context limit. Pages whose main text is
+longer than one chunk are instead split at section boundaries, each chunk is
+asked for its part of the answer concurrently (with bounded parallelism),
+and the partial answers are merged: field by field for typed extraction, or
+with one call to a small model for free text. When no chunk holds the answer,
+or the task needs interaction with the page, the worker falls back to the
+regular act or extract step. Act tasks are only chunked when they just read
+the page, since anything else ends up in `act` anyway.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from extract_schema import compile_schema
+from llm_config import MODEL_NAME, get_api_key, get_base_url
+from static_fetch import HEADING_MARK, extract_main_text
+
+CHUNKING_ENABLED = os.getenv("STAGEHAND_CHUNKING", "1") == "1"
+# Context window of MODEL_NAME, in tokens
+MODEL_CONTEXT_TOKENS = int(os.getenv("STAGEHAND_MODEL_CONTEXT_TOKENS", "128000"))
+CHARS_PER_TOKEN = 4
+# Page text up to a quarter of the context fits a single call with room to spare
+# for the prompt, the DOM markup around the text and the answer
+CHUNK_CHARS = int(os.getenv("STAGEHAND_CHUNK_CHARS", str(MODEL_CONTEXT_TOKENS * CHARS_PER_TOKEN // 4)))
+CHUNK_CONCURRENCY = int(os.getenv("STAGEHAND_CHUNK_CONCURRENCY", "4"))
+# Merging free-text partial answers is a small job, a cheaper model does it
+REDUCE_MODEL = os.getenv("STAGEHAND_REDUCE_MODEL", "gpt-4o-mini")
+# Pages beyond this many chunks are cut off rather than fanned out further
+MAX_CHUNKS = 40
+
+CHUNK_PROMPT = """You extract information from one part of a long web page.
+
+Task: {task_description}
+Page URL: {website_url}
+
+Part {index} of {count}:
+{content}
+
+Reply with a JSON object with the keys:
+- "relevant": true if this part contains information the task asks for
+- "answer": {answer_spec}
+- "needs_interaction": true if the task requires interacting with the page (clicking, typing, logging in,
+  navigating elsewhere) rather than reading it
+"""
+
+# Tasks that do more than read the page: verbs that are hardly ever anything else, anywhere in the task
+_INTERACTION = re.compile(
+    r"\b(click|tap|fill (in|out)|submit|log in|sign (in|up)|choose|tick|uncheck|toggle|check the (check)?box"
+    r"|scroll|hover|drag|upload|navigate|go to|add to (the )?(cart|basket)|subscribe|purchase)\b",
+    re.IGNORECASE,
+)
+# and words that are just as often nouns ("the order total", "open issues"), only where a clause starts
+_CLAUSE_INTERACTION = re.compile(
+    r"(^|[.;!?]|\b(then|please|first)\b)\s*"
+    r"(press|type|enter|select|open|search|book|buy|order|add|reply|post|download|login|log ?in|sign ?(in|up))\b",
+    re.IGNORECASE,
+)
+# Opening the task's own URL is how every task starts, not an interaction
+_VISIT_URL = re.compile(
+    r"\b(go to|navigate to|open|visit)\s+(the\s+)?(https?://\S+|www\.\S+|[\w-]+(\.[\w-]+)*\.[a-z]{2,}\S*)",
+    re.IGNORECASE,
+)
+
+TEXT_ANSWER = "the information from this part, copied precisely; an empty string if there is none"
+SCHEMA_ANSWER = "an object with the fields of this JSON schema that this part contains, omitting the others: {schema}"
+
+REDUCE_PROMPT = """Combine the partial answers below, each taken from a different part of the same web page,
+into one answer to the task. Drop duplicates, keep every distinct piece of information, and reply with
+the answer only.
+
+Task: {task_description}
+
+{answers}
+"""
+
+
+def is_read_only(task_description: str) -> bool:
+    """Whether the task only reads the page, judged by the absence of interaction verbs."""
+    task = _VISIT_URL.sub("", task_description).strip()
+    return not (_INTERACTION.search(task) or _CLAUSE_INTERACTION.search(task))
+
+
+def split_chunks(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """Split page text into chunks of at most `max_chars`, breaking at headings, then lines."""
+    sections: List[str] = []
+    for line in text.split("\n"):
+        if line.startswith(HEADING_MARK) or not sections:
+            sections.append(line)
+        else:
+            sections[-1] += "\n" + line
+
+    chunks: List[str] = []
+    current = ""
+    for section in sections:
+        for piece in _pieces(section, max_chars):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _pieces(section: str, max_chars: int) -> List[str]:
+    """A section that fits, or the section cut at line boundaries (and overlong lines cut hard)."""
+    if len(section) <= max_chars:
+        return [section]
+    pieces: List[str] = []
+    current = ""
+    for line in section.split("\n"):
+        if current and len(current) + 1 + len(line) > max_chars:
+            room = max_chars - len(current) - 1
+            if len(line) > max_chars and room > 0:
+                # The line is cut anyway, its start fills up the lines before it
+                current, line = f"{current}\n{line[:room]}", line[room:]
+            pieces.append(current)
+            current = ""
+        while len(line) > max_chars:
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class ChunkReport:
+    """How the map-reduce over one page went."""
+
+    def __init__(self, chunks: int, concurrency: int):
+        self.chunks = chunks
+        self.concurrency = concurrency
+        self.chunk_seconds: List[float] = []
+        self.relevant_chunks = 0
+        self.reduce_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add_usage(self, usage) -> None:
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "chunks": self.chunks,
+            "concurrency": self.concurrency,
+            "relevant_chunks": self.relevant_chunks,
+            "chunk_seconds": [round(seconds, 3) for seconds in self.chunk_seconds],
+            "reduce_seconds": round(self.reduce_seconds, 3),
+        }
+
+
+async def chunked_extract(
+    page,
+    task_description: str,
+    website_url: str,
+    extract_schema: Optional[Dict[str, Any]] = None,
+) -> Tuple[Optional[Any], Optional[ChunkReport]]:
+    """
+    Answer the task from the page's text in chunks.
+
+    Returns the merged answer (text, or a dict in extract mode) and the report;
+    the answer is None when the regular act or extract step has to run instead,
+    and both are None when the page fits a single call anyway.
+    """
+    if not CHUNKING_ENABLED or (extract_schema is None and not is_read_only(task_description)):
+        return None, None
+    text = extract_main_text(await page.content())
+    if len(text) <= CHUNK_CHARS:
+        return None, None
+
+    from openai import AsyncOpenAI
+
+    chunks = split_chunks(text, CHUNK_CHARS)[:MAX_CHUNKS]
+    report = ChunkReport(len(chunks), min(CHUNK_CONCURRENCY, len(chunks)))
+    client = AsyncOpenAI(api_key=get_api_key(), base_url=get_base_url())
+    slots = asyncio.Semaphore(max(1, CHUNK_CONCURRENCY))
+    answer_spec = SCHEMA_ANSWER.format(schema=json.dumps(extract_schema)) if extract_schema else TEXT_ANSWER
+
+    async def read_chunk(index: int, content: str) -> Dict[str, Any]:
+        async with slots:
+            started = time.perf_counter()
+            completion = await client.chat.completions.create(
+                model=MODEL_NAME,
+                response_format={"type": "json_object"},
+                temperature=0,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": CHUNK_PROMPT.format(
+                            task_description=task_description,
+                            website_url=website_url,
+                            index=index + 1,
+                            count=len(chunks),
+                            content=content,
+                            answer_spec=answer_spec,
+                        ),
+                    }
+                ],
+            )
+            report.chunk_seconds.append(time.perf_counter() - started)
+            report.add_usage(completion.usage)
+            return json.loads(completion.choices[0].message.content or "{}")
+
+    try:
+        partials = await asyncio.gather(
+            *(read_chunk(index, chunk) for index, chunk in enumerate(chunks)), return_exceptions=True
+        )
+        if any(isinstance(p, BaseException) for p in partials):
+            # A missing chunk may be the one holding the answer
+            return None, report
+        answers = [p.get("answer") for p in partials if p.get("relevant") and p.get("answer")]
+        report.relevant_chunks = len(answers)
+        if not answers or any(p.get("needs_interaction") for p in partials):
+            return None, report
+
+        started = time.perf_counter()
+        if extract_schema:
+            merged = _merge_objects([a for a in answers if isinstance(a, dict)])
+            # Only hand back what the schema accepts, otherwise let Stagehand extract try
+            answer = compile_schema(extract_schema).model_validate(merged).model_dump(mode="json", by_alias=True)
+        else:
+            answer = await _reduce_text(client, task_description, [str(a) for a in answers], report)
+        report.reduce_seconds = time.perf_counter() - started
+        return answer, report
+    except Exception:
+        # Chunking is an optimization, any failure falls back to the regular step
+        return None, report
+    finally:
+        await client.close()
+
+
+def _merge_objects(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge partial objects: lists are concatenated without duplicates, otherwise the first value wins."""
+    merged: Dict[str, Any] = {}
+    for partial in partials:
+        for key, value in partial.items():
+            if value in (None, "", [], {}):
+                continue
+            if key not in merged:
+                merged[key] = value
+            elif isinstance(merged[key], list) and isinstance(value, list):
+                seen = {json.dumps(item, sort_keys=True) for item in merged[key]}
+                merged[key] = merged[key] + [item for item in value if json.dumps(item, sort_keys=True) not in seen]
+    return merged
+
+
+async def _reduce_text(client, task_description: str, answers: List[str], report: ChunkReport) -> str:
+    if len(answers) == 1:
+        return answers[0]
+    numbered = "\n\n".join(f"Partial answer {i + 1}:\n{answer}" for i, answer in enumerate(answers))
+    completion = await client.chat.completions.create(
+        model=REDUCE_MODEL,
+        temperature=0,
+        messages=[{"role": "user", "content": REDUCE_PROMPT.format(task_description=task_description, answers=numbered)}],
+    )
+    report.add_usage(completion.usage)
+    return completion.choices[0].message.content or "\n".join(answers)
@@ -0,0 +1,88 @@
+"""
+Per-phase deadlines of a browser task.
+
+A task runs in three phases, browser init, navigation and act (or extract),
+each with its own deadline. Every phase is additionally capped by what is left of the task's
+overall budget, which travels with the task payload as an absolute wall-clock
+deadline so time spent queueing for a worker or importing the browser stack
+counts against it too.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+TOTAL_TIMEOUT_SECONDS = float(os.getenv("STAGEHAND_TIMEOUT", "180"))
+PHASE_TIMEOUTS = {
+    "init": float(os.getenv("STAGEHAND_INIT_TIMEOUT", "60")),
+    "navigation": float(os.getenv("STAGEHAND_NAVIGATION_TIMEOUT", "30")),
+    # Only taken by sites whose stored session is missing or expired, see `session_store`
+    "login": float(os.getenv("STAGEHAND_LOGIN_TIMEOUT", "90")),
+    "act": float(os.getenv("STAGEHAND_ACT_TIMEOUT", "120")),
+    "extract": float(os.getenv("STAGEHAND_EXTRACT_TIMEOUT", "120")),
+}
+# How long the parent waits past the deadline for the worker to report a phase timeout before killing it
+KILL_GRACE_SECONDS = 10.0
+
+
+class PhaseTimeout(Exception):
+    """A phase of a browser task ran past its deadline."""
+
+    def __init__(self, phase: str, limit: float, timings: Dict[str, float]):
+        self.phase = phase
+        self.limit = limit
+        self.timings = timings
+        completed = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items())
+        super().__init__(
+            f"Timed out in the {phase} phase after {limit:.1f}s" + (f" (completed: {completed})" if completed else "")
+        )
+
+    def response(self) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "data": "",
+            "error": str(self),
+            "error_code": "timeout",
+            "timed_out_phase": self.phase,
+            "timings": dict(self.timings),
+        }
+
+
+class PhaseBudget:
+    """Tracks the overall deadline of one task and how long each completed phase took."""
+
+    def __init__(self, deadline: Optional[float] = None, phase_timeouts: Optional[Dict[str, float]] = None):
+        # A wall-clock timestamp, so it means the same in the parent and in the worker
+        self.deadline = deadline if deadline is not None else time.time() + TOTAL_TIMEOUT_SECONDS
+        self.phase_timeouts = PHASE_TIMEOUTS if phase_timeouts is None else phase_timeouts
+        self.timings: Dict[str, float] = {}
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "PhaseBudget":
+        return cls(payload.get("deadline"))
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.time(), 0.0)
+
+    def limit(self, phase: str) -> float:
+        """Seconds `phase` may take: its own deadline, capped by the remaining budget."""
+        return min(self.phase_timeouts.get(phase, float("inf")), self.remaining())
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        """Run the block as phase `name`, raising PhaseTimeout once its limit is reached."""
+        limit = self.limit(name)
+        if limit <= 0:
+            raise PhaseTimeout(name, 0.0, self.timings)
+        started = time.perf_counter()
+        scope = asyncio.timeout(limit)
+        try:
+            async with scope:
+                yield limit
+        except TimeoutError:
+            if not scope.expired():
+                raise
+            raise PhaseTimeout(name, limit, self.timings) from None
+        # Repeated phases, e.g. init on a worker that is already up, add up
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
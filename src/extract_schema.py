@@ -0,0 +1,116 @@
+"""
+Schemas of the browser's extract mode.
+
+In extract mode the worker calls Stagehand's `page.extract` with a pydantic
+model and returns the typed JSON it produces, instead of `act`'s status
+message. Callers pass a pydantic model or a JSON schema, or the planner
+derives one from the fields it expects. Only the JSON schema travels to the
+worker, where it is compiled back into a model; both steps are cached so a
+batch of tasks sharing a schema builds it once per process.
+"""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, Field, create_model
+
+SchemaLike = Union[Type[BaseModel], Dict[str, Any]]
+
+SCHEMA_CACHE_SIZE = 128
+
+# Compiled models by canonical schema, least recently used first
+_compiled: "OrderedDict[str, Type[BaseModel]]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+_SCALARS = {"string": str, "number": float, "integer": int, "boolean": bool}
+# Field types the planner may ask for
+_PLANNER_TYPES = {
+    "string": {"type": "string"},
+    "number": {"type": "number"},
+    "integer": {"type": "integer"},
+    "boolean": {"type": "boolean"},
+    "list": {"type": "array", "items": {"type": "string"}},
+}
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _model_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    return model.model_json_schema()
+
+
+def to_json_schema(schema: SchemaLike) -> Dict[str, Any]:
+    """The JSON schema of a pydantic model, or `schema` itself if it already is one."""
+    if isinstance(schema, dict):
+        return schema
+    return _model_schema(schema)
+
+
+def schema_key(json_schema: Dict[str, Any]) -> str:
+    """A stable digest of a JSON schema, e.g. to keep cached results of different schemas apart."""
+    return hashlib.sha256(json.dumps(json_schema, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def schema_from_fields(fields: Dict[str, str], title: str = "ExtractedData") -> Dict[str, Any]:
+    """Build a JSON schema from the planner's field names and types (string, number, integer, boolean, list)."""
+    return {
+        "title": title,
+        "type": "object",
+        "properties": {name: dict(_PLANNER_TYPES.get(kind, _PLANNER_TYPES["string"])) for name, kind in fields.items()},
+        "required": list(fields),
+    }
+
+
+def compile_schema(json_schema: Dict[str, Any]) -> Type[BaseModel]:
+    """Turn a JSON schema into a pydantic model, reusing the model compiled for an identical schema."""
+    key = json.dumps(json_schema, sort_keys=True)
+    with _compiled_lock:
+        model = _compiled.get(key)
+        if model is None:
+            model = _model(json_schema, json_schema.get("$defs", {}), json_schema.get("title") or "ExtractedData")
+            _compiled[key] = model
+            if len(_compiled) > SCHEMA_CACHE_SIZE:
+                _compiled.popitem(last=False)
+        else:
+            _compiled.move_to_end(key)
+        return model
+
+
+def _model(schema: Dict[str, Any], defs: Dict[str, Any], name: str) -> Type[BaseModel]:
+    required = set(schema.get("required", []))
+    fields: Dict[str, Tuple[Any, Any]] = {}
+    for prop_name, prop in schema.get("properties", {}).items():
+        field_type = _field_type(prop, defs, prop_name)
+        # Property names need not be identifiers, they are kept as aliases
+        attribute = re.sub(r"\W", "_", prop_name).lstrip("_")
+        if not attribute or attribute[0].isdigit():
+            attribute = "field_" + attribute
+        options = {"description": prop.get("description"), "alias": prop_name if attribute != prop_name else None}
+        if prop_name in required:
+            fields[attribute] = (field_type, Field(..., **options))
+        else:
+            fields[attribute] = (Optional[field_type], Field(default=None, **options))
+    return create_model(re.sub(r"\W", "", name) or "ExtractedData", **fields)
+
+
+def _field_type(prop: Dict[str, Any], defs: Dict[str, Any], name: str) -> Any:
+    if "$ref" in prop:
+        ref = prop["$ref"].rsplit("/", 1)[-1]
+        return _model(defs.get(ref, {}), defs, ref)
+    for combinator in ("anyOf", "oneOf"):
+        if combinator in prop:
+            options = [option for option in prop[combinator] if option.get("type") != "null"]
+            inner = _field_type(options[0], defs, name) if options else Any
+            return Optional[inner] if len(options) < len(prop[combinator]) else inner
+
+    kind = prop.get("type")
+    if kind == "object":
+        if prop.get("properties"):
+            return _model(prop, defs, prop.get("title") or name.title())
+        return Dict[str, Any]
+    if kind == "array":
+        return List[_field_type(prop.get("items", {}), defs, name)]
+    return _SCALARS.get(kind, Any)
@@ -0,0 +1,209 @@
+"""
+HAR record and replay of browser sessions.
+
+With STAGEHAND_HAR_MODE=record every request a task's page lets through is
+fetched by the worker itself, answered from that fetch and written to a HAR
+file keyed by the task. With STAGEHAND_HAR_MODE=replay the same task is served
+entirely from its HAR file through request routing; requests that were not
+recorded are aborted, so the page never contacts the site. Together they
+make page loads reproducible, e.g. for benchmarks against a site that keeps
+changing. LLM calls are not part of the recording, so act, extract and
+observe still need the LLM endpoint.
+
+The files are HAR 1.2 with base64 bodies, so Playwright's `route_from_har`
+and browser devtools can read them as well.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from extract_schema import schema_key
+from result_cache import canonicalize_url, normalize_task
+
+HAR_MODE = os.getenv("STAGEHAND_HAR_MODE", "off")
+HAR_DIR = os.getenv(
+    "STAGEHAND_HAR_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "web-browsing-agent", "har"),
+)
+
+RECORD = "record"
+REPLAY = "replay"
+
+# The recorded body is already decoded, and its length may differ from the original
+_UNREPLAYABLE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+
+class MissingRecording(Exception):
+    """Replay was asked for a task that has no HAR file."""
+
+
+def har_enabled() -> bool:
+    return HAR_MODE in (RECORD, REPLAY)
+
+
+def har_path(task_description: str, website_url: str, extract_schema: Optional[Dict[str, Any]] = None) -> str:
+    """The HAR file of a task; extractions with different schemas are recorded separately."""
+    raw = normalize_task(task_description) + "\n" + canonicalize_url(website_url)
+    if extract_schema is not None:
+        raw += "\n" + schema_key(extract_schema)
+    return os.path.join(HAR_DIR, hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + ".har")
+
+
+def _entry(request, response, body: bytes, started: float) -> Dict[str, Any]:
+    return {
+        "startedDateTime": datetime.fromtimestamp(started, timezone.utc).isoformat(),
+        "time": round((time.time() - started) * 1000, 1),
+        "request": {
+            "method": request.method,
+            "url": request.url,
+            "httpVersion": "HTTP/1.1",
+            "headers": [{"name": k, "value": v} for k, v in request.headers.items()],
+            "queryString": [],
+            "cookies": [],
+            "headersSize": -1,
+            "bodySize": len(request.post_data_buffer or b""),
+        },
+        "response": {
+            "status": response.status,
+            "statusText": response.status_text,
+            "httpVersion": "HTTP/1.1",
+            "headers": response.headers_array,
+            "cookies": [],
+            "content": {
+                "size": len(body),
+                "mimeType": response.headers.get("content-type", ""),
+                "text": base64.b64encode(body).decode("ascii"),
+                "encoding": "base64",
+            },
+            "redirectURL": response.headers.get("location", ""),
+            "headersSize": -1,
+            "bodySize": len(body),
+        },
+        "cache": {},
+        "timings": {"send": 0, "wait": round((time.time() - started) * 1000, 1), "receive": 0},
+    }
+
+
+def _write_har(path: str, entries: List[Dict[str, Any]]) -> None:
+    har = {"log": {"version": "1.2", "creator": {"name": "web-browsing-agent", "version": "1"}, "entries": entries}}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Written aside and renamed, so a concurrent replay never reads half a file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(har, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_har(path: str) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+    """Recorded responses by method and URL, in the order they were recorded."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)["log"]["entries"]
+    except FileNotFoundError:
+        raise MissingRecording(f"No HAR recording for this task at {path}") from None
+    responses: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for entry in entries:
+        key = (entry["request"]["method"], entry["request"]["url"].split("#", 1)[0])
+        responses.setdefault(key, []).append(entry["response"])
+    return responses
+
+
+class HarStats:
+    """Requests a page recorded, or served and aborted during replay."""
+
+    def __init__(self, mode: str, path: str):
+        self.mode = mode
+        self.path = path
+        self.recorded = 0
+        self.recorded_bytes = 0
+        self.replayed = 0
+        self.missed = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        if self.mode == RECORD:
+            return {"mode": self.mode, "path": self.path, "recorded": self.recorded, "bytes": self.recorded_bytes}
+        return {"mode": self.mode, "path": self.path, "replayed": self.replayed, "missed": self.missed}
+
+
+@asynccontextmanager
+async def har_session(
+    page,
+    task_description: str,
+    website_url: str,
+    extract_schema: Optional[Dict[str, Any]] = None,
+    mode: Optional[str] = None,
+):
+    """
+    Record or replay the requests of `page` while the block runs, according to STAGEHAND_HAR_MODE.
+
+    Enter it before other request routes (e.g. `blocked_resources`) so theirs run first and
+    only the requests they fall back on are recorded or replayed.
+    """
+    mode = mode or HAR_MODE
+    if mode not in (RECORD, REPLAY):
+        yield None
+        return
+
+    path = har_path(task_description, website_url, extract_schema)
+    stats = HarStats(mode, path)
+    entries: List[Dict[str, Any]] = []
+    # Raises MissingRecording before the page is touched
+    recorded = load_har(path) if mode == REPLAY else {}
+    served: Dict[Tuple[str, str], int] = {}
+
+    async def record(route, request):
+        started = time.time()
+        try:
+            # Redirects are recorded as such, so the browser follows them through this route again
+            response = await route.fetch(max_redirects=0)
+            body = await response.body()
+        except Exception:
+            # Not recorded, so a replay fails this request the same way
+            await route.abort("failed")
+            return
+        entries.append(_entry(request, response, body, started))
+        stats.recorded += 1
+        stats.recorded_bytes += len(body)
+        await route.fulfill(response=response, body=body)
+
+    async def replay(route, request):
+        key = (request.method, request.url.split("#", 1)[0])
+        responses = recorded.get(key)
+        if not responses:
+            stats.missed += 1
+            await route.abort("internetdisconnected")
+            return
+        # A URL requested repeatedly gets its recorded responses in order, then the last one again
+        index = served.get(key, 0)
+        served[key] = index + 1
+        response = responses[min(index, len(responses) - 1)]
+        content = response.get("content", {})
+        body = content.get("text", "")
+        stats.replayed += 1
+        await route.fulfill(
+            status=response["status"],
+            headers={h["name"]: h["value"] for h in response["headers"] if h["name"].lower() not in _UNREPLAYABLE_HEADERS},
+            body=base64.b64decode(body) if content.get("encoding") == "base64" else body.encode("utf-8"),
+        )
+
+    handler = record if mode == RECORD else replay
+    await page.route("**/*", handler)
+    try:
+        yield stats
+    finally:
+        try:
+            await page.unroute("**/*", handler)
+        except Exception:
+            pass
+        if mode == RECORD and entries:
+            _write_har(path, entries)
@@ -0,0 +1,154 @@
+"""
+Shared HTTP disk cache of the browser sessions.
+
+Every Stagehand session launches Chromium with a throwaway profile, so JS
+bundles, CSS and API responses are downloaded again on every run. With
+STAGEHAND_HTTP_CACHE_DIR set, Chromium's disk cache is pointed at a
+directory that outlives the session, while cookies and storage stay in the
+throwaway profile.
+
+Chromium does not expect two browsers on one cache directory, so the
+directory is split into slots. Each worker process leases a free slot with an
+exclusive file lock for as long as it lives, and runs without a disk cache if
+every slot is taken. The size limit is divided between the slots, and
+Chromium evicts within each.
+
+Any request route (resource blocking, HAR recording) makes Playwright
+disable the cache of the page, and no other CDP session can switch it back
+on. A browser with a cache slot therefore blocks only tracker URLs, through
+`resource_blocking.blocked_urls`, and HAR mode does without the cache. The responses served from
+disk are counted over CDP.
+"""
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Empty disables the shared cache
+HTTP_CACHE_DIR = os.getenv("STAGEHAND_HTTP_CACHE_DIR", "")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("STAGEHAND_HTTP_CACHE_MAX_BYTES", str(1024 * 2**20)))
+HTTP_CACHE_SLOTS = int(os.getenv("STAGEHAND_HTTP_CACHE_SLOTS", str(os.cpu_count() or 4)))
+
+# The slot this process holds: (pid, slot directory, lock file)
+_lease: Optional[Tuple[int, str, Any]] = None
+
+
+def lease_slot() -> Optional[str]:
+    """The cache directory this process may use, leasing a free slot on first call; None if there is none."""
+    global _lease
+    if not HTTP_CACHE_DIR or fcntl is None:
+        return None
+    # A forked child shares its parent's locks, so it leases a slot of its own
+    if _lease is not None and _lease[0] == os.getpid():
+        return _lease[1]
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    for slot in range(max(1, HTTP_CACHE_SLOTS)):
+        lock_file = open(os.path.join(HTTP_CACHE_DIR, f"slot-{slot}.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            continue
+        # Kept open until the process exits, which releases the lock
+        _lease = (os.getpid(), os.path.join(HTTP_CACHE_DIR, f"slot-{slot}"), lock_file)
+        return _lease[1]
+    print(f"💾 All {HTTP_CACHE_SLOTS} HTTP cache slots are in use, this browser runs without a disk cache")
+    return None
+
+
+def cache_active() -> bool:
+    """Whether this process's browser runs on a cache slot, see `chromium_args`."""
+    return _lease is not None and _lease[0] == os.getpid()
+
+
+def chromium_args() -> List[str]:
+    """Chromium flags that put this process's browser on its cache slot, if it has one."""
+    slot_dir = lease_slot()
+    if slot_dir is None:
+        return []
+    slot_bytes = HTTP_CACHE_MAX_BYTES // max(1, HTTP_CACHE_SLOTS)
+    return [f"--disk-cache-dir={slot_dir}", f"--disk-cache-size={slot_bytes}"]
+
+
+class HttpCacheStats:
+    """Responses of one task served from the disk cache, and the bytes that did not have to be transferred."""
+
+    def __init__(self, slot_dir: str):
+        self.slot = os.path.basename(slot_dir)
+        self.requests = 0
+        self.hits = 0
+        self.bytes_transferred = 0
+        self.bytes_saved = 0
+        # Content-Length of each cached response still loading, and the decoded bytes received for it
+        self._cached: Dict[str, Optional[int]] = {}
+        self._decoded: Dict[str, int] = {}
+
+    def on_response(self, params: Dict[str, Any]) -> None:
+        self.requests += 1
+        response = params.get("response", {})
+        if response.get("fromDiskCache"):
+            self.hits += 1
+            headers = {k.lower(): v for k, v in response.get("headers", {}).items()}
+            length = headers.get("content-length", "")
+            self._cached[params["requestId"]] = int(length) if length.isdigit() else None
+
+    def on_data(self, params: Dict[str, Any]) -> None:
+        request_id = params["requestId"]
+        if request_id in self._cached:
+            self._decoded[request_id] = self._decoded.get(request_id, 0) + params.get("dataLength", 0)
+
+    def on_finished(self, params: Dict[str, Any]) -> None:
+        request_id = params["requestId"]
+        if request_id not in self._cached:
+            self.bytes_transferred += int(params.get("encodedDataLength", 0))
+            return
+        length = self._cached.pop(request_id)
+        decoded = self._decoded.pop(request_id, 0)
+        # Without a Content-Length, the decoded size stands in for what would have been transferred
+        self.bytes_saved += length if length is not None else decoded
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "slot": self.slot,
+            "requests": self.requests,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / self.requests, 3) if self.requests else 0.0,
+            "bytes_transferred": self.bytes_transferred,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+@asynccontextmanager
+async def http_cache(page):
+    """
+    Count the disk cache hits of `page` (a Stagehand or Playwright page) while the block runs.
+
+    Yields None when the browser has no cache slot. Hits only happen while no request route is installed on the page.
+    """
+    if not cache_active():
+        yield None
+        return
+
+    stats = HttpCacheStats(_lease[1])
+    # A session of our own, so Stagehand enabling and disabling domains on its session does not interfere
+    playwright_page = getattr(page, "_page", page)
+    session = await playwright_page.context.new_cdp_session(playwright_page)
+    listeners = (
+        ("Network.responseReceived", stats.on_response),
+        ("Network.dataReceived", stats.on_data),
+        ("Network.loadingFinished", stats.on_finished),
+    )
+    try:
+        for event, listener in listeners:
+            session.on(event, listener)
+        await session.send("Network.enable")
+        yield stats
+    finally:
+        try:
+            await session.detach()
+        except Exception:
+            pass
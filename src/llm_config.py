@@ -0,0 +1,63 @@
+"""LLM endpoint settings shared by the browser workers and the HTTP fast path."""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "https://llmfoundry.straive.com/openai/v1/"
+MODEL_NAME = "gpt-4o"
+
+# Idle connections to the endpoint are kept open this long, so calls skip the TCP and TLS handshakes
+KEEPALIVE_SECONDS = float(os.getenv("STAGEHAND_LLM_KEEPALIVE_SECONDS", "120"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("STAGEHAND_LLM_KEEPALIVE_CONNECTIONS", "8"))
+
+
+def get_api_key() -> str:
+    """Return the OpenAI API key the browser sessions should use."""
+    return os.getenv("OPENAI_API_KEY", "")
+
+
+def get_base_url() -> str:
+    """Return the OpenAI-compatible endpoint the browser sessions should use."""
+    return os.getenv("OPENAI_API_BASE", DEFAULT_BASE_URL)
+
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide HTTP client of LLM calls, whose connections to the endpoint stay open between calls."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, keepalive_expiry=KEEPALIVE_SECONDS
+                ),
+                timeout=httpx.Timeout(600.0, connect=10.0),
+                follow_redirects=True,
+            )
+        return _http_client
+
+
+def open_connections(count: int, timeout: float = 10) -> int:
+    """Open `count` keep-alive connections to the endpoint ahead of the first LLM call; returns how many opened."""
+    client = get_http_client()
+    url = get_base_url().rstrip("/") + "/models"
+
+    def touch(_) -> bool:
+        try:
+            # Any answer, even an error status, leaves a connection in the pool
+            client.get(url, headers={"Authorization": f"Bearer {get_api_key()}"}, timeout=timeout)
+        except httpx.HTTPError:
+            return False
+        return True
+
+    if count < 1:
+        return 0
+    # Concurrent requests, so each one needs a connection of its own
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix="llm-warmup") as executor:
+        return sum(executor.map(touch, range(count)))
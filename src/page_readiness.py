@@ -0,0 +1,126 @@
+"""
+When a Stagehand page counts as ready after navigation.
+
+Waiting for the load event is too slow on ad-heavy pages and too early on
+single-page apps that render their data after it. A strategy is chosen per
+domain, or adaptively:
+
+    load               the load event, as Playwright does by default
+    domcontentloaded   the HTML is parsed
+    networkidle        no network connections for 500ms
+    mutation           DOMContentLoaded, then no DOM mutations for a quiet window
+    selector:<css>     DOMContentLoaded, then the selector is attached
+    adaptive           DOMContentLoaded; pages that still look like an empty app
+                       shell additionally wait for DOM mutations to settle
+
+The load event is still watched while the task runs, so every response can
+report how much earlier the page was considered ready than a full load.
+"""
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+READINESS_STRATEGY = os.getenv("STAGEHAND_READINESS", "adaptive")
+# Per-domain strategies as JSON, e.g. {"news.example.com": "domcontentloaded", "app.example.com": "selector:#results"}
+DOMAIN_STRATEGIES: Dict[str, str] = json.loads(os.getenv("STAGEHAND_READINESS_DOMAINS", "{}"))
+QUIET_WINDOW_MS = int(os.getenv("STAGEHAND_READINESS_QUIET_MS", "500"))
+# Visible text below which a parsed page is taken to be an app shell that still has to render
+SHELL_TEXT_CHARS = 200
+
+_PLAYWRIGHT_STATES = ("load", "domcontentloaded", "networkidle")
+
+# Resolves once the DOM has not changed for `quiet` ms, or after `max` ms regardless
+_DOM_QUIET_SCRIPT = """
+([quiet, max]) => new Promise((resolve) => {
+    let timer;
+    const done = () => { observer.disconnect(); resolve(); };
+    const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(done, quiet); });
+    observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    timer = setTimeout(done, quiet);
+    setTimeout(done, max);
+})
+"""
+
+
+def strategy_for(website_url: str) -> str:
+    """The strategy of the site at `website_url`, falling back to its parent domains and then the default."""
+    labels = (urlsplit(website_url).hostname or "").lower().split(".")
+    for i in range(len(labels) - 1):
+        strategy = DOMAIN_STRATEGIES.get(".".join(labels[i:]))
+        if strategy:
+            return strategy
+    return READINESS_STRATEGY
+
+
+class PageReadiness:
+    """Navigates a page with one strategy and times it against the page's load event."""
+
+    def __init__(self, page, strategy: str):
+        self.page = page
+        self.strategy = strategy
+        # The strategy adaptive mode settled on
+        self.chosen = strategy
+        self._started: Optional[float] = None
+        self._ready: Optional[float] = None
+        self._loaded: Optional[float] = None
+
+    def _on_load(self, *_: Any) -> None:
+        if self._loaded is None:
+            self._loaded = time.perf_counter()
+
+    async def navigate(self, website_url: str, limit: float) -> None:
+        """Open `website_url` and wait until it is ready, within `limit` seconds."""
+        self._started = time.perf_counter()
+        # Let the phase deadline fire first so the timeout is attributed to it
+        timeout_ms = (limit + 1) * 1000
+        strategy = self.strategy
+        if strategy in _PLAYWRIGHT_STATES:
+            await self.page.goto(website_url, timeout=timeout_ms, wait_until=strategy)
+        else:
+            await self.page.goto(website_url, timeout=timeout_ms, wait_until="domcontentloaded")
+            # Playwright waits forever on a timeout of 0
+            remaining_ms = max(timeout_ms - (time.perf_counter() - self._started) * 1000, 1)
+            if strategy.startswith("selector:"):
+                await self.page.wait_for_selector(strategy[len("selector:"):], state="attached", timeout=remaining_ms)
+            elif strategy == "mutation" or (strategy == "adaptive" and await self._looks_like_shell()):
+                await self.page.evaluate(_DOM_QUIET_SCRIPT, [QUIET_WINDOW_MS, remaining_ms])
+                self.chosen = "adaptive:mutation" if strategy == "adaptive" else strategy
+            elif strategy == "adaptive":
+                self.chosen = "adaptive:domcontentloaded"
+        self._ready = time.perf_counter()
+
+    async def _looks_like_shell(self) -> bool:
+        text_chars = await self.page.evaluate("() => document.body ? document.body.innerText.trim().length : 0")
+        return text_chars < SHELL_TEXT_CHARS
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The chosen strategy, when the page was ready and loaded, and the seconds saved over waiting for load."""
+        report: Dict[str, Any] = {"strategy": self.chosen}
+        if self._started is None or self._ready is None:
+            return report
+        report["ready_seconds"] = round(self._ready - self._started, 3)
+        if self._loaded is not None:
+            report["load_seconds"] = round(self._loaded - self._started, 3)
+            report["seconds_saved"] = round(max(self._loaded - self._ready, 0.0), 3)
+        else:
+            # The page never finished loading while the task ran, so the saving is at least this much
+            report["seconds_saved"] = round(time.perf_counter() - self._ready, 3)
+            report["load_seconds"] = None
+        return report
+
+
+@asynccontextmanager
+async def page_readiness(page, website_url: str, strategy: Optional[str] = None):
+    """Yield a PageReadiness for `page`, watching its load event until the block exits."""
+    readiness = PageReadiness(page, strategy or strategy_for(website_url))
+    page.on("load", readiness._on_load)
+    try:
+        yield readiness
+    finally:
+        try:
+            page.remove_listener("load", readiness._on_load)
+        except Exception:
+            pass
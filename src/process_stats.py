@@ -0,0 +1,103 @@
+"""Resident memory of a process tree (needs psutil or /proc) and process tree teardown."""
+import os
+import signal
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, memory reporting is skipped without it
+    psutil = None
+
+
+def tree_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Return the RSS in bytes of `pid` (default: this process) and all of its descendants."""
+    if psutil is None:
+        return _proc_tree_rss(pid or os.getpid())
+    try:
+        root = psutil.Process(pid or os.getpid())
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            # Children come and go while we walk the tree
+            pass
+    return total
+
+
+def _proc_tree_rss(pid: int) -> Optional[int]:
+    """`tree_rss` read from /proc, for systems without psutil."""
+    if not os.path.isdir(f"/proc/{pid}"):
+        return None
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for process in [pid] + _descendants(pid):
+        try:
+            with open(f"/proc/{process}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            pass
+    return total
+
+
+def _descendants(pid: int) -> List[int]:
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    # Without psutil, build the tree from /proc where it exists
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, the parent pid is the second field after it
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def _kill(pid: int) -> None:
+    try:
+        os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def kill_process_tree(pid: int) -> None:
+    """
+    Kill `pid`, its process group and all of its descendants.
+
+    Playwright launches Chromium detached into a process group of its own, so
+    killing the worker's group alone would leave the browser running.
+    """
+    descendants = _descendants(pid)
+    if hasattr(os, "killpg"):
+        try:
+            # Only ever matches a group that `pid` leads
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    _kill(pid)
+    for child in descendants:
+        _kill(child)
@@ -0,0 +1,217 @@
+"""
+Request interception profile for Stagehand pages.
+
+Data extraction never needs the images, fonts, video or analytics beacons a
+page pulls in, so these requests are aborted before they reach the network.
+Sites that break without some of them can be allowlisted per domain.
+
+A request route turns off the browser's HTTP cache for the page (see
+`http_cache`), so pages on a shared cache slot use `blocked_urls` instead:
+Chromium drops tracker URLs itself, without a route, and images, media and
+fonts load normally.
+"""
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+BLOCKING_ENABLED = os.getenv("STAGEHAND_BLOCK_RESOURCES", "1") == "1"
+BLOCKED_RESOURCE_TYPES = frozenset(
+    filter(None, os.getenv("STAGEHAND_BLOCKED_RESOURCE_TYPES", "image,media,font").split(","))
+)
+# Extra tracker domains, comma separated, on top of the built-in list
+EXTRA_BLOCKED_DOMAINS = frozenset(filter(None, os.getenv("STAGEHAND_BLOCKED_DOMAINS", "").split(",")))
+# What each site may still load, as JSON, e.g. {"maps.example.com": ["image"], "shop.example.com": ["*"]}.
+# Entries are resource types, "trackers" to let tracker domains through, or "*" to disable blocking.
+BLOCKING_ALLOWLIST: Dict[str, list] = json.loads(os.getenv("STAGEHAND_BLOCKING_ALLOWLIST", "{}"))
+
+TRACKER_DOMAINS = frozenset(
+    {
+        "google-analytics.com",
+        "googletagmanager.com",
+        "googlesyndication.com",
+        "doubleclick.net",
+        "googleadservices.com",
+        "connect.facebook.net",
+        "facebook.com/tr",
+        "hotjar.com",
+        "segment.io",
+        "segment.com",
+        "mixpanel.com",
+        "amplitude.com",
+        "fullstory.com",
+        "newrelic.com",
+        "nr-data.net",
+        "scorecardresearch.com",
+        "quantserve.com",
+        "criteo.com",
+        "taboola.com",
+        "outbrain.com",
+        "adnxs.com",
+        "bat.bing.com",
+        "clarity.ms",
+        "adsrvr.org",
+    }
+)
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def _matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class BlockingProfile:
+    """Decides which requests of a page are aborted."""
+
+    def __init__(
+        self,
+        resource_types: FrozenSet[str] = BLOCKED_RESOURCE_TYPES,
+        tracker_domains: FrozenSet[str] = TRACKER_DOMAINS | EXTRA_BLOCKED_DOMAINS,
+        allowlist: Optional[Dict[str, list]] = None,
+    ):
+        self.resource_types = frozenset(resource_types)
+        # Path-qualified entries such as "facebook.com/tr" only block that path prefix
+        self.tracker_hosts = frozenset(d for d in tracker_domains if "/" not in d)
+        self.tracker_paths = tuple(
+            (domain, "/" + path) for domain, path in (d.split("/", 1) for d in tracker_domains if "/" in d)
+        )
+        self.allowlist = BLOCKING_ALLOWLIST if allowlist is None else allowlist
+
+    def allowed_for(self, website_url: str) -> FrozenSet[str]:
+        """What the site at `website_url` may load, falling back to its parent domains."""
+        labels = _host(website_url).split(".")
+        for i in range(len(labels) - 1):
+            allowed = self.allowlist.get(".".join(labels[i:]))
+            if allowed is not None:
+                return frozenset(allowed)
+        return frozenset()
+
+    def is_tracker(self, request_url: str) -> bool:
+        host = _host(request_url)
+        if _matches(host, self.tracker_hosts):
+            return True
+        path = urlsplit(request_url).path
+        return any(
+            _matches(host, [domain]) and (path == prefix or path.startswith(prefix + "/"))
+            for domain, prefix in self.tracker_paths
+        )
+
+    def tracker_patterns(self) -> List[str]:
+        """URL patterns of the tracker domains, in the wildcard syntax of `Network.setBlockedURLs`."""
+        patterns = []
+        for host in sorted(self.tracker_hosts):
+            patterns += [f"*://{host}/*", f"*://*.{host}/*"]
+        for domain, prefix in self.tracker_paths:
+            for host in (domain, "*." + domain):
+                patterns += [f"*://{host}{prefix}", f"*://{host}{prefix}/*", f"*://{host}{prefix}?*"]
+        return patterns
+
+    def should_block(self, resource_type: str, request_url: str, allowed: FrozenSet[str] = frozenset()) -> bool:
+        if "*" in allowed or request_url.startswith("data:"):
+            return False
+        if resource_type in self.resource_types and resource_type not in allowed:
+            return True
+        return "trackers" not in allowed and self.is_tracker(request_url)
+
+
+class BlockingStats:
+    """Requests a page let through and aborted while the profile was installed."""
+
+    def __init__(self, skipped_types: FrozenSet[str] = frozenset()):
+        self.allowed = 0
+        self.blocked: Dict[str, int] = {}
+        # Resource types the profile would block but that loaded anyway, see `blocked_urls`
+        self.skipped_types = skipped_types
+
+    def as_dict(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "allowed": self.allowed,
+            "blocked": sum(self.blocked.values()),
+            **{f"blocked_{k}": v for k, v in self.blocked.items()},
+        }
+        if self.skipped_types:
+            report["skipped_types"] = sorted(self.skipped_types)
+        return report
+
+
+@asynccontextmanager
+async def blocked_resources(page, website_url: str, profile: Optional[BlockingProfile] = None):
+    """Abort unneeded requests of `page` (a Playwright or Stagehand page, or a context) while the block runs."""
+    if not BLOCKING_ENABLED and profile is None:
+        yield None
+        return
+
+    profile = profile or BlockingProfile()
+    allowed = profile.allowed_for(website_url)
+    stats = BlockingStats()
+
+    async def handle(route, request):
+        if profile.should_block(request.resource_type, request.url, allowed):
+            kind = "tracker" if profile.is_tracker(request.url) else request.resource_type
+            stats.blocked[kind] = stats.blocked.get(kind, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            stats.allowed += 1
+            # Hands the request on to routes registered earlier, such as HAR recording, or the network
+            await route.fallback()
+
+    await page.route("**/*", handle)
+    try:
+        yield stats
+    finally:
+        # Pooled pages are reused, so never leave a handler behind
+        try:
+            await page.unroute("**/*", handle)
+        except Exception:
+            pass
+
+
+@asynccontextmanager
+async def blocked_urls(page, website_url: str, profile: Optional[BlockingProfile] = None):
+    """
+    Abort the tracker requests of `page` (a Stagehand or Playwright page) over CDP while the block runs.
+
+    Unlike `blocked_resources` this installs no request route, so the page keeps its HTTP cache.
+    Resource types cannot be told apart without a route; they load and are reported as skipped.
+    """
+    if not BLOCKING_ENABLED and profile is None:
+        yield None
+        return
+
+    profile = profile or BlockingProfile()
+    allowed = profile.allowed_for(website_url)
+    stats = BlockingStats(skipped_types=profile.resource_types - allowed if "*" not in allowed else frozenset())
+    patterns = [] if "*" in allowed or "trackers" in allowed else profile.tracker_patterns()
+    seen = set()
+
+    def on_request(params: Dict[str, Any]) -> None:
+        # Redirects repeat the request id
+        if params["requestId"] not in seen:
+            seen.add(params["requestId"])
+            stats.allowed += 1
+
+    def on_failed(params: Dict[str, Any]) -> None:
+        # Requests dropped by `Network.setBlockedURLs` fail with the "inspector" reason
+        if params.get("blockedReason") == "inspector":
+            stats.allowed -= 1
+            stats.blocked["tracker"] = stats.blocked.get("tracker", 0) + 1
+
+    # A session of our own, so Stagehand enabling and disabling domains on its session does not interfere
+    playwright_page = getattr(page, "_page", page)
+    session = await playwright_page.context.new_cdp_session(playwright_page)
+    try:
+        session.on("Network.requestWillBeSent", on_request)
+        session.on("Network.loadingFailed", on_failed)
+        await session.send("Network.enable")
+        await session.send("Network.setBlockedURLs", {"urls": patterns})
+        yield stats
+    finally:
+        # The session goes away with its blocked URLs, so pooled pages start clean
+        try:
+            await session.detach()
+        except Exception:
+            pass
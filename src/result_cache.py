@@ -0,0 +1,180 @@
+"""
+Persistent SQLite cache of browser automation results.
+
+Entries are keyed on the normalized task description and the canonicalized
+URL, expire after a per-domain TTL and are evicted least-recently-used once
+the cache grows past its size limit. Only successful results are stored.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+CACHE_ENABLED = os.getenv("STAGEHAND_CACHE_ENABLED", "1") == "1"
+CACHE_PATH = os.getenv(
+    "STAGEHAND_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "web-browsing-agent", "results.sqlite3"),
+)
+CACHE_MAX_BYTES = int(os.getenv("STAGEHAND_CACHE_MAX_BYTES", str(50 * 2**20)))
+DEFAULT_TTL_SECONDS = int(os.getenv("STAGEHAND_CACHE_TTL", "3600"))
+# Per-domain TTLs in seconds as JSON, e.g. {"pandas.pydata.org": 86400, "news.example.com": 300}
+DOMAIN_TTLS: Dict[str, int] = json.loads(os.getenv("STAGEHAND_CACHE_DOMAIN_TTLS", "{}"))
+
+# What a cached response keeps; everything else, such as timings or token usage,
+# is a per-run report that would be misleading when replayed from the cache
+_STORED_KEYS = ("success", "data", "error", "url", "route", "extracted")
+
+# Query parameters that never change what a page shows
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|mc_cid|mc_eid|ref)$", re.IGNORECASE)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_task(task_description: str) -> str:
+    """Lower-case the task, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", task_description).strip().rstrip(".?!").lower()
+
+
+def canonicalize_url(website_url: str) -> str:
+    """Return a canonical form of `website_url` so equivalent URLs share a cache entry."""
+    url = website_url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def ttl_for(domain: str) -> int:
+    """TTL of `domain`, falling back to its parent domains and then to the default."""
+    labels = domain.split(".")
+    for i in range(len(labels) - 1):
+        ttl = DOMAIN_TTLS.get(".".join(labels[i:]))
+        if ttl is not None:
+            return int(ttl)
+    return DEFAULT_TTL_SECONDS
+
+
+class ResultCache:
+    """Thread-safe SQLite result cache with per-domain TTLs and LRU eviction."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL lets several app processes share the cache file
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                domain TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+
+    @staticmethod
+    def key(task_description: str, website_url: str) -> str:
+        raw = normalize_task(task_description) + "\n" + canonicalize_url(website_url)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, task_description: str, website_url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for this task and URL, or None on a miss."""
+        key = self.key(task_description, website_url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self.counters["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, task_description: str, website_url: str, response: Dict[str, Any]) -> None:
+        """Store a successful response and evict least-recently-used entries beyond the size limit."""
+        if not response.get("success"):
+            return
+        domain = urlsplit(canonicalize_url(website_url)).hostname or ""
+        blob = json.dumps({k: v for k, v in response.items() if k in _STORED_KEYS})
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, domain, response, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.key(task_description, website_url), domain, blob, len(blob), now + ttl_for(domain), now),
+            )
+            self.counters["stores"] += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        # Called with the lock held
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.counters["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process plus the current size of the cache."""
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": self.counters["hits"] / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": size,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the process-wide result cache, or None when caching is disabled."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
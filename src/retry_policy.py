@@ -0,0 +1,286 @@
+"""
+Per-domain retries and circuit breakers for browser runs.
+
+One flaky site used to surface as a single "Process Error", after which the
+automation agent's LLM would often call the tool again straight away, on a
+brand-new browser. Browser runs that fail in a way worth retrying (a crashed
+worker, a browser error, or a timeout before the page had loaded) are now
+retried with jittered exponential backoff, as long as what is left of the
+task's deadline still fits the wait and a useful attempt.
+
+Every domain also has a circuit breaker. After `failure_threshold` failed
+attempts in a row it opens, and tasks for the domain fail fast with error
+code "circuit_open" instead of tying up a worker on a dead host. Once
+`cooldown` seconds have passed, a single trial task is let through; its
+outcome closes the breaker or opens it again. Only browser errors and
+timeouts before the page had loaded count against a domain. Failures of the
+LLM endpoint or of the local browser launch are neither retried nor counted,
+so an LLM outage does not open the breaker of every domain, and a crashed
+worker is retried but not counted either.
+
+Policies can be tuned per domain, falling back to parent domains:
+
+    STAGEHAND_RETRY_POLICIES='{"flaky.example.com": {"attempts": 5, "base_delay": 2},
+                               "example.org": {"failure_threshold": 2, "cooldown": 300}}'
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from browser_result import ErrorCode, error_response
+
+# Attempts per task, including the first one
+RETRY_ATTEMPTS = int(os.getenv("STAGEHAND_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("STAGEHAND_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("STAGEHAND_RETRY_MAX_DELAY", "15"))
+# A retry with less than this left of the deadline after its backoff is not worth starting
+MIN_ATTEMPT_SECONDS = float(os.getenv("STAGEHAND_RETRY_MIN_SECONDS", "20"))
+BREAKER_THRESHOLD = int(os.getenv("STAGEHAND_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("STAGEHAND_BREAKER_COOLDOWN", "60"))
+# Per-domain overrides as JSON, see above
+POLICIES: Dict[str, Dict[str, Any]] = json.loads(os.getenv("STAGEHAND_RETRY_POLICIES", "{}"))
+
+# Breaker states reported by `breaker_snapshot`
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_RETRYABLE_CODES = {ErrorCode.WORKER_ERROR.value, ErrorCode.BROWSER_ERROR.value}
+# A timeout later on already spent most of the budget, and may have left the site changed
+_RETRYABLE_TIMEOUT_PHASES = {"init", "navigation"}
+# Failures that say nothing about the site; a worker that crashed or was killed points at this machine
+_NEUTRAL_CODES = {
+    ErrorCode.WORKER_ERROR.value,
+    ErrorCode.CANCELLED.value,
+    ErrorCode.MISSING_API_KEY.value,
+    ErrorCode.INVALID_TASK.value,
+    ErrorCode.NO_RECORDING.value,
+    ErrorCode.LAUNCH_FAILED.value,
+    ErrorCode.LLM_ERROR.value,
+}
+
+
+class RetryPolicy(NamedTuple):
+    """How often and how patiently tasks for one domain are retried, and when its breaker opens."""
+    attempts: int = RETRY_ATTEMPTS
+    base_delay: float = RETRY_BASE_DELAY
+    max_delay: float = RETRY_MAX_DELAY
+    failure_threshold: int = BREAKER_THRESHOLD
+    cooldown: float = BREAKER_COOLDOWN
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before retry number `retry`, with full jitter so retries of many tasks spread out."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+
+def policy_for(website_url: str) -> Tuple[str, RetryPolicy]:
+    """The breaker key and retry policy of `website_url`: its configured domain, else its host name."""
+    host = (urlsplit(website_url).hostname or "").lower()
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        domain = ".".join(labels[i:])
+        if domain in POLICIES:
+            return domain, RetryPolicy(**POLICIES[domain])
+    return host, RetryPolicy()
+
+
+def _error_code(response: Dict[str, Any]) -> str:
+    """The error code of a failed run; a response without one comes from a worker that died mid-task."""
+    return response.get("error_code") or ErrorCode.WORKER_ERROR.value
+
+
+def is_retryable(response: Dict[str, Any]) -> bool:
+    """Whether a failed browser run may succeed when simply run again."""
+    if response.get("success") or response.get("cancelled"):
+        return False
+    code = _error_code(response)
+    if code == ErrorCode.TIMEOUT.value:
+        return response.get("timed_out_phase") in _RETRYABLE_TIMEOUT_PHASES
+    return code in _RETRYABLE_CODES
+
+
+class CircuitBreaker:
+    """Consecutive failures of one domain, and whether tasks for it are let through."""
+
+    def __init__(self, domain: str, policy: RetryPolicy):
+        self.domain = domain
+        self.policy = policy
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.policy.cooldown:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial:
+                # One trial at a time, everything else keeps failing fast until it is back
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, response: Optional[Dict[str, Any]]) -> None:
+        """Count the outcome of an attempt that was let through; None for one that was abandoned."""
+        with self._lock:
+            self._trial = False
+            if response is None or response.get("cancelled"):
+                return
+            code = "" if response.get("success") else _error_code(response)
+            if code in _NEUTRAL_CODES:
+                return
+            if code == ErrorCode.TIMEOUT.value and not response.get("timed_out_phase"):
+                # Ran out of time outside any phase, so nothing is known about how the site did
+                return
+            if not is_retryable(response):
+                # The site answered, even if the task did not work out
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.policy.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                    print(f"🔌 Circuit opened for {self.domain} after {self.failures} failures in a row")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Seconds until a trial task is let through, 0 unless the breaker is open."""
+        with self._lock:
+            return self._retry_after()
+
+    def _retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(self.policy.cooldown - (time.monotonic() - self.opened_at), 0.0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "opens": self.opens,
+                "rejected": self.rejected,
+                "retry_after": round(self._retry_after(), 1),
+            }
+
+
+class BreakerRegistry:
+    """The circuit breakers of every domain seen by this process, and the retries made so far."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.retries = 0
+        self.backoff_seconds = 0.0
+
+    def get(self, domain: str, policy: RetryPolicy) -> CircuitBreaker:
+        with self._lock:
+            if domain not in self._breakers:
+                self._breakers[domain] = CircuitBreaker(domain, policy)
+            return self._breakers[domain]
+
+    def record_retry(self, delay: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = dict(self._breakers)
+            snapshot = {"retries": self.retries, "backoff_seconds": round(self.backoff_seconds, 3)}
+        snapshot["breakers"] = {domain: breaker.as_dict() for domain, breaker in breakers.items()}
+        return snapshot
+
+
+breakers = BreakerRegistry()
+
+
+class Attempts:
+    """The attempts of one browser task, within its deadline and its domain's breaker and policy."""
+
+    def __init__(self, website_url: str, timeout: float):
+        self.website_url = website_url
+        self.domain, self.policy = policy_for(website_url)
+        self.breaker = breakers.get(self.domain, self.policy)
+        self.deadline = time.monotonic() + timeout
+        self.count = 0
+        self.retried: List[str] = []
+        self.backoff_seconds = 0.0
+        self._in_flight = False
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def admit(self) -> bool:
+        """Whether the domain's breaker lets the next attempt through."""
+        if not self.breaker.allow():
+            return False
+        self.count += 1
+        self._in_flight = True
+        return True
+
+    def rejected(self) -> Dict[str, Any]:
+        """The fail-fast response of a task whose domain's breaker is open."""
+        return error_response(
+            f"{self.domain} failed {self.breaker.failures} times in a row, "
+            f"not trying it again for {self.breaker.retry_after():.0f}s",
+            ErrorCode.CIRCUIT_OPEN,
+            retries=self.as_dict(),
+        )
+
+    def retry_delay(self, response: Dict[str, Any]) -> Optional[float]:
+        """Record the attempt's outcome; returns the seconds to back off before retrying, or None to stop."""
+        self._in_flight = False
+        self.breaker.record(response)
+        if not is_retryable(response) or self.count >= self.policy.attempts or self.breaker.state == OPEN:
+            return None
+        delay = self.policy.delay(self.count)
+        # Only worth it if the backoff and a useful attempt still fit in the caller's deadline
+        if self.remaining() - delay < MIN_ATTEMPT_SECONDS:
+            return None
+        self.retried.append(response.get("error_code") or ErrorCode.WORKER_ERROR.value)
+        self.backoff_seconds += delay
+        breakers.record_retry(delay)
+        print(
+            f"🔁 Retrying {self.website_url} in {delay:.1f}s after {self.retried[-1]} "
+            f"(attempt {self.count + 1} of {self.policy.attempts})"
+        )
+        return delay
+
+    def abandon(self) -> None:
+        """Free the breaker's trial slot if the attempt in flight will never be recorded."""
+        if self._in_flight:
+            self._in_flight = False
+            self.breaker.record(None)
+
+    def finish(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """The task's response, with the retries it took when there were any."""
+        if self.retried:
+            response = dict(response, retries=self.as_dict())
+        return response
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "domain": self.domain,
+            "attempts": self.count,
+            "retried": list(self.retried),
+            "backoff_seconds": round(self.backoff_seconds, 3),
+            "breaker": self.breaker.state,
+        }
+
+
+def breaker_snapshot() -> Dict[str, Any]:
+    """Retries and backoff of this process so far, and the breaker state of every domain."""
+    return breakers.snapshot()
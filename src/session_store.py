@@ -0,0 +1,304 @@
+"""
+Authenticated session snapshots.
+
+Logging in through `page.act` costs several LLM-driven steps. For sites
+configured in STAGEHAND_LOGINS, the cookies and localStorage of a logged-in
+session are kept per domain and account, encrypted at rest, and restored
+into every new session before it navigates. The login steps only run again
+when the snapshot is missing or expired, or when the page turns out to be
+logged out anyway:
+
+    STAGEHAND_LOGINS='{"example.com": {
+        "account": "alice",
+        "login_url": "https://example.com/login",
+        "steps": ["type %username% into the email field", "type %password% into the password field",
+                  "click the sign in button"],
+        "variables": {"username": "EXAMPLE_USER", "password": "EXAMPLE_PASSWORD"},
+        "logged_in_selector": "a[href='/logout']",
+        "session_cookies": ["sessionid"]
+    }}'
+
+"variables" maps the placeholders of the steps to environment variables, so
+credentials never reach the LLM or the configuration. "logged_in_selector"
+(or "logged_out_selector") tells whether a page is logged in, and
+"session_cookies" name the cookies whose expiry ends the session; without
+them a snapshot expires after STAGEHAND_SESSION_MAX_AGE.
+
+Snapshots are encrypted with the Fernet key in STAGEHAND_SESSION_KEY, which
+requires the `cryptography` package; without either, nothing is stored and
+every session logs in.
+"""
+import json
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # pragma: no cover - optional dependency
+    Fernet = None
+
+# Per-domain login configuration as JSON, see above
+LOGINS: Dict[str, Dict[str, Any]] = json.loads(os.getenv("STAGEHAND_LOGINS", "{}"))
+SESSION_KEY = os.getenv("STAGEHAND_SESSION_KEY", "")
+SESSION_STORE_PATH = os.getenv(
+    "STAGEHAND_SESSION_STORE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "web-browsing-agent", "sessions.sqlite3"),
+)
+SESSION_MAX_AGE_SECONDS = int(os.getenv("STAGEHAND_SESSION_MAX_AGE", str(7 * 86400)))
+
+# Outcomes reported in a response's "session" field
+RESTORED = "restored"
+MISSING = "missing"
+EXPIRED = "expired"
+
+# Set while a restored snapshot is in use; its localStorage is only filled in while the cookie is there
+MARKER_COOKIE = "stagehand_session"
+
+# Init scripts cannot be removed on the Playwright this project locks, and pool workers keep one context for
+# every task, so each snapshot's script is added once per context and left inert once its session closes
+_context_scripts: "weakref.WeakKeyDictionary[Any, Set[str]]" = weakref.WeakKeyDictionary()
+
+
+class LoginFailed(Exception):
+    """The configured login steps did not leave the page logged in."""
+
+
+def login_config_for(website_url: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """The configured domain and login settings of `website_url`, falling back to its parent domains."""
+    labels = (urlsplit(website_url).hostname or "").lower().split(".")
+    for i in range(len(labels) - 1):
+        domain = ".".join(labels[i:])
+        if domain in LOGINS:
+            return domain, LOGINS[domain]
+    return None, None
+
+
+def _in_domain(host: str, domain: str) -> bool:
+    host = host.lstrip(".").lower()
+    return host == domain or host.endswith("." + domain)
+
+
+class SessionStore:
+    """Thread-safe SQLite store of encrypted storage states, safe to share between processes."""
+
+    def __init__(self, key: str = SESSION_KEY, path: str = SESSION_STORE_PATH):
+        self._fernet = Fernet(key.encode("ascii"))
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                domain TEXT NOT NULL,
+                account TEXT NOT NULL,
+                state BLOB NOT NULL,
+                saved_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (domain, account)
+            )
+            """
+        )
+
+    def get(self, domain: str, account: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Return the stored storage state and the outcome (restored, missing or expired)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state, expires_at FROM sessions WHERE domain = ? AND account = ?", (domain, account)
+            ).fetchone()
+            if row is None:
+                return None, MISSING
+            if row[1] <= time.time():
+                self._db.execute("DELETE FROM sessions WHERE domain = ? AND account = ?", (domain, account))
+                return None, EXPIRED
+        try:
+            return json.loads(self._fernet.decrypt(row[0])), RESTORED
+        except InvalidToken:
+            # Written with another key; useless now
+            self.invalidate(domain, account)
+            return None, MISSING
+
+    def put(self, domain: str, account: str, state: Dict[str, Any], expires_at: float) -> None:
+        blob = self._fernet.encrypt(json.dumps(state).encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (domain, account, state, saved_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (domain, account, blob, time.time(), expires_at),
+            )
+
+    def invalidate(self, domain: str, account: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE domain = ? AND account = ?", (domain, account))
+
+
+class AuthenticatedSession:
+    """Restores, checks and, when needed, re-creates the login of one page."""
+
+    def __init__(self, page, domain: str, config: Dict[str, Any], store: Optional[SessionStore]):
+        self.page = page
+        self.domain = domain
+        self.config = config
+        self.account = config.get("account", "default")
+        self.store = store
+        self.outcome = MISSING
+        self.logged_in: Optional[bool] = None
+        self.login_seconds: Optional[float] = None
+
+    async def restore(self) -> None:
+        """Load the snapshot into the page's context, before anything is navigated."""
+        if self.store is None:
+            return
+        state, self.outcome = self.store.get(self.domain, self.account)
+        if state is None:
+            return
+        context = self.page.context
+        if state.get("cookies"):
+            await context.add_cookies(state["cookies"])
+        origins = {o["origin"]: o["localStorage"] for o in state.get("origins", []) if o.get("localStorage")}
+        if not origins:
+            return
+        origins_json = json.dumps(origins, sort_keys=True)
+        marker = hashlib.sha256(f"{self.domain}\0{self.account}\0{origins_json}".encode("utf-8")).hexdigest()[:32]
+        await context.add_cookies([{"name": MARKER_COOKIE, "value": marker, "domain": "." + self.domain, "path": "/"}])
+        added = _context_scripts.setdefault(context, set())
+        if marker in added:
+            return
+        added.add(marker)
+        # localStorage only exists once a page of the origin is open, so it is filled in as each one loads
+        await context.add_init_script(
+            "(() => { if (!document.cookie.split('; ').includes(%s)) return;"
+            " const items = (%s)[location.origin] || [];"
+            " for (const item of items) localStorage.setItem(item.name, item.value); })()"
+            % (json.dumps(f"{MARKER_COOKIE}={marker}"), origins_json)
+        )
+
+    async def check(self) -> bool:
+        """Whether the current page is logged in."""
+        login_url = self.config.get("login_url")
+        if login_url and self.page.url.split("?", 1)[0].rstrip("/") == login_url.split("?", 1)[0].rstrip("/"):
+            # Redirected to the login form
+            self.logged_in = False
+        elif self.config.get("logged_in_selector"):
+            self.logged_in = await self.page.locator(self.config["logged_in_selector"]).count() > 0
+        elif self.config.get("logged_out_selector"):
+            self.logged_in = await self.page.locator(self.config["logged_out_selector"]).count() == 0
+        else:
+            # Nothing to check against, a restored snapshot is trusted until it expires
+            self.logged_in = self.outcome == RESTORED
+        if not self.logged_in and self.outcome == RESTORED:
+            # The site ended the session before the snapshot expired
+            self.outcome = EXPIRED
+            if self.store is not None:
+                self.store.invalidate(self.domain, self.account)
+        return self.logged_in
+
+    async def login(self, limit: float) -> None:
+        """Run the configured login steps and store the resulting session."""
+        started = time.perf_counter()
+        timeout_ms = (limit + 1) * 1000
+        await self.page.goto(self.config["login_url"], timeout=timeout_ms, wait_until="domcontentloaded")
+        variables = {name: os.getenv(env, "") for name, env in self.config.get("variables", {}).items()}
+        for step in self.config.get("steps", []):
+            result = await self.page.act(step, variables=variables)
+            if getattr(result, "success", True) is False:
+                raise LoginFailed(f"Login step failed: {step}")
+        if self.config.get("logged_in_selector"):
+            # Playwright waits forever on a timeout of 0
+            remaining_ms = max(timeout_ms - (time.perf_counter() - started) * 1000, 1)
+            try:
+                await self.page.wait_for_selector(self.config["logged_in_selector"], timeout=remaining_ms)
+            except Exception:
+                raise LoginFailed(f"Still logged out after the login steps for {self.domain}") from None
+        self.logged_in = True
+        self.login_seconds = time.perf_counter() - started
+        await self.save()
+
+    async def save(self) -> None:
+        """Store the domain's cookies and localStorage of the page's context."""
+        if self.store is None:
+            return
+        state = await self.page.context.storage_state()
+        state = {
+            "cookies": [c for c in state.get("cookies", []) if _in_domain(c.get("domain", ""), self.domain)],
+            "origins": [o for o in state.get("origins", []) if _in_domain(urlsplit(o["origin"]).hostname or "", self.domain)],
+        }
+        self.store.put(self.domain, self.account, state, self._expires_at(state))
+
+    def _expires_at(self, state: Dict[str, Any]) -> float:
+        expires_at = time.time() + SESSION_MAX_AGE_SECONDS
+        names = set(self.config.get("session_cookies", []))
+        for cookie in state["cookies"]:
+            # -1 marks a cookie that lives as long as the browser, which the snapshot outlives anyway
+            if cookie.get("name") in names and cookie.get("expires", -1) > 0:
+                expires_at = min(expires_at, cookie["expires"])
+        return expires_at
+
+    async def close(self) -> None:
+        """Remove the domain's cookies and localStorage, so later tasks on a shared context do not inherit them."""
+        try:
+            if _in_domain(urlsplit(self.page.url).hostname or "", self.domain):
+                await self.page.evaluate("localStorage.clear()")
+        except Exception:
+            # Closed page, or an opaque origin without localStorage
+            pass
+        try:
+            # Also drops the marker cookie, so this session's init script no longer fills anything in
+            await self.page.context.clear_cookies(domain=re.compile(r"(^|\.)%s$" % re.escape(self.domain)))
+        except Exception as e:
+            print(f"⚠️ Could not clear the session cookies of {self.domain}: {e}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"domain": self.domain, "account": self.account, "snapshot": self.outcome}
+        report["logged_in"] = self.logged_in
+        if self.login_seconds is not None:
+            report["login_seconds"] = round(self.login_seconds, 3)
+        return report
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """Return this process's session store, or None when snapshots cannot be encrypted."""
+    global _store
+    if not SESSION_KEY or Fernet is None:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+        return _store
+
+
+@asynccontextmanager
+async def authenticated_session(page, website_url: str):
+    """
+    Yield an AuthenticatedSession with the snapshot of `website_url`'s site restored into `page`,
+    or None if the site has no login configured.
+
+    A session still logged in when the block exits is stored again, keeping rolling sessions fresh.
+    """
+    domain, config = login_config_for(website_url)
+    if config is None:
+        yield None
+        return
+
+    if get_session_store() is None:
+        print(f"🔑 No STAGEHAND_SESSION_KEY or cryptography package, the session of {domain} is not kept")
+    session = AuthenticatedSession(page, domain, config, get_session_store())
+    await session.restore()
+    try:
+        yield session
+        if session.logged_in:
+            await session.save()
+    finally:
+        await session.close()
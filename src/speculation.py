@@ -0,0 +1,62 @@
+"""
+Speculative navigation while a task is planned.
+
+When the user's query already names a URL, the flow does not wait for the
+planner before touching the browser: a pool worker starts its browser and
+opens the URL right away. If the plan settles on the same URL, the task runs
+on that warm page; otherwise the page is discarded. These counters show how
+often the guess was right and how much of the init and navigation time it
+took off the tasks it was right for.
+"""
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+SPECULATION_ENABLED = os.getenv("STAGEHAND_SPECULATE", "1") == "1"
+
+_URL = re.compile(r"https?://[^\s<>\"'`]+", re.IGNORECASE)
+
+
+def url_in_query(query: str) -> Optional[str]:
+    """The first http(s) URL in the query, without trailing punctuation."""
+    match = _URL.search(query or "")
+    return match.group(0).rstrip(".,;:!?)]}") if match else None
+
+
+class SpeculationStats:
+    """How many speculative navigations were used and discarded, and the seconds they saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def record_start(self) -> None:
+        with self._lock:
+            self.started += 1
+
+    def record_hit(self, seconds_saved: float) -> None:
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += seconds_saved
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            settled = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / settled, 3) if settled else 0.0,
+                "seconds_saved": round(self.seconds_saved, 3),
+            }
+
+
+stats = SpeculationStats()
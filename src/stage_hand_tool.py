@@ -1,143 +1,755 @@
 import subprocess
+import asyncio
 import json
-import tempfile
 import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
 
-def browser_automation(task_description: str, website_url: str) -> str:
-    """Run browser automation in a separate process to avoid threading issues."""
-    
-    # Create a temporary script to run browser automation
-    script_content = f'''
-import os
-import asyncio
-import sys
-import json
-import nest_asyncio
-from stagehand import Stagehand, StagehandConfig
+from browser_pool import Speculation, get_pool
+from browser_result import BrowserResult, ErrorCode, error_response
+from chunked_extract import is_read_only
+from extract_schema import SchemaLike, schema_key, to_json_schema
+from har_recording import har_enabled
+from cancellation import CancellationToken
+from deadlines import KILL_GRACE_SECONDS, TOTAL_TIMEOUT_SECONDS
+from result_cache import get_result_cache
+from retry_policy import Attempts, breaker_snapshot
+from speculation import SPECULATION_ENABLED, stats as speculation_stats
+from process_stats import kill_process_tree
+from static_fetch import FAST_PATH_ENABLED, try_fast_path, stats as fast_path_stats
+from worker_events import RESULT, EventCallback, EventPipe, dispatch
+from worker_logs import OutputCapture
+import stagehand_zygote
+
+# "pool" reuses long-lived browser workers, "zygote" forks a child per call from a
+# process with the browser stack pre-imported, "subprocess" starts a fresh interpreter per call
+EXECUTION_MODE = os.getenv("STAGEHAND_EXECUTION_MODE", "pool")
+
+# Directory holding the `stagehand_worker` module run by the subprocess mode
+WORKER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Overall budget of a browser task, retries included; init, navigation and act also have their own deadlines
+TIMEOUT_SECONDS = TOTAL_TIMEOUT_SECONDS
+
+# How long to wait for the output and event channels to drain once a subprocess worker has exited
+DRAIN_SECONDS = 5
+RESPONSE_LINE_LIMIT = 2**22
+
+BATCH_CONCURRENCY = int(os.getenv("STAGEHAND_BATCH_CONCURRENCY", "4"))
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one item of a `browser_automation_many` batch."""
+    index: int
+    task_description: str
+    website_url: str
+    result: str
+
+
+def browser_automation(
+    task_description: str,
+    website_url: str,
+    use_cache: bool = True,
+    cancel_token: Optional[CancellationToken] = None,
+    on_event: Optional[EventCallback] = None,
+    schema: Optional[SchemaLike] = None,
+) -> str:
+    """
+    Run browser automation in a separate process to avoid threading issues.
+
+    Successful results are served from the result cache when possible; pass
+    `use_cache=False` to always run a fresh browser session. Cancelling
+    `cancel_token` kills the processes running the browser and returns at once.
+    `on_event` receives the worker's progress events (see `worker_events`) as
+    they happen, from a background thread, and always ends with a "result" event.
+    With a pydantic model or JSON `schema` the page is read with Stagehand's
+    `extract` and the result carries the typed JSON (see `extract_schema`).
+    """
+    return run_browser_task(task_description, website_url, use_cache, cancel_token, on_event, schema).to_text()
+
+
+def run_browser_task(
+    task_description: str,
+    website_url: str,
+    use_cache: bool = True,
+    cancel_token: Optional[CancellationToken] = None,
+    on_event: Optional[EventCallback] = None,
+    schema: Optional[SchemaLike] = None,
+) -> BrowserResult:
+    """Like `browser_automation`, but return the typed result instead of text."""
+    extract_schema = to_json_schema(schema) if schema is not None else None
+    # Recorded and replayed runs have to reach the browser, see `har_recording`
+    use_cache = use_cache and not har_enabled()
+    cache_task = _cache_task(task_description, extract_schema)
+    cached = _cached_response(cache_task, website_url, use_cache)
+    if cached is not None:
+        return _finish(cache_task, website_url, cached, False, on_event, cached=True)
+    if cancel_token is not None and cancel_token.cancelled:
+        return _finish(cache_task, website_url, _cancelled_response(cancel_token), False, on_event)
+
+    # The fast path answers in free text, typed extraction always needs the browser. Interactive
+    # tasks would only pay for an HTTP fetch and an LLM call before escalating anyway
+    use_fast_path = FAST_PATH_ENABLED and extract_schema is None and not har_enabled() and is_read_only(task_description)
+    response = try_fast_path(task_description, website_url) if use_fast_path else None
+    if response is None:
+        started = time.perf_counter()
+        response = _run_in_browser(task_description, website_url, cancel_token, on_event, extract_schema)
+        if not response.get("cancelled"):
+            fast_path_stats.record_browser_run(time.perf_counter() - started)
+
+    return _finish(cache_task, website_url, response, use_cache, on_event)
+
+
+def browser_automation_many(
+    tasks: Iterable[Tuple[str, str]],
+    max_concurrency: int = BATCH_CONCURRENCY,
+    use_cache: bool = True,
+    cancel_token: Optional[CancellationToken] = None,
+    schema: Optional[SchemaLike] = None,
+) -> Iterator[BatchResult]:
+    """
+    Run many (task_description, website_url) pairs with bounded concurrency.
+
+    Results are yielded as they complete, not in input order; `index` gives the
+    position of the pair in `tasks`. A failing item is reported in its own result
+    and never aborts the rest of the batch. In pool mode concurrency is also
+    capped at the pool capacity, so queued items never time out waiting for a worker.
+    Cancelling `cancel_token` aborts the running items and fails the rest quickly.
+    A `schema` applies to every item; it is converted and compiled only once per process.
+    Closing the iterator early cancels the items still running, without waiting for them.
+    """
+    if EXECUTION_MODE == "pool":
+        max_concurrency = min(max_concurrency, get_pool().capacity)
+    pairs = enumerate(tasks)
+    # Cancelled with the caller's token, or when the caller stops iterating
+    batch_token = CancellationToken()
+    unregister = cancel_token.on_cancel(lambda: batch_token.cancel(cancel_token.reason)) if cancel_token else None
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="browser-batch")
+    running = {}
+
+    def schedule_next() -> bool:
+        try:
+            index, item = next(pairs)
+        except StopIteration:
+            return False
+        try:
+            task_description, website_url = _batch_item(item)
+        except ValueError as e:
+            future: Future = Future()
+            future.set_exception(e)
+            running[future] = (index, "", "")
+            return True
+        future = executor.submit(
+            browser_automation, task_description, website_url, use_cache, batch_token, None, schema
+        )
+        running[future] = (index, task_description, website_url)
+        return True
+
+    try:
+        while len(running) < max_concurrency and schedule_next():
+            pass
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, task_description, website_url = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = f"Batch Item Error: {str(e)}"
+                yield BatchResult(index, task_description, website_url, result)
+                schedule_next()
+    finally:
+        if unregister is not None:
+            unregister()
+        if running:
+            batch_token.cancel("Batch was closed")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _batch_item(item: Any) -> Tuple[str, str]:
+    """The (task_description, website_url) pair of a batch item, or ValueError for anything else."""
+    if not isinstance(item, (tuple, list)) or len(item) != 2 or not all(isinstance(part, str) for part in item):
+        raise ValueError(f"Expected a (task_description, website_url) pair, got {item!r}"[:500])
+    return item[0], item[1]
+
+
+async def browser_automation_async(
+    task_description: str,
+    website_url: str,
+    use_cache: bool = True,
+    cancel_token: Optional[CancellationToken] = None,
+    on_event: Optional[EventCallback] = None,
+    schema: Optional[SchemaLike] = None,
+) -> str:
+    """
+    Run browser automation without blocking the event loop.
+
+    Cancelling the awaiting task, or `cancel_token` from any thread, kills the
+    processes running the browser. `on_event` receives progress events as in
+    `browser_automation`.
+    """
+    result = await run_browser_task_async(task_description, website_url, use_cache, cancel_token, on_event, schema)
+    return result.to_text()
 
-# Disable CrewAI telemetry
-os.environ["OTEL_SDK_DISABLED"] = "true"
-nest_asyncio.apply()
 
-async def main():
-    stagehand = None
+async def run_browser_task_async(
+    task_description: str,
+    website_url: str,
+    use_cache: bool = True,
+    cancel_token: Optional[CancellationToken] = None,
+    on_event: Optional[EventCallback] = None,
+    schema: Optional[SchemaLike] = None,
+    speculation: Optional[Speculation] = None,
+) -> BrowserResult:
+    """
+    Like `browser_automation_async`, but return the typed result instead of text.
+
+    A `speculation` from `speculate` for the same URL runs the task on its warm page;
+    one for another URL, or one the task turns out not to need, is discarded.
+    """
+    if speculation is not None and not speculation.matches(website_url):
+        discard_speculation(speculation)
+        speculation = None
     try:
-        api_key = "{os.getenv("OPENAI_API_KEY", "")}"
-        base_url = "{os.getenv("OPENAI_API_BASE", "https://llmfoundry.straive.com/openai/v1/")}"
-        
-        if not api_key:
-            result = {{"success": False, "data": "", "error": "OPENAI_API_KEY not set"}}
-            print(json.dumps(result))
-            return
-        
-        config = StagehandConfig(
-            env="LOCAL",
-            model_name="gpt-4o",
-            self_heal=True,
-            system_prompt="You are a browser automation assistant that extracts specific information accurately.",
-            model_client_options={{
-                "apiKey": api_key,
-                "baseURL": base_url
-            }},
-            verbose=1,
+        return await _run_browser_task_async(
+            task_description, website_url, use_cache, cancel_token, on_event, schema, speculation
         )
-        
-        stagehand = Stagehand(config)
-        await stagehand.init()
-        await stagehand.page.goto("{website_url}")
-        
-        # Use page.act instead of extract to avoid schema issues
-        enhanced_instruction = """
-{task_description}
-
-Instructions:
-1. Navigate to relevant sections if needed
-2. Extract specific data requested
-3. Provide precise information, not summaries and its most importnat part
-4. Focus on factual data extraction
-5. Return the exact information found
-"""
-        
-        # Use act method which is more reliable
-        result = await stagehand.page.act(enhanced_instruction)
-        
-        if result:
-            response = {{
-                "success": True, 
-                "data": str(result),
-                "error": ""
-            }}
+    finally:
+        if speculation is not None:
+            discard_speculation(speculation)
+
+
+async def _run_browser_task_async(
+    task_description: str,
+    website_url: str,
+    use_cache: bool,
+    cancel_token: Optional[CancellationToken],
+    on_event: Optional[EventCallback],
+    schema: Optional[SchemaLike],
+    speculation: Optional[Speculation],
+) -> BrowserResult:
+    extract_schema = to_json_schema(schema) if schema is not None else None
+    # Recorded and replayed runs have to reach the browser, see `har_recording`
+    use_cache = use_cache and not har_enabled()
+    cache_task = _cache_task(task_description, extract_schema)
+    cached = _cached_response(cache_task, website_url, use_cache)
+    if cached is not None:
+        return _finish(cache_task, website_url, cached, False, on_event, cached=True)
+    if cancel_token is not None and cancel_token.cancelled:
+        return _finish(cache_task, website_url, _cancelled_response(cancel_token), False, on_event)
+
+    response = None
+    if FAST_PATH_ENABLED and extract_schema is None and not har_enabled() and is_read_only(task_description):
+        response = await asyncio.to_thread(try_fast_path, task_description, website_url)
+    if response is None:
+        started = time.perf_counter()
+        response = await _run_in_browser_async(
+            task_description, website_url, cancel_token, on_event, extract_schema, speculation
+        )
+        if not response.get("cancelled"):
+            fast_path_stats.record_browser_run(time.perf_counter() - started)
+        if response.get("speculation"):
+            speculation_stats.record_hit(response["speculation"]["seconds_saved"])
+
+    return _finish(cache_task, website_url, response, use_cache, on_event)
+
+
+def speculate(website_url: str) -> Optional[Speculation]:
+    """
+    Start a browser and open `website_url` before the task for it is known, see `speculation`.
+
+    Pass the result to `run_browser_task_async`. None outside `pool` mode, or when no worker is free.
+    """
+    if not SPECULATION_ENABLED or EXECUTION_MODE != "pool":
+        return None
+    speculation = get_pool().speculate(website_url, TIMEOUT_SECONDS)
+    if speculation is not None:
+        speculation_stats.record_start()
+    return speculation
+
+
+def speculation_metrics() -> Dict[str, Any]:
+    """Speculative navigations started, used and discarded, their hit rate and the seconds they saved."""
+    return speculation_stats.snapshot()
+
+
+def discard_speculation(speculation: Speculation) -> None:
+    """Give up on a speculation from `speculate`, counting it as a miss unless it was already used or discarded."""
+    if speculation.discard():
+        speculation_stats.record_miss()
+
+
+def warm_browsers(count: int, timeout: float = TIMEOUT_SECONDS) -> int:
+    """
+    Get browsers ready before the first task arrives; returns how many are up.
+
+    Fills the pool with `count` started workers in `pool` mode. In `zygote` mode the
+    zygote is started, which imports the browser stack but launches no browser.
+    """
+    if EXECUTION_MODE == "pool":
+        return get_pool().warm(count, timeout)
+    if not _uses_subprocess():
+        stagehand_zygote.get_zygote().warm()
+    return 0
+
+
+def breaker_metrics() -> Dict[str, Any]:
+    """Retries and backoff so far, and the circuit breaker state of every domain, see `retry_policy`."""
+    return breaker_snapshot()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Recycle metrics and live workers of the browser pool, empty outside `pool` mode."""
+    return get_pool().stats() if EXECUTION_MODE == "pool" else {}
+
+
+def _run_in_browser(
+    task_description: str,
+    website_url: str,
+    cancel_token: Optional[CancellationToken] = None,
+    on_event: Optional[EventCallback] = None,
+    extract_schema: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run the task in a browser session, retrying failures its domain's policy allows, see `retry_policy`."""
+    attempts = Attempts(website_url, TIMEOUT_SECONDS)
+    if not attempts.admit():
+        return attempts.rejected()
+    try:
+        while True:
+            response = _run_attempt(
+                task_description, website_url, cancel_token, on_event, extract_schema, attempts.remaining()
+            )
+            delay = attempts.retry_delay(response)
+            if delay is None:
+                return attempts.finish(response)
+            if cancel_token is None:
+                time.sleep(delay)
+            elif cancel_token.wait(delay):
+                return _cancelled_response(cancel_token)
+            if not attempts.admit():
+                # The breaker opened meanwhile, report the last failure
+                return attempts.finish(response)
+    finally:
+        attempts.abandon()
+
+
+def _run_attempt(
+    task_description: str,
+    website_url: str,
+    cancel_token: Optional[CancellationToken],
+    on_event: Optional[EventCallback],
+    extract_schema: Optional[Dict[str, Any]],
+    timeout: float,
+) -> Dict[str, Any]:
+    """Run the task once in a browser session using the configured execution mode, within `timeout` seconds."""
+    if _uses_subprocess():
+        return _run_in_subprocess(task_description, website_url, cancel_token, on_event, extract_schema, timeout)
+    try:
+        if EXECUTION_MODE == "zygote":
+            task = stagehand_zygote.get_zygote().start(task_description, website_url, timeout, on_event, extract_schema)
         else:
-            response = {{
-                "success": False,
-                "data": "",
-                "error": "No data could be extracted from the page"
-            }}
-        
-        print(json.dumps(response))
-        
+            task = get_pool().submit(task_description, website_url, timeout, on_event, extract_schema)
+        with _cancelling(cancel_token, task.cancel):
+            # The worker reports which phase timed out itself, it is only killed once it overruns the budget anyway
+            response = task.result(timeout + KILL_GRACE_SECONDS)
+    except TimeoutError:
+        response = _error_response(f"Browser automation timed out after {timeout:.0f} seconds", ErrorCode.TIMEOUT)
     except Exception as e:
-        error_response = {{
-            "success": False,
-            "data": "",
-            "error": str(e)
-        }}
-        print(json.dumps(error_response))
-    
+        response = _error_response(f"Process Error: {str(e)}")
+    if cancel_token is not None and cancel_token.cancelled:
+        # Whatever the killed worker managed to report is not wanted any more
+        return _cancelled_response(cancel_token)
+    return response
+
+
+async def _run_in_browser_async(
+    task_description: str,
+    website_url: str,
+    cancel_token: Optional[CancellationToken] = None,
+    on_event: Optional[EventCallback] = None,
+    extract_schema: Optional[Dict[str, Any]] = None,
+    speculation: Optional[Speculation] = None,
+) -> Dict[str, Any]:
+    """Run the task in a browser session, cancelling it when `cancel_token` is cancelled from any thread."""
+    run = asyncio.ensure_future(_dispatch_async(task_description, website_url, on_event, extract_schema, speculation))
+    if cancel_token is None:
+        return await run
+
+    loop = asyncio.get_running_loop()
+    with cancel_token.registered(lambda: loop.call_soon_threadsafe(run.cancel)):
+        try:
+            return await run
+        except asyncio.CancelledError:
+            if not cancel_token.cancelled:
+                raise
+            return _cancelled_response(cancel_token)
+
+
+async def _dispatch_async(
+    task_description: str,
+    website_url: str,
+    on_event: Optional[EventCallback] = None,
+    extract_schema: Optional[Dict[str, Any]] = None,
+    speculation: Optional[Speculation] = None,
+) -> Dict[str, Any]:
+    """Like `_run_in_browser`, without blocking the event loop; the first attempt runs on `speculation` if given."""
+    attempts = Attempts(website_url, TIMEOUT_SECONDS)
+    if not attempts.admit():
+        return attempts.rejected()
+    try:
+        while True:
+            response = await _dispatch_attempt_async(
+                task_description, website_url, on_event, extract_schema, speculation, attempts.remaining()
+            )
+            speculation = None
+            delay = attempts.retry_delay(response)
+            if delay is None:
+                return attempts.finish(response)
+            await asyncio.sleep(delay)
+            if not attempts.admit():
+                # The breaker opened meanwhile, report the last failure
+                return attempts.finish(response)
     finally:
-        if stagehand:
+        attempts.abandon()
+
+
+async def _dispatch_attempt_async(
+    task_description: str,
+    website_url: str,
+    on_event: Optional[EventCallback],
+    extract_schema: Optional[Dict[str, Any]],
+    speculation: Optional[Speculation],
+    timeout: float,
+) -> Dict[str, Any]:
+    """Run the task once in a browser session within `timeout` seconds, on the warm page of `speculation` if given."""
+    if _uses_subprocess():
+        response = await _run_in_subprocess_async(task_description, website_url, on_event, extract_schema, timeout)
+    else:
+        try:
+            # Only waiting for a free worker or a fork blocks, keep that off the loop
+            if EXECUTION_MODE == "zygote":
+                task = await asyncio.to_thread(
+                    stagehand_zygote.get_zygote().start,
+                    task_description,
+                    website_url,
+                    timeout,
+                    on_event,
+                    extract_schema,
+                )
+                pending = asyncio.ensure_future(asyncio.to_thread(task.result, timeout + KILL_GRACE_SECONDS))
+            else:
+                if speculation is not None:
+                    task = speculation.claim(task_description, website_url, timeout, on_event, extract_schema)
+                else:
+                    task = await asyncio.to_thread(
+                        get_pool().submit, task_description, website_url, timeout, on_event, extract_schema
+                    )
+                pending = asyncio.wrap_future(task.future)
+
             try:
-                await stagehand.close()
-            except Exception as cleanup_error:
-                pass
-
-if __name__ == "__main__":
-    asyncio.run(main())
-'''
-    
+                response = await asyncio.wait_for(pending, timeout + KILL_GRACE_SECONDS)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                task.cancel()
+                raise
+        except (TimeoutError, asyncio.TimeoutError):
+            response = _error_response(f"Browser automation timed out after {timeout:.0f} seconds", ErrorCode.TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = _error_response(f"Process Error: {str(e)}")
+        if response.get("discarded"):
+            # The worker gave up on the speculation before the task arrived, run it like any other
+            speculation_stats.record_miss()
+            return await _dispatch_attempt_async(task_description, website_url, on_event, extract_schema, None, timeout)
+    return response
+
+
+def _uses_subprocess() -> bool:
+    return EXECUTION_MODE == "subprocess" or (EXECUTION_MODE == "zygote" and not stagehand_zygote.SUPPORTED)
+
+
+def _error_response(error: str, code: ErrorCode = ErrorCode.WORKER_ERROR) -> Dict[str, Any]:
+    return error_response(error, code)
+
+
+def _cancelled_response(cancel_token: CancellationToken) -> Dict[str, Any]:
+    return error_response(f"Task was cancelled: {cancel_token.reason}", ErrorCode.CANCELLED, cancelled=True)
+
+
+def _cancelling(cancel_token: Optional[CancellationToken], callback):
+    """Register `callback` on the token for the duration of a block, if there is a token."""
+    return cancel_token.registered(callback) if cancel_token is not None else nullcontext()
+
+
+def _cache_task(task_description: str, extract_schema: Optional[Dict[str, Any]]) -> str:
+    """The task as the result cache sees it; extractions with different schemas are different tasks."""
+    if extract_schema is None:
+        return task_description
+    return f"{task_description}\n[schema {schema_key(extract_schema)}]"
+
+
+def _cached_response(task_description: str, website_url: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+    cache = get_result_cache() if use_cache else None
+    if cache is None:
+        return None
+    response = cache.get(task_description, website_url)
+    if response is not None:
+        print(f"⚡ Result cache hit for {website_url}")
+    return response
+
+
+def _store_response(task_description: str, website_url: str, response: Dict[str, Any], use_cache: bool) -> None:
+    cache = get_result_cache() if use_cache else None
+    if cache is not None:
+        cache.put(task_description, website_url, response)
+
+
+def _finish(
+    task_description: str,
+    website_url: str,
+    response: Dict[str, Any],
+    use_cache: bool,
+    on_event: Optional[EventCallback],
+    cached: bool = False,
+) -> BrowserResult:
+    """Cache the response, report it as the final "result" event and turn it into a result."""
+    _store_response(task_description, website_url, response, use_cache)
+    dispatch(on_event, {"event": RESULT, "response": response})
+    _log_metrics(response)
+    return BrowserResult.from_response(response, cached)
+
+
+def _log_metrics(response: Dict[str, Any]) -> None:
+    """Print the measurements a worker attached to its response."""
+    timings = response.get("timings")
+    if timings:
+        print("⏱️ Browser worker timings: " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in timings.items()))
+    memory = response.get("memory")
+    if memory:
+        print(
+            f"🧠 Browser memory: {memory['browser_rss_mb']} MB total, "
+            f"{memory['rss_per_context_mb']} MB per context ({memory['active_contexts']} open)"
+        )
+
+    blocking = response.get("blocking")
+    if blocking:
+        # Browsers on the shared HTTP cache only block trackers
+        skipped = blocking.get("skipped_types")
+        skipped = f" ({', '.join(skipped)} not blocked because of the HTTP cache)" if skipped else ""
+        print(f"🚫 Blocked {blocking['blocked']} of {blocking['blocked'] + blocking['allowed']} requests{skipped}")
+
+    disk_cache = response.get("http_cache")
+    if disk_cache and disk_cache["requests"]:
+        print(
+            f"💾 HTTP cache {disk_cache['slot']}: {disk_cache['hits']}/{disk_cache['requests']} hits "
+            f"({disk_cache['hit_ratio']:.0%}), {disk_cache['bytes_saved'] / 2**20:.2f} MB saved, "
+            f"{disk_cache['bytes_transferred'] / 2**20:.2f} MB transferred"
+        )
+
+    readiness = response.get("readiness")
+    if readiness and "ready_seconds" in readiness:
+        print(
+            f"🚦 Page ready via {readiness['strategy']} after {readiness['ready_seconds']:.2f}s "
+            f"(~{readiness['seconds_saved']:.2f}s before the load event)"
+        )
+
+    speculation = response.get("speculation")
+    if speculation:
+        print(
+            f"🔮 Speculative {'navigation' if speculation['warm_page'] else 'browser start'} was used, "
+            f"{speculation['seconds_saved']:.2f}s of it done before the task arrived"
+        )
+
+    session = response.get("session")
+    if session:
+        login = f", logged in again in {session['login_seconds']:.2f}s" if "login_seconds" in session else ""
+        print(f"🔑 Session of {session['account']}@{session['domain']}: snapshot {session['snapshot']}{login}")
+
+    har = response.get("har")
+    if har:
+        if har["mode"] == "record":
+            print(f"📼 Recorded {har['recorded']} requests ({har['bytes']} bytes) to {har['path']}")
+        else:
+            print(f"📼 Replayed {har['replayed']} requests from {har['path']}, {har['missed']} not recorded")
+
+    chunking = response.get("chunking")
+    if chunking and chunking["chunk_seconds"]:
+        per_chunk = chunking["chunk_seconds"]
+        print(
+            f"🧩 Map-reduce over {chunking['chunks']} chunks (concurrency {chunking['concurrency']}, "
+            f"{chunking['relevant_chunks']} relevant): {sum(per_chunk) / len(per_chunk):.2f}s avg, "
+            f"{max(per_chunk):.2f}s max per chunk, reduce {chunking['reduce_seconds']:.2f}s"
+        )
+
+    action_cache = response.get("action_cache")
+    if action_cache:
+        print(f"🎯 Action cache {action_cache}")
+
+    retries = response.get("retries")
+    if retries and retries["retried"]:
+        print(
+            f"🔁 {retries['domain']} took {retries['attempts']} attempts "
+            f"({retries['backoff_seconds']:.1f}s backoff), breaker {retries['breaker']}"
+        )
+
+    token_usage = response.get("token_usage")
+    if token_usage:
+        print(f"🪙 LLM tokens: {token_usage['prompt_tokens']} prompt, {token_usage['completion_tokens']} completion")
+
+
+def _event_pipe(on_event: Optional[EventCallback]) -> Optional[EventPipe]:
+    """The dedicated event channel of a subprocess worker, where file descriptors can be inherited."""
+    return EventPipe(on_event) if os.name == "posix" else None
+
+
+def _worker_command(
+    task_description: str,
+    website_url: str,
+    extract_schema: Optional[Dict[str, Any]] = None,
+    timeout: float = TIMEOUT_SECONDS,
+):
+    """Return the command, stdin payload and environment for a `stagehand_worker` subprocess."""
+    task = {"task_description": task_description, "website_url": website_url, "deadline": time.time() + timeout}
+    if extract_schema is not None:
+        task["extract_schema"] = extract_schema
+    payload = json.dumps(task)
+
+    # Make the worker module importable for `python -m` regardless of the caller's cwd
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [WORKER_DIR, env.get("PYTHONPATH")]))
+
+    # Use the Python executable from the current environment
+    return [sys.executable, "-m", "stagehand_worker"], payload, env
+
+
+def _parse_worker_output(returncode: int, output: OutputCapture) -> Dict[str, Any]:
+    """Fallback for workers without an event channel: the response is the last line on stdout."""
+    if returncode == 0 and output.last_stdout:
+        try:
+            return json.loads(output.last_stdout)
+        except json.JSONDecodeError:
+            return _error_response(f"Unparseable worker output: {output.tail(stream_name='stdout')}")
+    else:
+        # Only a short tail, this error ends up in LLM prompts
+        error_msg = output.tail(stream_name="stderr") or f"Process exited with code {returncode}"
+        return _error_response(f"Process Error: {error_msg}")
+
+
+def _write_payload(stdin, payload: str) -> None:
+    try:
+        with stdin:
+            stdin.write(payload)
+    except (BrokenPipeError, OSError):
+        # The worker died before reading its task; its exit code and output tell why
+        pass
+
+
+def _run_in_subprocess(
+    task_description: str,
+    website_url: str,
+    cancel_token: Optional[CancellationToken] = None,
+    on_event: Optional[EventCallback] = None,
+    extract_schema: Optional[Dict[str, Any]] = None,
+    timeout: float = TIMEOUT_SECONDS,
+) -> Dict[str, Any]:
+    """Run browser automation in a freshly spawned interpreter."""
+    command, payload, env = _worker_command(task_description, website_url, extract_schema, timeout)
+    events = _event_pipe(on_event)
+
     try:
-        # Write script to temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
-            f.write(script_content)
-            script_path = f.name
-        
-        # Get the Python executable from current environment
-        python_executable = sys.executable
-        
-        # Run the script in a subprocess
-        result = subprocess.run(
-            [python_executable, script_path],
-            capture_output=True,
+        # A session of its own lets a timeout or cancellation take the whole process group down
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=180,  # 3 minute timeout
-            env=os.environ.copy()  # Pass environment variables
+            errors="replace",
+            env=events.child_env(env) if events else env,
+            pass_fds=(events.write_fd,) if events else (),
+            start_new_session=True,
         )
-        
-        # Clean up temp file
+    except Exception as e:
+        if events:
+            events.close()
+        return _error_response(f"Subprocess Error: {str(e)}")
+    if events:
+        events.start()
+    output = OutputCapture(f"worker {process.pid}")
+    output.follow(process.stdout, "stdout")
+    output.follow(process.stderr, "stderr")
+    _write_payload(process.stdin, payload)
+
+    with _cancelling(cancel_token, lambda: kill_process_tree(process.pid)):
         try:
-            os.unlink(script_path)
-        except:
-            pass
-        
-        if result.returncode == 0 and result.stdout.strip():
-            try:
-                response = json.loads(result.stdout.strip())
-                if response['success']:
-                    return f"Browser Automation Success:\\n{response['data']}"
-                else:
-                    return f"Browser Automation Failed: {response['error']}"
-            except json.JSONDecodeError:
-                return f"Browser Automation Output: {result.stdout.strip()}"
-        else:
-            error_msg = result.stderr or f"Process exited with code {result.returncode}"
-            return f"Process Error: {error_msg}"
-            
-    except subprocess.TimeoutExpired:
+            process.wait(timeout=timeout + KILL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process.pid)
+            process.wait()
+            return _error_response(f"Browser automation timed out after {timeout:.0f} seconds", ErrorCode.TIMEOUT)
+
+    if cancel_token is not None and cancel_token.cancelled:
+        return _cancelled_response(cancel_token)
+    output.join(DRAIN_SECONDS)
+    response = events.wait(DRAIN_SECONDS) if events else None
+    return response if response is not None else _parse_worker_output(process.returncode, output)
+
+
+async def _run_in_subprocess_async(
+    task_description: str,
+    website_url: str,
+    on_event: Optional[EventCallback] = None,
+    extract_schema: Optional[Dict[str, Any]] = None,
+    timeout: float = TIMEOUT_SECONDS,
+) -> Dict[str, Any]:
+    """Run browser automation in a freshly spawned interpreter without blocking the event loop."""
+    command, payload, env = _worker_command(task_description, website_url, extract_schema, timeout)
+    events = _event_pipe(on_event)
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=events.child_env(env) if events else env,
+            pass_fds=(events.write_fd,) if events else (),
+            start_new_session=True,
+            # Room for the response line printed on stdout
+            limit=RESPONSE_LINE_LIMIT,
+        )
+    except Exception as e:
+        if events:
+            events.close()
+        return _error_response(f"Subprocess Error: {str(e)}")
+    if events:
+        events.start()
+    output = OutputCapture(f"worker {process.pid}")
+
+    async def communicate() -> None:
         try:
-            os.unlink(script_path)
-        except:
+            process.stdin.write(payload.encode("utf-8"))
+            await process.stdin.drain()
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
             pass
-        return "Error: Browser automation timed out after 3 minutes"
-    except Exception as e:
-        return f"Subprocess Error: {str(e)}"
+        await asyncio.gather(output.follow_async(process.stdout, "stdout"), output.follow_async(process.stderr, "stderr"))
+        await process.wait()
+
+    try:
+        await asyncio.wait_for(communicate(), timeout + KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        kill_process_tree(process.pid)
+        await process.wait()
+        return _error_response(f"Browser automation timed out after {timeout:.0f} seconds", ErrorCode.TIMEOUT)
+    except asyncio.CancelledError:
+        kill_process_tree(process.pid)
+        await process.wait()
+        raise
+
+    response = await asyncio.to_thread(events.wait, DRAIN_SECONDS) if events else None
+    return response if response is not None else _parse_worker_output(process.returncode, output)
@@ -0,0 +1,338 @@
+"""
+Browser worker: runs one Stagehand task.
+
+Used in-process by the pool workers, and as a standalone program that reads
+its task as JSON on stdin and prints the JSON response on stdout:
+
+    echo '{"task_description": "...", "website_url": "https://..."}' | python -m stagehand_worker
+
+An optional "extract_schema" (a JSON schema) switches the task from `act` to
+Stagehand's `extract`, returning the typed JSON in "extracted".
+
+When started with `STAGEHAND_EVENTS_FD` set, progress events and the response
+are also written to that file descriptor, see `worker_events`.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from action_cache import cached_act, get_action_cache
+from browser_result import ErrorCode, error_response, exception_code
+from chunked_extract import chunked_extract
+from deadlines import PhaseBudget, PhaseTimeout
+from extract_schema import compile_schema
+from har_recording import MissingRecording, har_enabled, har_session
+from http_cache import cache_active, chromium_args, http_cache
+from llm_config import MODEL_NAME, get_api_key, get_base_url
+from page_readiness import page_readiness
+from resource_blocking import BLOCKED_RESOURCE_TYPES, BLOCKING_ENABLED, blocked_resources, blocked_urls
+from session_store import LoginFailed, authenticated_session
+from worker_events import (
+    ACT_STARTED,
+    EVENTS_FD_ENV,
+    EXTRACT_STARTED,
+    INIT_DONE,
+    NAVIGATED,
+    PARTIAL_DATA,
+    RESULT,
+    EventSink,
+    fd_sink,
+)
+
+_import_started = time.perf_counter()
+from stagehand import Stagehand, StagehandConfig  # noqa: E402
+from stagehand.page import StagehandPage  # noqa: E402
+
+# How long this process spent importing the browser stack
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+INSTRUCTION_TEMPLATE = """
+{task_description}
+
+Instructions:
+1. Navigate to relevant sections if needed
+2. Extract specific data requested
+3. Provide precise information, not summaries and its most importnat part
+4. Focus on factual data extraction
+5. Return the exact information found
+"""
+
+
+def build_config(disk_cache: bool = True) -> StagehandConfig:
+    """
+    Build the Stagehand configuration used by every browser session.
+
+    With `disk_cache` the browser is put on this process's slot of the shared HTTP cache, if one is configured.
+    """
+    cache_args = chromium_args() if disk_cache else []
+    if cache_args and BLOCKING_ENABLED and not har_enabled():
+        print(
+            f"💾 This browser uses the shared HTTP cache, so only tracker URLs are blocked; "
+            f"{', '.join(sorted(BLOCKED_RESOURCE_TYPES))} requests load normally"
+        )
+    return StagehandConfig(
+        env="LOCAL",
+        model_name=MODEL_NAME,
+        self_heal=True,
+        system_prompt="You are a browser automation assistant that extracts specific information accurately.",
+        model_client_options={
+            "apiKey": get_api_key(),
+            "baseURL": get_base_url(),
+        },
+        verbose=1,
+        # Stagehand's default flags, plus the cache location
+        local_browser_launch_options={"args": ["--disable-blink-features=AutomationControlled", *cache_args]},
+    )
+
+
+def _token_counts(page: StagehandPage) -> Tuple[int, int]:
+    """Prompt and completion tokens the page's Stagehand client has used so far."""
+    metrics = getattr(getattr(page, "_stagehand", None), "metrics", None)
+    if metrics is None:
+        return 0, 0
+    return metrics.total_prompt_tokens, metrics.total_completion_tokens
+
+
+class OpenedPage:
+    """
+    A page navigated to a task's URL, with the task's session, HAR recording, resource blocking,
+    HTTP cache and readiness tracking still in effect until it is closed.
+
+    Opened by `run_task` itself, or ahead of the task while it is still being planned,
+    see `browser_pool.StagehandPool.speculate`.
+    """
+
+    def __init__(self, page: StagehandPage, website_url: str):
+        self.page = page
+        self.website_url = website_url
+        self.navigated = False
+        self.reports: Dict[str, Any] = {}
+        self._stack = AsyncExitStack()
+
+    async def navigate(
+        self,
+        budget: PhaseBudget,
+        task_description: Optional[str] = None,
+        extract_schema: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Install the task's request handling and open the page; without a task there is no HAR session."""
+        page, website_url, stack = self.page, self.website_url, self._stack
+        session = await stack.enter_async_context(authenticated_session(page, website_url))
+        har = None
+        if task_description is not None:
+            har = await stack.enter_async_context(har_session(page, task_description, website_url, extract_schema))
+        # A request route turns off the browser's disk cache for the page, so with a cache only tracker URLs are blocked
+        blocking = disk_cache = None
+        if cache_active() and not har_enabled():
+            disk_cache = await stack.enter_async_context(http_cache(page))
+            blocking = await stack.enter_async_context(blocked_urls(page, website_url))
+        else:
+            blocking = await stack.enter_async_context(blocked_resources(page, website_url))
+        readiness = await stack.enter_async_context(page_readiness(page, website_url))
+        self.reports = {
+            "session": session,
+            "har": har,
+            "blocking": blocking,
+            "http_cache": disk_cache,
+            "readiness": readiness,
+        }
+
+        async with budget.phase("navigation") as limit:
+            await readiness.navigate(website_url, limit)
+        if session is not None and not await session.check():
+            # The stored session is missing or expired, log in again and come back
+            async with budget.phase("login") as limit:
+                await session.login(limit)
+            async with budget.phase("navigation") as limit:
+                await readiness.navigate(website_url, limit)
+        self.navigated = True
+
+    async def close(self) -> None:
+        """Remove everything `navigate` installed on the page; safe to call more than once."""
+        await self._stack.aclose()
+
+    async def __aenter__(self) -> "OpenedPage":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+
+async def run_task(
+    page: StagehandPage,
+    task_description: str,
+    website_url: str,
+    budget: Optional[PhaseBudget] = None,
+    events: Optional[EventSink] = None,
+    extract_schema: Optional[Dict[str, Any]] = None,
+    opened: Optional[OpenedPage] = None,
+) -> Dict[str, Any]:
+    """
+    Navigate a Stagehand page and perform one task on it, each step within its phase deadline.
+
+    With `extract_schema` the task is answered with `page.extract` instead of `page.act`.
+    An `opened` page already at `website_url` skips navigation; it is closed when the task is done.
+    """
+    budget = budget or PhaseBudget()
+    events = events or EventSink()
+    opened = opened or OpenedPage(page, website_url)
+    # Counters belong to the Stagehand client, which shared-browser tasks have in common,
+    # so usage of concurrent tasks on one browser is only approximate
+    prompt_before, completion_before = _token_counts(page)
+    try:
+        async with opened:
+            if not opened.navigated:
+                await opened.navigate(budget, task_description, extract_schema)
+            events.emit(NAVIGATED, url=page.url)
+            reports = dict(opened.reports)
+
+            action_cache = get_action_cache() if extract_schema is None else None
+            events.emit(EXTRACT_STARTED if extract_schema is not None else ACT_STARTED)
+            async with budget.phase("extract" if extract_schema is not None else "act"):
+                # Long pages are answered chunk by chunk instead of in one call over the whole DOM
+                answer, reports["chunking"] = await chunked_extract(page, task_description, website_url, extract_schema)
+                if answer is None and extract_schema is not None:
+                    extracted = await page.extract(task_description, schema=compile_schema(extract_schema))
+                elif answer is None:
+                    # Without a schema, act avoids having to guess one
+                    enhanced_instruction = INSTRUCTION_TEMPLATE.format(task_description=task_description)
+                    # Replays the action resolved on an earlier run instead of asking the LLM again
+                    result, action_outcome = await cached_act(page, website_url, enhanced_instruction, action_cache)
+
+        if answer is not None:
+            if extract_schema is not None:
+                response = {"success": True, "data": json.dumps(answer), "error": "", "extracted": answer}
+            else:
+                response = {"success": True, "data": answer, "error": ""}
+            events.emit(PARTIAL_DATA, data=response["data"])
+            return _finish_response(response, page, budget, prompt_before, completion_before, **reports)
+
+        if extract_schema is not None:
+            response = _extract_response(extracted)
+            if response["success"]:
+                events.emit(PARTIAL_DATA, data=response["data"])
+            return _finish_response(response, page, budget, prompt_before, completion_before, **reports)
+
+        if not result:
+            response = error_response("No data could be extracted from the page", ErrorCode.NO_DATA)
+        elif getattr(result, "success", True) is False:
+            # Stagehand reports an action it could not perform as a result, not an exception
+            response = error_response(getattr(result, "message", "") or str(result), ErrorCode.ACT_FAILED)
+        else:
+            # Available before the session is torn down
+            events.emit(PARTIAL_DATA, data=str(result))
+            response = {"success": True, "data": str(result), "error": ""}
+        if action_cache is not None:
+            response["action_cache"] = action_outcome
+        return _finish_response(response, page, budget, prompt_before, completion_before, **reports)
+
+    except PhaseTimeout as e:
+        return e.response()
+    except MissingRecording as e:
+        return error_response(str(e), ErrorCode.NO_RECORDING)
+    except LoginFailed as e:
+        return error_response(str(e), ErrorCode.LOGIN_FAILED, timings=dict(budget.timings))
+    except Exception as e:
+        return error_response(str(e), exception_code(e), timings=dict(budget.timings))
+
+
+def _extract_response(extracted: Any) -> Dict[str, Any]:
+    """The response of an extract-mode task."""
+    if isinstance(extracted, BaseModel):
+        extracted = extracted.model_dump(mode="json", by_alias=True)
+    if not extracted:
+        return error_response("No data could be extracted from the page", ErrorCode.NO_DATA)
+    if not isinstance(extracted, dict):
+        # Stagehand hands back its raw output when it does not validate against the schema
+        return error_response(f"Extracted data does not match the schema: {extracted!r}"[:500], ErrorCode.NO_DATA)
+    return {"success": True, "data": json.dumps(extracted), "error": "", "extracted": extracted}
+
+
+def _finish_response(
+    response: Dict[str, Any],
+    page: StagehandPage,
+    budget: PhaseBudget,
+    prompt_before: int,
+    completion_before: int,
+    **reports: Any,
+) -> Dict[str, Any]:
+    """Attach the URL, token usage, phase timings and the `as_dict()` of each report of the task."""
+    response["url"] = page.url
+    prompt_after, completion_after = _token_counts(page)
+    token_usage = {"prompt_tokens": prompt_after - prompt_before, "completion_tokens": completion_after - completion_before}
+    for name, report in reports.items():
+        if report is not None:
+            response[name] = report.as_dict()
+            # Reports of steps that called the LLM directly, bypassing Stagehand's counters
+            token_usage["prompt_tokens"] += getattr(report, "prompt_tokens", 0)
+            token_usage["completion_tokens"] += getattr(report, "completion_tokens", 0)
+    response["token_usage"] = token_usage
+    response["timings"] = dict(budget.timings)
+    return response
+
+
+async def run_session(
+    task_description: str,
+    website_url: str,
+    budget: Optional[PhaseBudget] = None,
+    events: Optional[EventSink] = None,
+    extract_schema: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Start a fresh Stagehand session, run one task on it and close it again."""
+    if not get_api_key():
+        return error_response("OPENAI_API_KEY not set", ErrorCode.MISSING_API_KEY)
+
+    budget = budget or PhaseBudget()
+    stagehand = None
+    try:
+        async with budget.phase("init"):
+            stagehand = Stagehand(build_config())
+            await stagehand.init()
+        if events:
+            events.emit(INIT_DONE, warm=False)
+        return await run_task(stagehand.page, task_description, website_url, budget, events, extract_schema)
+    except PhaseTimeout as e:
+        return e.response()
+    except Exception as e:
+        # run_task reports its own errors, so this is Chromium or Stagehand failing to start
+        return error_response(str(e), ErrorCode.LAUNCH_FAILED)
+    finally:
+        if stagehand:
+            try:
+                await stagehand.close()
+            except Exception:
+                pass
+
+
+async def main() -> None:
+    try:
+        payload = json.loads(sys.stdin.read())
+        task_description = payload["task_description"]
+        website_url = payload["website_url"]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        print(json.dumps(error_response(f"Invalid task payload: {e}", ErrorCode.INVALID_TASK)))
+        return
+
+    events_fd = os.getenv(EVENTS_FD_ENV)
+    events = fd_sink(int(events_fd)) if events_fd else EventSink()
+    response = await run_session(
+        task_description, website_url, PhaseBudget.from_payload(payload), events, payload.get("extract_schema")
+    )
+    response.setdefault("timings", {})["import"] = IMPORT_SECONDS
+    events.emit(RESULT, response=response)
+    print(json.dumps(response))
+
+
+if __name__ == "__main__":
+    import nest_asyncio
+
+    # Disable CrewAI telemetry
+    os.environ["OTEL_SDK_DISABLED"] = "true"
+    nest_asyncio.apply()
+    asyncio.run(main())
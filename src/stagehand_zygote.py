@@ -0,0 +1,220 @@
+"""
+Zygote process for browser tasks.
+
+The zygote imports stagehand, playwright, pydantic and nest_asyncio once and
+then forks a fresh child for every task. Each task still runs in its own
+process, but no longer pays the import cost. Only available where
+`os.fork` exists.
+
+    python -m stagehand_zygote <socket path>   # authkey is read as hex from stdin
+"""
+import atexit
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, Optional
+
+from deadlines import KILL_GRACE_SECONDS
+from process_stats import kill_process_tree
+from worker_events import EventCallback, dispatch
+
+SUPPORTED = hasattr(os, "fork") and hasattr(os, "setsid")
+
+
+def _serve(address: str, authkey: bytes) -> None:
+    """Zygote main loop: pre-import the browser stack, then fork one child per connection."""
+    import_started = time.perf_counter()
+    import nest_asyncio  # noqa: F401
+    import playwright.async_api  # noqa: F401
+    import pydantic  # noqa: F401
+    import stagehand  # noqa: F401
+    import stagehand_worker  # noqa: F401
+    import_seconds = time.perf_counter() - import_started
+
+    # Children are reaped automatically, the zygote never waits on them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    listener = Listener(address, family="AF_UNIX", authkey=authkey)
+    print("ready", flush=True)
+    # Nobody reads our stdout after the handshake, send children's output to stderr instead
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    while True:
+        try:
+            conn = listener.accept()
+        except OSError:
+            continue
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            fork_seconds = time.perf_counter() - forked_at
+            listener.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            try:
+                _run_child(conn, import_seconds, fork_seconds)
+            finally:
+                os._exit(0)
+        conn.close()
+
+
+def _run_child(conn, import_seconds: float, fork_seconds: float) -> None:
+    """Run the task received on `conn` inside a freshly forked child."""
+    import asyncio
+
+    import nest_asyncio
+    from deadlines import PhaseBudget
+    from stagehand_worker import run_session
+    from worker_events import EventSink
+
+    os.setsid()
+    conn.send(("started", os.getpid()))
+    payload = conn.recv()
+
+    # Disable CrewAI telemetry
+    os.environ["OTEL_SDK_DISABLED"] = "true"
+    nest_asyncio.apply()
+    budget = PhaseBudget.from_payload(payload)
+    events = EventSink(lambda message: conn.send(("event", message)))
+    response = asyncio.run(
+        run_session(payload["task_description"], payload["website_url"], budget, events, payload.get("extract_schema"))
+    )
+    response.setdefault("timings", {}).update({"import": import_seconds, "fork": fork_seconds})
+    conn.send(("result", response))
+
+
+class ZygoteTask:
+    """A task running in a child forked from the zygote."""
+
+    def __init__(self, conn, pid: int, on_event: Optional[EventCallback] = None):
+        self.conn = conn
+        self.pid = pid
+        self.on_event = on_event
+
+    def result(self, timeout: float) -> Dict[str, Any]:
+        """
+        Wait for the child's response, killing it if it takes longer than `timeout` seconds.
+
+        Progress events received in the meantime are passed to `on_event`.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                if not self.conn.poll(max(deadline - time.monotonic(), 0)):
+                    self.cancel()
+                    raise TimeoutError(f"Browser automation timed out after {timeout} seconds")
+                kind, body = self.conn.recv()
+                if kind == "result":
+                    return body
+                dispatch(self.on_event, body)
+        except (EOFError, OSError) as e:
+            raise RuntimeError("Browser zygote child exited without a result") from e
+        finally:
+            self.conn.close()
+
+    def cancel(self) -> None:
+        """Kill the child together with its process group and browser."""
+        kill_process_tree(self.pid)
+
+
+class Zygote:
+    """Parent-side handle that starts the zygote on first use and submits tasks to it."""
+
+    def __init__(self):
+        self._process: Optional[subprocess.Popen] = None
+        self._address = ""
+        self._authkey = b""
+        self._socket_dir = ""
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return
+
+            # A previous zygote died, drop its socket before starting a new one
+            if self._socket_dir:
+                shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = tempfile.mkdtemp(prefix="stagehand_zygote_")
+            self._address = os.path.join(self._socket_dir, "zygote.sock")
+            self._authkey = os.urandom(32)
+
+            env = os.environ.copy()
+            worker_dir = os.path.dirname(os.path.abspath(__file__))
+            env["PYTHONPATH"] = os.pathsep.join(filter(None, [worker_dir, env.get("PYTHONPATH")]))
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "stagehand_zygote", self._address],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                env=env,
+            )
+            self._process.stdin.write(self._authkey.hex() + "\n")
+            self._process.stdin.flush()
+            if self._process.stdout.readline().strip() != "ready":
+                self._process.kill()
+                raise RuntimeError(f"Browser zygote failed to start (exit code {self._process.wait()})")
+
+    def warm(self) -> None:
+        """Start the zygote ahead of the first task, so the browser stack is imported by then."""
+        self._ensure_started()
+
+    def start(
+        self,
+        task_description: str,
+        website_url: str,
+        timeout: float = 180,
+        on_event: Optional[EventCallback] = None,
+        extract_schema: Optional[Dict[str, Any]] = None,
+    ) -> ZygoteTask:
+        """Fork a child from the zygote and hand it one task that must finish within `timeout` seconds."""
+        self._ensure_started()
+        payload = {"task_description": task_description, "website_url": website_url, "deadline": time.time() + timeout}
+        if extract_schema is not None:
+            payload["extract_schema"] = extract_schema
+        conn = Client(self._address, family="AF_UNIX", authkey=self._authkey)
+        try:
+            _, pid = conn.recv()
+            conn.send(payload)
+        except (EOFError, OSError) as e:
+            conn.close()
+            raise RuntimeError("Browser zygote child exited before accepting the task") from e
+        return ZygoteTask(conn, pid, on_event)
+
+    def run(self, task_description: str, website_url: str, timeout: float = 180) -> Dict[str, Any]:
+        """Fork a child from the zygote, run one task in it and return the child's response."""
+        # The child reports phase timeouts itself, only kill it if it overruns the deadline anyway
+        return self.start(task_description, website_url, timeout).result(timeout + KILL_GRACE_SECONDS)
+
+    def close(self) -> None:
+        """Stop the zygote; children that are still running finish on their own."""
+        with self._lock:
+            if self._process is not None:
+                self._process.kill()
+                self._process.wait()
+                self._process = None
+            if self._socket_dir:
+                shutil.rmtree(self._socket_dir, ignore_errors=True)
+                self._socket_dir = ""
+
+
+_zygote: Optional[Zygote] = None
+_zygote_lock = threading.Lock()
+
+
+def get_zygote() -> Zygote:
+    """Return the process-wide zygote handle."""
+    global _zygote
+    with _zygote_lock:
+        if _zygote is None:
+            _zygote = Zygote()
+            atexit.register(_zygote.close)
+        return _zygote
+
+
+if __name__ == "__main__":
+    _serve(sys.argv[1], bytes.fromhex(sys.stdin.readline().strip()))
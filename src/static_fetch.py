@@ -0,0 +1,251 @@
+"""
+HTTP-only fast path for static pages.
+
+Before paying for a browser session, fetch the page with a plain HTTP request,
+extract its main text and ask the LLM to answer the task from that text in a
+single call. The caller escalates to Stagehand whenever the page looks like it
+needs JavaScript, the extracted content is too thin, or the answer comes back
+with low confidence.
+"""
+import json
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from llm_config import MODEL_NAME, get_api_key, get_base_url, get_http_client
+
+FAST_PATH_ENABLED = os.getenv("STAGEHAND_STATIC_FAST_PATH", "1") == "1"
+MIN_CONTENT_CHARS = int(os.getenv("STAGEHAND_STATIC_MIN_CHARS", "500"))
+MIN_CONFIDENCE = float(os.getenv("STAGEHAND_STATIC_MIN_CONFIDENCE", "0.7"))
+FETCH_TIMEOUT_SECONDS = 10
+# Keep the single LLM call well inside the model's context window
+MAX_CONTENT_CHARS = 40000
+
+_SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe"}
+_BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "tr", "br", "h1", "h2", "h3", "h4", "h5", "h6", "dd", "dt", "pre"}
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+# Prefix of heading lines in the extracted text, so section boundaries survive
+HEADING_MARK = "# "
+# Empty mount points left behind by client-side rendered apps
+_SPA_ROOT = re.compile(r'<div[^>]+id=["\'](root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>', re.IGNORECASE)
+_JS_REQUIRED = re.compile(r"(enable|requires?) javascript|javascript (is )?(disabled|required)", re.IGNORECASE)
+
+ANSWER_PROMPT = """You answer questions about a web page using only the page text below.
+
+Task: {task_description}
+Page URL: {website_url}
+
+Page text:
+{content}
+
+Reply with a JSON object with the keys:
+- "answer": the precise information requested, copied from the page where possible
+- "confidence": a number from 0 to 1 for how sure you are the page text fully answers the task
+- "needs_browser": true if the task requires interacting with the page (clicking, typing, logging in,
+  navigating elsewhere) or if the information is clearly missing from the text
+"""
+
+
+class _MainTextExtractor(HTMLParser):
+    """Collects visible text, separately for <main>/<article> and for the whole body."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._main_depth = 0
+        self.body: List[str] = []
+        self.main: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in ("main", "article"):
+            self._main_depth += 1
+        if tag in _BLOCK_TAGS:
+            self._append("\n")
+        if tag in _HEADING_TAGS and not self._skip_depth:
+            self._append(HEADING_MARK)
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in ("main", "article") and self._main_depth:
+            self._main_depth -= 1
+        if tag in _BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._append(data)
+
+    def _append(self, text: str) -> None:
+        self.body.append(text)
+        if self._main_depth:
+            self.main.append(text)
+
+
+def _clean(chunks: List[str]) -> str:
+    text = re.sub(r"[ \t\r\f\v]+", " ", "".join(chunks))
+    return re.sub(r"\s*\n\s*", "\n", text).strip()
+
+
+def extract_main_text(html: str) -> str:
+    """Return the page's main content as plain text, preferring <main>/<article> when present."""
+    parser = _MainTextExtractor()
+    parser.feed(html)
+    parser.close()
+    main = _clean(parser.main)
+    return main if len(main) >= MIN_CONTENT_CHARS else _clean(parser.body)
+
+
+def escalation_reason(html: str, text: str) -> Optional[str]:
+    """Why this page cannot be handled without a browser, or None if plain HTTP is enough."""
+    if _SPA_ROOT.search(html) or (_JS_REQUIRED.search(html) and len(text) < 4 * MIN_CONTENT_CHARS):
+        return "needs_javascript"
+    if len(text) < MIN_CONTENT_CHARS:
+        return "thin_content"
+    return None
+
+
+def answer_from_text(
+    task_description: str, website_url: str, content: str
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Answer the task from the page text with one LLM call; returns the answer and the tokens spent."""
+    from openai import OpenAI
+
+    client = OpenAI(api_key=get_api_key(), base_url=get_base_url(), http_client=get_http_client())
+    completion = client.chat.completions.create(
+        model=MODEL_NAME,
+        response_format={"type": "json_object"},
+        temperature=0,
+        messages=[
+            {
+                "role": "user",
+                "content": ANSWER_PROMPT.format(
+                    task_description=task_description,
+                    website_url=website_url,
+                    content=content[:MAX_CONTENT_CHARS],
+                ),
+            }
+        ],
+    )
+    usage = completion.usage
+    token_usage = {
+        "prompt_tokens": usage.prompt_tokens if usage else 0,
+        "completion_tokens": usage.completion_tokens if usage else 0,
+    }
+    return json.loads(completion.choices[0].message.content or "{}"), token_usage
+
+
+class FastPathStats:
+    """Routing counters and an estimate of the latency the fast path saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.http_answers = 0
+        self.escalations: Dict[str, int] = {}
+        self.browser_runs = 0
+        self.browser_seconds = 0.0
+        self.seconds_saved = 0.0
+
+    def record_browser_run(self, seconds: float) -> None:
+        with self._lock:
+            self.browser_runs += 1
+            self.browser_seconds += seconds
+
+    def record_http_answer(self, seconds: float) -> float:
+        """Count an answer served over HTTP and return the seconds it saved over an average browser run."""
+        with self._lock:
+            self.http_answers += 1
+            saved = max(self.browser_seconds / self.browser_runs - seconds, 0.0) if self.browser_runs else 0.0
+            self.seconds_saved += saved
+            return saved
+
+    def record_escalation(self, reason: str) -> None:
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            routed = self.http_answers + sum(self.escalations.values())
+            return {
+                "http_answers": self.http_answers,
+                "escalations": dict(self.escalations),
+                "hit_rate": self.http_answers / routed if routed else 0.0,
+                "seconds_saved": round(self.seconds_saved, 2),
+                "average_browser_seconds": round(self.browser_seconds / self.browser_runs, 2) if self.browser_runs else None,
+            }
+
+
+stats = FastPathStats()
+
+
+def try_fast_path(task_description: str, website_url: str) -> Optional[Dict[str, Any]]:
+    """Return a worker-style response answered over plain HTTP, or None to escalate to the browser."""
+    started = time.perf_counter()
+    reason, response = _route(task_description, website_url)
+    elapsed = time.perf_counter() - started
+
+    if response is None:
+        stats.record_escalation(reason)
+        print(f"🧭 Routing {website_url} to the browser ({reason}, {elapsed:.2f}s spent on the HTTP attempt)")
+        return None
+
+    saved = stats.record_http_answer(elapsed)
+    print(f"🧭 Answered {website_url} over plain HTTP in {elapsed:.2f}s (~{saved:.1f}s saved)")
+    response["timings"] = {"http_fast_path": elapsed}
+    return response
+
+
+def _route(task_description: str, website_url: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    if not get_api_key():
+        return "no_api_key", None
+    try:
+        html, final_url = _fetch(website_url)
+    except (httpx.HTTPError, ValueError) as e:
+        return f"fetch_failed: {type(e).__name__}", None
+
+    text = extract_main_text(html)
+    reason = escalation_reason(html, text)
+    if reason:
+        return reason, None
+
+    try:
+        answer, token_usage = answer_from_text(task_description, final_url, text)
+    except Exception as e:
+        return f"llm_failed: {type(e).__name__}", None
+
+    try:
+        confidence = float(answer.get("confidence", 0))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    if answer.get("needs_browser") or not answer.get("answer"):
+        return "needs_interaction", None
+    if confidence < MIN_CONFIDENCE:
+        return "low_confidence", None
+    return "http", {
+        "success": True,
+        "data": str(answer["answer"]),
+        "error": "",
+        "route": "http",
+        "url": final_url,
+        "token_usage": token_usage,
+    }
+
+
+def _fetch(website_url: str) -> Tuple[str, str]:
+    response = httpx.get(
+        website_url,
+        follow_redirects=True,
+        timeout=FETCH_TIMEOUT_SECONDS,
+        headers={"User-Agent": "Mozilla/5.0 (compatible; web-browsing-agent)", "Accept": "text/html,*/*;q=0.8"},
+    )
+    response.raise_for_status()
+    if "html" not in response.headers.get("content-type", "text/html"):
+        raise ValueError("Not an HTML page")
+    return response.text, str(response.url)
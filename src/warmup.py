@@ -0,0 +1,94 @@
+"""
+Startup warm-up.
+
+The first query after `streamlit run src/agent.py` would otherwise pay for
+launching Chromium, for the TCP and TLS handshakes to the LLM endpoint and for
+CrewAI's lazy initialization. `start_warmup` runs all three on background
+threads as soon as the app starts, and the returned Warmup reports when they
+are done. Queries that arrive earlier run as usual, just without the head start.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from llm_config import open_connections
+from stage_hand_tool import warm_browsers
+
+WARMUP_ENABLED = os.getenv("STAGEHAND_WARMUP", "1") == "1"
+# Pool workers whose browser is launched before the first query, capped by the pool size
+WARM_WORKERS = int(os.getenv("STAGEHAND_WARM_WORKERS", "1"))
+# Keep-alive connections opened to OPENAI_API_BASE, roughly the LLM calls made at once
+WARM_LLM_CONNECTIONS = int(os.getenv("STAGEHAND_WARM_LLM_CONNECTIONS", "2"))
+
+
+class Warmup:
+    """Runs the warm-up steps in parallel and records how each of them went."""
+
+    def __init__(self, steps: Dict[str, Callable[[], Any]]):
+        self._steps = steps
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.started_at = time.time()
+        self.seconds: Optional[float] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    def start(self) -> "Warmup":
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return self
+
+    @property
+    def ready(self) -> bool:
+        """Whether every step has finished, successfully or not."""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm-up is done or `timeout` seconds have passed; returns `ready`."""
+        return self._done.wait(timeout)
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        if self._steps:
+            with ThreadPoolExecutor(max_workers=len(self._steps), thread_name_prefix="warmup") as executor:
+                for name, step in self._steps.items():
+                    executor.submit(self._run_step, name, step)
+        self.seconds = time.perf_counter() - started
+        self._done.set()
+        failed = [name for name, step in self.steps.items() if "error" in step]
+        print(
+            f"🔥 Warm-up done in {self.seconds:.1f}s"
+            + (f", failed: {', '.join(failed)}" if failed else "")
+        )
+
+    def _run_step(self, name: str, step: Callable[[], Any]) -> None:
+        started = time.perf_counter()
+        try:
+            result: Dict[str, Any] = {"result": step()}
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        with self._lock:
+            self.steps[name] = result
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "seconds": round(self.seconds, 3) if self.seconds is not None else None,
+                "steps": {name: dict(step) for name, step in self.steps.items()},
+            }
+
+
+def start_warmup(load_agents: Optional[Callable[[], Any]] = None) -> Warmup:
+    """
+    Start warming up in the background: fill the browser pool to STAGEHAND_WARM_WORKERS,
+    open STAGEHAND_WARM_LLM_CONNECTIONS connections to the LLM endpoint and call `load_agents`.
+    """
+    steps: Dict[str, Callable[[], Any]] = {}
+    if WARMUP_ENABLED:
+        steps["browsers"] = lambda: warm_browsers(WARM_WORKERS)
+        steps["llm_connections"] = lambda: open_connections(WARM_LLM_CONNECTIONS)
+        if load_agents is not None:
+            steps["agents"] = load_agents
+    return Warmup(steps).start()
@@ -0,0 +1,123 @@
+"""
+Progress events of a browser task.
+
+Workers report progress as they go instead of only at exit. Each event is a
+dict with an "event" name, the seconds elapsed since the task started and
+event-specific fields:
+
+    init_done      the browser is ready ("warm" is true if it was already running)
+    navigated      the page finished loading ("url" is where it ended up)
+    act_started    the act step is running
+    extract_started  the extract step is running (extract mode)
+    partial_data   data is available before the task has finished ("data")
+    result         the final response ("response")
+
+Pool and zygote workers send events over their existing connection to the
+parent. Subprocess workers write them as JSON lines to a dedicated pipe whose
+file descriptor is passed in `STAGEHAND_EVENTS_FD`, so Stagehand's logs on
+stdout and stderr can never corrupt them.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+INIT_DONE = "init_done"
+NAVIGATED = "navigated"
+ACT_STARTED = "act_started"
+EXTRACT_STARTED = "extract_started"
+PARTIAL_DATA = "partial_data"
+RESULT = "result"
+
+EVENTS_FD_ENV = "STAGEHAND_EVENTS_FD"
+
+EventCallback = Callable[[Dict[str, Any]], None]
+
+
+class EventSink:
+    """Worker-side writer of the progress events of one task."""
+
+    def __init__(self, send: Optional[EventCallback] = None):
+        self._send = send
+        self._started = time.perf_counter()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self._send is None:
+            return
+        message = {"event": event, "elapsed": round(time.perf_counter() - self._started, 3), **fields}
+        try:
+            self._send(message)
+        except Exception:
+            # Progress reporting is best effort, it must never fail the task
+            pass
+
+
+def fd_sink(fd: int) -> EventSink:
+    """A sink writing JSON lines to the inherited file descriptor `fd`."""
+    stream = os.fdopen(fd, "w", buffering=1, encoding="utf-8")
+    lock = threading.Lock()
+
+    def send(message: Dict[str, Any]) -> None:
+        with lock:
+            stream.write(json.dumps(message) + "\n")
+
+    return EventSink(send)
+
+
+def dispatch(on_event: Optional[EventCallback], message: Dict[str, Any]) -> None:
+    """Hand an event to the caller's callback, shielding the task from errors in it."""
+    if on_event is None:
+        return
+    try:
+        on_event(message)
+    except Exception:
+        pass
+
+
+class EventPipe:
+    """
+    Parent side of the dedicated event channel of a subprocess worker.
+
+    Events are read on a background thread and passed to `on_event` as they
+    arrive; the final "result" event is kept as the task's response instead.
+    """
+
+    def __init__(self, on_event: Optional[EventCallback] = None):
+        self.read_fd, self.write_fd = os.pipe()
+        self.response: Optional[Dict[str, Any]] = None
+        self._on_event = on_event
+        self._reader = threading.Thread(target=self._read, daemon=True)
+
+    def child_env(self, env: Dict[str, str]) -> Dict[str, str]:
+        return {**env, EVENTS_FD_ENV: str(self.write_fd)}
+
+    def start(self) -> None:
+        """Call once the child has been spawned: drop our copy of the write end and start reading."""
+        os.close(self.write_fd)
+        self._reader.start()
+
+    def _read(self) -> None:
+        with os.fdopen(self.read_fd, "r", encoding="utf-8", errors="replace") as stream:
+            for line in stream:
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if message.get("event") == RESULT:
+                    self.response = message.get("response")
+                else:
+                    dispatch(self._on_event, message)
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait until the child closed the channel and return its response, if it sent one."""
+        self._reader.join(timeout)
+        return self.response
+
+    def close(self) -> None:
+        """Release the pipe if the child never got spawned."""
+        for fd in (self.read_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,115 @@
+"""
+Bounded capture of subprocess worker output.
+
+Stagehand logs verbosely, and self-heal retries make a long run print a lot.
+Instead of holding all of it in memory, the output of a worker is streamed
+into a ring buffer of the last few hundred lines. Every line can additionally
+be spilled to a size-rotated log file, and only a short tail is handed back
+to the caller when the worker fails.
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Deque, Dict, List, Optional, Tuple
+
+LOG_BUFFER_LINES = int(os.getenv("STAGEHAND_LOG_BUFFER_LINES", "200"))
+LOG_TAIL_LINES = int(os.getenv("STAGEHAND_LOG_TAIL_LINES", "15"))
+# Full worker output is only kept on disk when this is set
+LOG_FILE = os.getenv("STAGEHAND_WORKER_LOG_FILE", "")
+LOG_FILE_MAX_BYTES = int(os.getenv("STAGEHAND_WORKER_LOG_MAX_BYTES", str(10 * 2**20)))
+LOG_FILE_BACKUPS = int(os.getenv("STAGEHAND_WORKER_LOG_BACKUPS", "3"))
+# A single runaway line, e.g. a dumped page, is cut down in the buffer
+MAX_LINE_CHARS = 500
+
+_spill_logger: Optional[logging.Logger] = None
+_spill_lock = threading.Lock()
+
+
+def _spill() -> Optional[logging.Logger]:
+    """The logger writing to the rotating log file, or None when spilling is off."""
+    global _spill_logger
+    if not LOG_FILE:
+        return None
+    with _spill_lock:
+        if _spill_logger is None:
+            os.makedirs(os.path.dirname(os.path.abspath(LOG_FILE)), exist_ok=True)
+            handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger = logging.getLogger("stagehand.worker_output")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _spill_logger = logger
+        return _spill_logger
+
+
+class OutputCapture:
+    """Keeps the last `max_lines` lines a worker printed on stdout and stderr."""
+
+    def __init__(self, label: str, max_lines: int = LOG_BUFFER_LINES):
+        self.label = label
+        # Lines pushed out of the buffer, per stream
+        self.dropped: Dict[str, int] = {}
+        # The worker's response is its last stdout line, kept whole however long it is
+        self.last_stdout = ""
+        self._lines: Deque[Tuple[str, str]] = deque(maxlen=max(1, max_lines))
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._spill = _spill()
+
+    def feed(self, stream_name: str, line: str) -> None:
+        line = line.rstrip("\r\n")
+        if stream_name == "stdout" and line.strip():
+            self.last_stdout = line
+        if self._spill is not None:
+            self._spill.info("[%s %s] %s", self.label, stream_name, line)
+        if len(line) > MAX_LINE_CHARS:
+            line = line[:MAX_LINE_CHARS] + " [truncated]"
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                evicted = self._lines[0][0]
+                self.dropped[evicted] = self.dropped.get(evicted, 0) + 1
+            self._lines.append((stream_name, line))
+
+    def follow(self, stream, stream_name: str) -> None:
+        """Read a text stream of a `subprocess.Popen` on a background thread."""
+
+        def read() -> None:
+            with stream:
+                for line in stream:
+                    self.feed(stream_name, line)
+
+        thread = threading.Thread(target=read, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    async def follow_async(self, reader: asyncio.StreamReader, stream_name: str) -> None:
+        """Read a stream of an asyncio subprocess until it closes."""
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # Longer than the reader's limit; asyncio has already discarded it
+                self.feed(stream_name, "[overlong line dropped]")
+                continue
+            if not line:
+                return
+            self.feed(stream_name, line.decode("utf-8", errors="replace"))
+
+    def join(self, timeout: float) -> None:
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def tail(self, lines: int = LOG_TAIL_LINES, stream_name: Optional[str] = None) -> str:
+        """The last `lines` lines, optionally of one stream only, noting how many came before."""
+        with self._lock:
+            kept = [line for name, line in self._lines if stream_name is None or name == stream_name]
+            dropped = sum(self.dropped.values()) if stream_name is None else self.dropped.get(stream_name, 0)
+            omitted = max(len(kept) - lines, 0) + dropped
+        text = "\n".join(kept[-lines:])
+        if omitted > 0:
+            text = f"[{omitted} earlier lines omitted]\n{text}"
+        return text
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import browser_pool
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    """Poll `condition` until it holds, failing the test after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        time.sleep(0.01)
+
+
+class FakeOpened:
+    """Stands in for stagehand_worker.OpenedPage."""
+
+    def __init__(self, website_url: str):
+        self.website_url = website_url
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeRunner:
+    """Stands in for a worker's browser: tasks succeed straight away, navigation can be held up."""
+
+    # Set by tests to keep open_page waiting until the event is set
+    hold_navigation = None
+    navigating = threading.Event()
+    opened = []
+
+    async def start(self) -> None:
+        pass
+
+    async def run(self, task_description, website_url, budget, events, extract_schema=None, opened=None):
+        return {"success": True, "data": task_description, "error": "", "warm_page": opened is not None}
+
+    async def open_page(self, website_url, budget):
+        FakeRunner.navigating.set()
+        if FakeRunner.hold_navigation is not None:
+            while not FakeRunner.hold_navigation.is_set():
+                await asyncio.sleep(0.01)
+        opened = FakeOpened(website_url)
+        FakeRunner.opened.append(opened)
+        return opened
+
+    async def close(self) -> None:
+        pass
+
+
+class _ChildEnd:
+    """The worker's end of the pipe; the pool closes its copy after starting a process, a thread must keep it."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def close(self) -> None:
+        pass
+
+
+class _ThreadProcess:
+    """Runs a pool worker's `_serve` on a thread of the test process."""
+
+    def __init__(self, target, args, daemon=True):
+        child, contexts_per_browser = args
+        self.pid = None
+        self.exitcode = None
+        self._thread = threading.Thread(target=self._run, args=(child.conn, contexts_per_browser), daemon=daemon)
+
+    def _run(self, conn, contexts_per_browser: int) -> None:
+        try:
+            asyncio.run(browser_pool._serve(conn, contexts_per_browser))
+        finally:
+            self.exitcode = 0
+            conn.close()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def join(self, timeout=None) -> None:
+        self._thread.join(timeout)
+
+
+class _ThreadContext:
+    """A multiprocessing context whose processes are threads."""
+
+    def __init__(self, context):
+        self._context = context
+
+    def Pipe(self):
+        parent, child = self._context.Pipe()
+        return parent, _ChildEnd(child)
+
+    def Process(self, target, args, daemon=True):
+        return _ThreadProcess(target, args, daemon)
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    """Build StagehandPools whose workers run in-process on FakeRunner, no browser needed."""
+    import nest_asyncio
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(nest_asyncio, "apply", lambda *args, **kwargs: None)
+    monkeypatch.setattr(browser_pool, "_SessionRunner", FakeRunner)
+    FakeRunner.hold_navigation = None
+    FakeRunner.navigating = threading.Event()
+    FakeRunner.opened = []
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("max_worker_rss_mb", 0)
+        pool = browser_pool.StagehandPool(**kwargs)
+        pool._context = _ThreadContext(pool._context)
+        pools.append(pool)
+        return pool
+
+    yield make
+    if FakeRunner.hold_navigation is not None:
+        FakeRunner.hold_navigation.set()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+import stage_hand_tool
+from cancellation import CancellationToken
+
+
+@pytest.fixture
+def fake_runs(monkeypatch):
+    """Replace the browser run of each batch item; items whose task is "slow" run until cancelled."""
+    cancelled = []
+    slow_started = threading.Event()
+
+    def browser_automation(task_description, website_url, use_cache, cancel_token, on_event, schema):
+        if task_description == "slow":
+            slow_started.set()
+            cancel_token.wait(10)
+            cancelled.append(cancel_token.cancelled)
+            return "Task was cancelled"
+        return f"done: {task_description}"
+
+    monkeypatch.setattr(stage_hand_tool, "EXECUTION_MODE", "subprocess")
+    monkeypatch.setattr(stage_hand_tool, "browser_automation", browser_automation)
+    return cancelled, slow_started
+
+
+def test_malformed_items_fail_on_their_own(fake_runs):
+    tasks = [("a", "https://a.example"), ("a", "b", "c"), "ab", None, ("b", "https://b.example")]
+    results = sorted(stage_hand_tool.browser_automation_many(tasks, max_concurrency=2), key=lambda r: r.index)
+
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert results[0].result == "done: a" and results[4].result == "done: b"
+    for result in results[1:4]:
+        assert result.result.startswith("Batch Item Error: Expected a (task_description, website_url) pair")
+
+
+def test_closing_the_batch_early_cancels_running_items(fake_runs):
+    tasks = [("quick", "https://a.example"), ("slow", "https://b.example")]
+    batch = stage_hand_tool.browser_automation_many(tasks, max_concurrency=2)
+    assert next(batch).result == "done: quick"
+    cancelled, slow_started = fake_runs
+    assert slow_started.wait(5)
+
+    started = time.perf_counter()
+    batch.close()
+    assert time.perf_counter() - started < 1
+    deadline = time.monotonic() + 5
+    while not cancelled and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cancelled == [True]
+
+
+def test_caller_cancellation_reaches_the_items(fake_runs):
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel).start()
+    results = list(stage_hand_tool.browser_automation_many([("slow", "https://a.example")], cancel_token=token))
+    assert results[0].result == "Task was cancelled" and fake_runs[0] == [True]
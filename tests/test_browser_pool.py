@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from browser_pool import StagehandPool, _SessionRunner
+from conftest import FakeRunner, wait_for
+
+
+def test_tasks_run_on_pooled_workers(thread_pool):
+    pool = thread_pool(size=1)
+    assert pool.run("read the title", "https://example.com", timeout=10)["data"] == "read the title"
+    assert pool.run("read it again", "https://example.com", timeout=10)["success"]
+    assert [worker["tasks"] for worker in pool.stats()["workers"]] == [2]
+
+
+def test_capacity_counts_contexts_per_browser():
+    assert StagehandPool(size=2).capacity == 2
+    assert StagehandPool(size=2, contexts_per_browser=3).capacity == 6
+    with pytest.raises(ValueError):
+        StagehandPool(size=0)
+
+
+def test_worker_is_recycled_after_max_tasks(thread_pool):
+    pool = thread_pool(size=1, max_tasks_per_worker=2)
+    for i in range(3):
+        assert pool.run(f"task {i}", "https://example.com", timeout=10)["success"]
+
+    wait_for(lambda: pool.stats()["recycles"].get("max_tasks") == 1)
+    stats = pool.stats()
+    assert stats["recent_recycles"][0]["tasks"] == 2
+    assert [worker["tasks"] for worker in stats["workers"]] == [1]
+
+
+def test_old_workers_are_recycled(thread_pool):
+    pool = thread_pool(size=1, max_worker_age=0.05)
+    assert pool.run("first", "https://example.com", timeout=10)["success"]
+    wait_for(lambda: pool.stats()["workers"][0]["age_seconds"] >= 0.05)
+    assert pool.run("second", "https://example.com", timeout=10)["success"]
+
+    wait_for(lambda: pool.stats()["recycles"].get("max_age") == 1)
+
+
+def test_warming_does_not_count_as_a_task(thread_pool):
+    pool = thread_pool(size=2, max_tasks_per_worker=1)
+    assert pool.warm(2, timeout=10) == 2
+    workers = pool.stats()["workers"]
+    assert len(workers) == 2 and all(worker["tasks"] == 0 and not worker["retiring"] for worker in workers)
+
+
+def test_claimed_speculation_runs_on_the_warm_page(thread_pool):
+    pool = thread_pool(size=1)
+    speculation = pool.speculate("https://example.com/a", timeout=10)
+    response = speculation.claim("read it", "https://example.com/a", timeout=10).result(10)
+    assert response["warm_page"] and "seconds_saved" in response["speculation"]
+    assert not speculation.discard()
+
+
+def test_discarding_during_navigation_frees_the_slot_at_once(thread_pool):
+    FakeRunner.hold_navigation = threading.Event()
+    pool = thread_pool(size=1)
+    speculation = pool.speculate("https://example.com/a", timeout=10)
+    assert FakeRunner.navigating.wait(5)
+
+    assert speculation.discard()
+    assert speculation.future.result(1)["discarded"]
+    assert pool.stats()["workers"][0]["in_flight"] == 0
+    assert pool.run("read it", "https://example.com/b", timeout=10)["success"]
+    assert not FakeRunner.opened
+
+
+def test_closed_pool_refuses_tasks(thread_pool):
+    pool = thread_pool(size=1)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.submit("task", "https://example.com", timeout=1)
+
+
+class _RecordingPage:
+    """A Playwright page and context recording what a reset does to them."""
+
+    def __init__(self):
+        self.calls = []
+        self.context = self
+        self.listeners = {}
+
+    def on(self, event, listener):
+        self.listeners[event] = listener
+
+    async def evaluate(self, script):
+        self.calls.append(("evaluate", script))
+
+    async def goto(self, url):
+        self.calls.append(("goto", url))
+
+    async def clear_cookies(self):
+        self.calls.append(("clear_cookies",))
+
+    async def new_cdp_session(self, page):
+        return self
+
+    async def send(self, method, params):
+        self.calls.append((method, params["origin"]))
+
+    async def detach(self):
+        pass
+
+
+def test_session_runner_clears_what_earlier_tasks_left_behind():
+    page = _RecordingPage()
+    runner = _SessionRunner()
+    runner._stagehand = SimpleNamespace(page=page)
+    page.on("framenavigated", runner._record_origin)
+    for url in ("https://a.example/x", "https://a.example/y", "about:blank", "http://b.example:8080/"):
+        page.listeners["framenavigated"](SimpleNamespace(url=url))
+
+    asyncio.run(runner.reset())
+    assert ("goto", "about:blank") in page.calls and ("clear_cookies",) in page.calls
+    cleared = {call[1] for call in page.calls if call[0] == "Storage.clearDataForOrigin"}
+    assert cleared == {"https://a.example", "http://b.example:8080"}
+
+    page.calls.clear()
+    asyncio.run(runner.reset())
+    assert not [call for call in page.calls if call[0] == "Storage.clearDataForOrigin"]
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from chunked_extract import is_read_only, split_chunks
+from static_fetch import HEADING_MARK
+
+
+def test_short_text_is_one_chunk():
+    assert split_chunks("one\ntwo", 100) == ["one\ntwo"]
+
+
+def test_chunks_break_at_headings():
+    first = f"{HEADING_MARK}A\n" + "a" * 20
+    second = f"{HEADING_MARK}B\n" + "b" * 20
+    assert split_chunks(f"{first}\n{second}", 30) == [first, second]
+
+
+def test_small_sections_share_a_chunk():
+    text = "\n".join(f"{HEADING_MARK}{name}\nx" for name in "ABC")
+    assert split_chunks(text, 1000) == [text]
+
+
+def test_overlong_line_stays_after_its_heading():
+    text = f"{HEADING_MARK}A\n" + "x" * 50 + f"\n{HEADING_MARK}B\n" + "y" * 30
+    chunks = split_chunks(text, 40)
+    assert chunks[0].startswith(f"{HEADING_MARK}A\n")
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+    assert chunks[-1] == f"{HEADING_MARK}B\n" + "y" * 30
+
+
+def test_chunks_keep_the_order_and_size_limit_of_any_text():
+    rng = random.Random(7)
+    for _ in range(200):
+        lines = []
+        for _ in range(rng.randint(1, 30)):
+            line = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 120)))
+            lines.append(HEADING_MARK + line if rng.random() < 0.2 else line)
+        text = "\n".join(lines)
+        max_chars = rng.randint(10, 100)
+
+        chunks = split_chunks(text, max_chars)
+        assert all(len(chunk) <= max_chars for chunk in chunks)
+        assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+
+@pytest.mark.parametrize(
+    "task",
+    [
+        "find the price of the order",
+        "list the open issues",
+        "Get the post titles and their dates",
+        "Extract the book titles and authors",
+        "read the number of search results",
+        "Check the price of the laptop",
+        "What is the order total?",
+        "find the type and size of the file",
+        "count the download links",
+        "Navigate to https://example.com and extract the title",
+        "Go to example.com and list the top stories",
+        "Open https://news.ycombinator.com and list the titles",
+    ],
+)
+def test_reading_tasks_are_read_only(task):
+    assert is_read_only(task)
+
+
+@pytest.mark.parametrize(
+    "task",
+    [
+        "click the login button",
+        "Search for laptops and list prices",
+        "Open the first article and summarise it",
+        "Log in and read my balance",
+        "Go to the settings page and find the language",
+        "find the search box, then type laptop",
+        "Order a pizza",
+        "Please select the cheapest flight",
+        "Fill in the form and submit it",
+        "scroll down to load all reviews",
+        "Add the item to the cart",
+        "Book a table for two",
+    ],
+)
+def test_interactive_tasks_are_not_read_only(task):
+    assert not is_read_only(task)
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+
+from deadlines import PhaseBudget, PhaseTimeout
+
+
+def test_phase_limit_is_capped_by_the_remaining_budget():
+    budget = PhaseBudget(deadline=time.time() + 5, phase_timeouts={"act": 60, "init": 1})
+    assert 4 < budget.limit("act") <= 5
+    assert budget.limit("init") == 1
+
+
+def test_phase_timeout_reports_the_phase_and_completed_timings():
+    budget = PhaseBudget(deadline=time.time() + 10, phase_timeouts={"init": 5, "navigation": 0.05})
+
+    async def run():
+        async with budget.phase("init"):
+            pass
+        async with budget.phase("navigation"):
+            await asyncio.sleep(1)
+
+    with pytest.raises(PhaseTimeout) as raised:
+        asyncio.run(run())
+    response = raised.value.response()
+    assert response["error_code"] == "timeout"
+    assert response["timed_out_phase"] == "navigation"
+    assert set(response["timings"]) == {"init"}
+
+
+def test_spent_budget_fails_before_the_phase_starts():
+    budget = PhaseBudget(deadline=time.time() - 1)
+    entered = []
+
+    async def run():
+        async with budget.phase("act"):
+            entered.append(True)
+
+    with pytest.raises(PhaseTimeout):
+        asyncio.run(run())
+    assert not entered
+
+
+def test_repeated_phases_add_up():
+    budget = PhaseBudget(deadline=time.time() + 10, phase_timeouts={"init": 5})
+
+    async def run():
+        for _ in range(2):
+            async with budget.phase("init"):
+                await asyncio.sleep(0.02)
+
+    asyncio.run(run())
+    assert budget.timings["init"] >= 0.04
+
+
+def test_budget_travels_as_a_wall_clock_deadline():
+    deadline = time.time() + 30
+    assert PhaseBudget.from_payload({"deadline": deadline}).deadline == deadline
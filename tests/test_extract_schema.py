@@ -0,0 +1,54 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from extract_schema import compile_schema, schema_from_fields, schema_key, to_json_schema
+
+
+class Product(BaseModel):
+    name: str
+    price: float
+    tags: List[str] = []
+    note: Optional[str] = None
+
+
+def test_compiled_model_validates_like_the_original():
+    model = compile_schema(to_json_schema(Product))
+    item = model.model_validate({"name": "Lamp", "price": "9.5", "tags": ["home"]})
+    assert item.name == "Lamp" and item.price == 9.5 and item.tags == ["home"] and item.note is None
+    with pytest.raises(ValidationError):
+        model.model_validate({"price": 1})
+
+
+def test_identical_schemas_share_a_model():
+    schema = schema_from_fields({"title": "string", "stars": "integer"})
+    assert compile_schema(schema) is compile_schema(dict(schema))
+
+
+def test_schema_key_ignores_key_order():
+    assert schema_key({"a": 1, "b": 2}) == schema_key({"b": 2, "a": 1})
+
+
+def test_nested_refs_and_non_identifier_names():
+    schema = {
+        "title": "Listing",
+        "type": "object",
+        "properties": {
+            "items": {"type": "array", "items": {"$ref": "#/$defs/Item"}},
+            "total-count": {"type": "integer"},
+        },
+        "required": ["items"],
+        "$defs": {"Item": {"type": "object", "properties": {"label": {"type": "string"}}, "required": ["label"]}},
+    }
+    model = compile_schema(schema)
+    listing = model.model_validate({"items": [{"label": "a"}], "total-count": 3})
+    assert listing.items[0].label == "a"
+    assert listing.model_dump(by_alias=True)["total-count"] == 3
+
+
+def test_schema_from_fields_falls_back_to_string():
+    schema = schema_from_fields({"when": "date", "tags": "list"})
+    assert schema["properties"]["when"] == {"type": "string"}
+    assert schema["properties"]["tags"] == {"type": "array", "items": {"type": "string"}}
+    assert schema["required"] == ["when", "tags"]
@@ -0,0 +1,32 @@
+import pytest
+
+import stage_hand_tool
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    """Record which route each task takes; the fast path never answers so every task also reaches the browser."""
+    taken = []
+
+    def try_fast_path(task_description, website_url):
+        taken.append("http")
+        return None
+
+    def run_in_browser(task_description, website_url, cancel_token, on_event, extract_schema):
+        taken.append("browser")
+        return {"success": True, "data": "ok", "error": ""}
+
+    monkeypatch.setattr(stage_hand_tool, "FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(stage_hand_tool, "try_fast_path", try_fast_path)
+    monkeypatch.setattr(stage_hand_tool, "_run_in_browser", run_in_browser)
+    return taken
+
+
+def test_reading_tasks_try_plain_http_first(routes):
+    assert stage_hand_tool.run_browser_task("list the top stories", "https://example.com", use_cache=False).success
+    assert routes == ["http", "browser"]
+
+
+def test_interactive_tasks_go_straight_to_the_browser(routes):
+    assert stage_hand_tool.run_browser_task("log in and read my balance", "https://example.com", use_cache=False).success
+    assert routes == ["browser"]
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from page_readiness import PageReadiness
+from session_store import AuthenticatedSession, LoginFailed
+
+
+class _SlowPage:
+    """A Playwright page whose navigation uses up the whole timeout and whose selector never shows up."""
+
+    def __init__(self):
+        self.selector_timeouts = []
+
+    async def goto(self, url, timeout, wait_until):
+        await asyncio.sleep(timeout / 1000 + 0.01)
+
+    async def wait_for_selector(self, selector, timeout, state="visible"):
+        self.selector_timeouts.append(timeout)
+        raise TimeoutError(f"Timeout {timeout}ms exceeded")
+
+
+def test_readiness_never_waits_without_a_timeout():
+    page = _SlowPage()
+    with pytest.raises(TimeoutError):
+        asyncio.run(PageReadiness(page, "selector:#results").navigate("https://example.com", limit=-0.99))
+    assert page.selector_timeouts == [1]
+
+
+def test_login_never_waits_without_a_timeout():
+    page = _SlowPage()
+    config = {"login_url": "https://example.com/login", "logged_in_selector": "#me"}
+    session = AuthenticatedSession(page, "example.com", config, None)
+    with pytest.raises(LoginFailed):
+        asyncio.run(session.login(limit=-0.99))
+    assert page.selector_timeouts == [1]
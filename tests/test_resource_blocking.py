@@ -0,0 +1,77 @@
+import asyncio
+import re
+
+from resource_blocking import BlockingProfile, blocked_urls
+
+PROFILE = BlockingProfile(tracker_domains=frozenset({"doubleclick.net", "facebook.com/tr"}), allowlist={})
+
+
+def _blocked_by_patterns(url, patterns):
+    # "*" is the only wildcard Chromium knows in blocked URL patterns
+    return any(re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url) for pattern in patterns)
+
+
+def test_tracker_patterns_match_what_the_route_blocks():
+    patterns = PROFILE.tracker_patterns()
+    for url in (
+        "https://doubleclick.net/x",
+        "https://ad.doubleclick.net/x?y=1",
+        "https://facebook.com/tr",
+        "https://www.facebook.com/tr?id=1",
+        "https://www.facebook.com/tr/x",
+        "https://example.com/",
+        "https://facebook.com/trending",
+        "https://notdoubleclick.net/x",
+    ):
+        assert _blocked_by_patterns(url, patterns) == PROFILE.is_tracker(url), url
+
+
+class _CdpPage:
+    """A Playwright page whose CDP session records the blocked URLs and lets the test fire network events."""
+
+    def __init__(self):
+        self.context = self
+        self.sent = {}
+        self.listeners = {}
+        self.detached = False
+
+    async def new_cdp_session(self, page):
+        return self
+
+    def on(self, event, listener):
+        self.listeners[event] = listener
+
+    async def send(self, method, params=None):
+        self.sent[method] = params
+
+    async def detach(self):
+        self.detached = True
+
+
+def test_url_blocking_counts_requests_and_reports_the_skipped_types():
+    page = _CdpPage()
+
+    async def run():
+        async with blocked_urls(page, "https://example.com", PROFILE) as stats:
+            for request_id in ("1", "1", "2", "3"):
+                page.listeners["Network.requestWillBeSent"]({"requestId": request_id})
+            page.listeners["Network.loadingFailed"]({"requestId": "3", "blockedReason": "inspector"})
+            page.listeners["Network.loadingFailed"]({"requestId": "2", "errorText": "net::ERR_FAILED"})
+            return stats.as_dict()
+
+    report = asyncio.run(run())
+    assert report == {"allowed": 2, "blocked": 1, "blocked_tracker": 1, "skipped_types": ["font", "image", "media"]}
+    assert page.sent["Network.setBlockedURLs"]["urls"] == PROFILE.tracker_patterns()
+    assert page.detached
+
+
+def test_allowlisted_trackers_are_not_blocked_by_url():
+    page = _CdpPage()
+    profile = BlockingProfile(allowlist={"example.com": ["trackers", "image"]})
+
+    async def run():
+        async with blocked_urls(page, "https://shop.example.com", profile) as stats:
+            return stats.as_dict()
+
+    assert asyncio.run(run())["skipped_types"] == ["font", "media"]
+    assert page.sent["Network.setBlockedURLs"]["urls"] == []
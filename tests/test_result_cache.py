@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache, canonicalize_url, normalize_task, ttl_for
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("example.com", "https://example.com/"),
+        ("HTTPS://WWW.Example.com/", "https://example.com/"),
+        ("https://example.com:443/docs/", "https://example.com/docs"),
+        ("http://example.com:8080/a", "http://example.com:8080/a"),
+        ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+        ("https://example.com/a?utm_source=x&id=3&fbclid=y", "https://example.com/a?id=3"),
+        ("https://example.com/a#section", "https://example.com/a"),
+    ],
+)
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_normalize_task():
+    assert normalize_task("  Find   the PRICE.  ") == "find the price"
+
+
+def test_ttl_for_falls_back_to_parent_domains(monkeypatch):
+    monkeypatch.setattr(result_cache, "DOMAIN_TTLS", {"example.com": 60})
+    assert ttl_for("docs.example.com") == 60
+    assert ttl_for("example.org") == result_cache.DEFAULT_TTL_SECONDS
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(path=str(tmp_path / "results.sqlite3"))
+
+
+def test_hit_for_equivalent_task_and_url(cache):
+    cache.put("Find the price", "https://www.example.com/", {"success": True, "data": "42", "error": ""})
+    assert cache.get("find the price.", "example.com")["data"] == "42"
+    assert cache.stats()["hits"] == 1
+
+
+def test_failures_are_not_stored(cache):
+    cache.put("task", "https://example.com", {"success": False, "data": "", "error": "boom"})
+    assert cache.get("task", "https://example.com") is None
+
+
+def test_only_allow_listed_keys_are_stored(cache):
+    response = {"success": True, "data": "42", "error": "", "timings": {"act": 1.0}, "token_usage": {}, "url": "u"}
+    cache.put("task", "https://example.com", response)
+    assert cache.get("task", "https://example.com") == {"success": True, "data": "42", "error": "", "url": "u"}
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    monkeypatch.setattr(result_cache, "DEFAULT_TTL_SECONDS", 0)
+    cache.put("task", "https://example.com", {"success": True, "data": "42", "error": ""})
+    assert cache.get("task", "https://example.com") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry = {"success": True, "data": "x" * 100, "error": ""}
+    cache = ResultCache(path=str(tmp_path / "results.sqlite3"), max_bytes=300)
+    cache.put("first", "https://example.com", entry)
+    time.sleep(0.01)
+    cache.put("second", "https://example.com", entry)
+    time.sleep(0.01)
+    # Touching the first entry makes the second the least recently used
+    assert cache.get("first", "https://example.com") is not None
+    time.sleep(0.01)
+    cache.put("third", "https://example.com", entry)
+
+    assert cache.get("second", "https://example.com") is None
+    assert cache.get("first", "https://example.com") is not None
+    assert cache.get("third", "https://example.com") is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,149 @@
+import pytest
+
+import retry_policy
+from browser_result import ErrorCode, error_response
+from retry_policy import CLOSED, HALF_OPEN, OPEN, Attempts, BreakerRegistry, CircuitBreaker, RetryPolicy, policy_for
+
+BROWSER_ERROR = error_response("net::ERR_CONNECTION_REFUSED", ErrorCode.BROWSER_ERROR)
+SUCCESS = {"success": True, "data": "ok", "error": ""}
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(retry_policy, "breakers", BreakerRegistry())
+
+
+def test_policy_for_falls_back_to_parent_domains(monkeypatch):
+    monkeypatch.setattr(retry_policy, "POLICIES", {"example.com": {"attempts": 5}})
+    assert policy_for("https://docs.example.com/a") == ("example.com", RetryPolicy(attempts=5))
+    assert policy_for("https://Other.org/") == ("other.org", RetryPolicy())
+
+
+def test_delay_stays_within_the_exponential_cap():
+    policy = RetryPolicy(base_delay=1, max_delay=3)
+    assert all(0 <= policy.delay(retry) <= min(3, 2 ** (retry - 1)) for retry in range(1, 6) for _ in range(20))
+
+
+def test_timeouts_are_retried_only_before_the_page_loaded():
+    navigation = {"success": False, "error_code": "timeout", "timed_out_phase": "navigation"}
+    act = {"success": False, "error_code": "timeout", "timed_out_phase": "act"}
+    assert retry_policy.is_retryable(navigation)
+    assert not retry_policy.is_retryable(act)
+
+
+def test_breaker_opens_after_the_threshold_and_fails_fast():
+    breaker = CircuitBreaker("example.com", RetryPolicy(failure_threshold=2, cooldown=60))
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(BROWSER_ERROR)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.as_dict()["rejected"] == 1
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker("example.com", RetryPolicy(failure_threshold=1, cooldown=0))
+    breaker.record(BROWSER_ERROR)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(SUCCESS)
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_failed_trial_opens_the_breaker_again():
+    breaker = CircuitBreaker("example.com", RetryPolicy(failure_threshold=3, cooldown=0))
+    for _ in range(3):
+        breaker.record(BROWSER_ERROR)
+    assert breaker.allow()
+    breaker.record(BROWSER_ERROR)
+    assert breaker.state == OPEN and breaker.opens == 2
+
+
+def _failure(code, **fields):
+    return {"success": False, "error": "failed", "error_code": code, **fields}
+
+
+# Failures left after one browser error and then the response: counted, ignored or reset by the site answering
+@pytest.mark.parametrize(
+    "response, failures",
+    [
+        (BROWSER_ERROR, 2),
+        (_failure("timeout", timed_out_phase="init"), 2),
+        (_failure("timeout", timed_out_phase="navigation"), 2),
+        (_failure("timeout", timed_out_phase="act"), 0),
+        (_failure("timeout"), 1),
+        (_failure("worker_error"), 1),
+        ({"success": False, "error": "Process Error"}, 1),
+        (_failure("cancelled"), 1),
+        (_failure("missing_api_key"), 1),
+        (_failure("invalid_task"), 1),
+        (_failure("launch_failed"), 1),
+        (_failure("llm_error"), 1),
+        (_failure("no_recording"), 1),
+        (_failure("act_failed"), 0),
+        (_failure("no_data"), 0),
+        (_failure("login_failed"), 0),
+        (SUCCESS, 0),
+    ],
+)
+def test_breaker_counts_only_failures_that_point_at_the_site(response, failures):
+    breaker = CircuitBreaker("example.com", RetryPolicy(failure_threshold=5))
+    breaker.record(BROWSER_ERROR)
+    breaker.record(response)
+    assert breaker.failures == failures
+
+
+def test_worker_errors_are_retried():
+    assert retry_policy.is_retryable(_failure("worker_error"))
+    assert retry_policy.is_retryable({"success": False, "error": "Process Error"})
+
+
+def test_abandoned_attempt_frees_the_trial_slot():
+    breaker = CircuitBreaker("example.com", RetryPolicy(failure_threshold=1, cooldown=0))
+    breaker.record(BROWSER_ERROR)
+    attempts = Attempts("https://example.com", timeout=60)
+    attempts.breaker = breaker
+    assert attempts.admit()
+    attempts.abandon()
+    assert breaker.allow()
+
+
+def test_attempts_retry_within_the_deadline(monkeypatch):
+    monkeypatch.setattr(retry_policy, "MIN_ATTEMPT_SECONDS", 1)
+    attempts = Attempts("https://example.com", timeout=60)
+    attempts.policy = RetryPolicy(attempts=2, base_delay=0.01, max_delay=0.01)
+    assert attempts.admit()
+    assert attempts.retry_delay(BROWSER_ERROR) is not None
+    assert attempts.admit()
+    # Out of attempts
+    assert attempts.retry_delay(BROWSER_ERROR) is None
+    assert attempts.finish(BROWSER_ERROR)["retries"]["retried"] == ["browser_error"]
+
+
+def test_no_retry_when_the_backoff_would_not_leave_a_useful_attempt(monkeypatch):
+    monkeypatch.setattr(retry_policy, "MIN_ATTEMPT_SECONDS", 20)
+    attempts = Attempts("https://example.com", timeout=10)
+    assert attempts.admit()
+    assert attempts.retry_delay(BROWSER_ERROR) is None
+    assert attempts.finish(BROWSER_ERROR) is BROWSER_ERROR
+
+
+def test_rejected_response_says_when_to_try_again():
+    attempts = Attempts("https://example.com", timeout=60)
+    attempts.breaker = CircuitBreaker("example.com", RetryPolicy(failure_threshold=1, cooldown=30))
+    attempts.breaker.record(BROWSER_ERROR)
+    assert not attempts.admit()
+    response = attempts.rejected()
+    assert response["error_code"] == "circuit_open"
+    assert response["retries"]["breaker"] == OPEN
+    assert 0 < attempts.breaker.retry_after() <= 30
+
+
+def test_registry_counts_retries():
+    registry = retry_policy.breakers
+    registry.record_retry(0.5)
+    registry.get("example.com", RetryPolicy())
+    snapshot = registry.snapshot()
+    assert snapshot["retries"] == 1 and snapshot["backoff_seconds"] == 0.5
+    assert snapshot["breakers"]["example.com"]["state"] == CLOSED